@@ -0,0 +1,222 @@
+"""
+Baseline for the SSE encoder benchmark: the stream event formatter as it was
+before ``src/api/utils/sse.py`` (isinstance/hasattr chains, a dict per event,
+``json.dumps`` and an INFO log line per event). Kept verbatim for comparison.
+"""
+
+import json
+import logging
+from typing import Any, Optional
+
+from agents.stream_events import (
+    AgentUpdatedStreamEvent,
+    RawResponsesStreamEvent,
+    RunItemStreamEvent,
+    StreamEvent
+)
+
+
+def encode_legacy(event: StreamEvent, logger: logging.Logger) -> Optional[str]:
+    formatted_event = _format_stream_event(event, logger)
+    if formatted_event:
+        return f"data: {json.dumps(formatted_event)}\n\n"
+    return None
+
+
+def _format_stream_event(event: StreamEvent, logger: logging.Logger) -> Optional[dict[str, Any]]:
+    """
+    Format stream events into a consistent, frontend-friendly structure.
+    
+    This avoids double JSON encoding and provides clean event structures.
+    """
+    try:
+        formatted_event = None
+        if isinstance(event, RawResponsesStreamEvent):
+            formatted_event = _format_raw_response_event(event)
+        elif isinstance(event, RunItemStreamEvent):
+            formatted_event = _format_run_item_event(event)
+        elif isinstance(event, AgentUpdatedStreamEvent):
+            formatted_event = _format_agent_updated_event(event)
+        else:
+            # Fallback for unknown event types
+            logger.warning(f"Unknown event type: {type(event)}")
+            formatted_event = {
+                "type": "unknown_event",
+                "event_class": str(type(event).__name__),
+                "data": str(event) if event else None
+            }
+        
+        if formatted_event:
+            logger.info(f"{formatted_event}")
+        return formatted_event
+    except Exception as e:
+        logger.error(f"Error formatting event {type(event)}: {e}")
+        return None
+
+
+def _format_raw_response_event(event: RawResponsesStreamEvent) -> dict[str, Any]:
+    """Format raw response events with proper JSON structure."""
+    base_event = {
+        "type": "raw_response",
+        "event_type": event.data.type if hasattr(event.data, 'type') else 'unknown',
+        "sequence_number": getattr(event.data, 'sequence_number', None),
+    }
+    
+    # Handle specific raw event types
+    if hasattr(event.data, 'type'):
+        event_type = event.data.type
+        
+        # Text streaming events
+        if event_type == "response.output_text.delta":
+            base_event.update({
+                "delta": getattr(event.data, 'delta', ''),
+                "content_index": getattr(event.data, 'content_index', 0),
+                "item_id": getattr(event.data, 'item_id', None),
+                "output_index": getattr(event.data, 'output_index', 0)
+            })
+        
+        # Reasoning events (for models like deepseek-reasoner)
+        elif event_type == "response.reasoning_summary_text.delta":
+            base_event.update({
+                "delta": getattr(event.data, 'delta', ''),
+                "reasoning": True
+            })
+        
+        # Refusal events
+        elif event_type == "response.refusal.delta":
+            base_event.update({
+                "delta": getattr(event.data, 'delta', ''),
+                "refusal": True
+            })
+            
+        # Capture tool name when tool call starts 
+        elif event_type == "response.output_item.added":  
+            item_obj = getattr(event.data, 'item', None)  
+            base_event.update({  
+                "output_index": getattr(event.data, 'output_index', 0),  
+                "item_type": getattr(item_obj, 'type', None) if item_obj else None  
+            })  
+              
+            # Extract tool name if this is a function tool call  
+            if item_obj and hasattr(item_obj, 'name'):  
+                base_event.update({  
+                    "tool_name": item_obj.name,  # Tool name available here!  
+                    "call_id": getattr(item_obj, 'call_id', None)  
+                })
+        
+        # Function call arguments
+        elif event_type == "response.function_call_arguments.delta":
+            base_event.update({
+                "delta": getattr(event.data, 'delta', ''),
+                "function_call": True,
+                "call_id": getattr(event.data, 'call_id', None)
+            })
+        
+        # Response lifecycle events
+        elif event_type in ["response.created", "response.completed"]:
+            response_obj = getattr(event.data, 'response', None)
+            base_event.update({
+                "response_id": getattr(response_obj, 'id', None) if response_obj else None,
+                "status": getattr(response_obj, 'status', None) if response_obj else None
+            })
+        
+        # Content lifecycle events
+        elif event_type in ["response.content_part.added", "response.content_part.done"]:
+            base_event.update({
+                "content_index": getattr(event.data, 'content_index', 0),
+                "item_id": getattr(event.data, 'item_id', None)
+            })
+        
+        # Output item events
+        elif event_type in ["response.output_item.added", "response.output_item.done"]:
+            item_obj = getattr(event.data, 'item', None)
+            base_event.update({
+                "output_index": getattr(event.data, 'output_index', 0),
+                "item_type": getattr(item_obj, 'type', None) if item_obj else None
+            })
+        
+        # Text completion events
+        elif event_type == "response.output_text.done":
+            base_event.update({
+                "text": getattr(event.data, 'text', ''),
+                "content_index": getattr(event.data, 'content_index', 0),
+                "item_id": getattr(event.data, 'item_id', None)
+            })
+    
+    return base_event
+
+
+def _format_run_item_event(event: RunItemStreamEvent) -> dict[str, Any]:
+    """Format run item events (semantic agent events)."""
+    base_event = {
+        "type": "run_item",
+        "name": event.name,
+        "item_type": getattr(event.item, 'type', None) if event.item else None,
+    }
+        
+    # Handle specific run item types
+    if event.name == "message_output_created":
+        base_event.update({
+            "role": getattr(event.item, 'role', None),
+            "status": getattr(event.item, 'status', None),
+            "message_id": getattr(event.item, 'id', None)
+        })
+    
+    elif event.name == "tool_called":
+        base_event.update({
+            "tool_name": getattr(event.item.raw_item, 'name', None),
+            "tool_arguments": getattr(event.item.raw_item, 'arguments', None),
+            "call_id": getattr(event.item.raw_item, 'id', None)
+        })
+    
+    elif event.name == "tool_output":
+        base_event.update({
+            "tool_name": getattr(event.item, 'name', None),
+            "output": getattr(event.item, 'output', None),
+            "call_id": getattr(event.item, 'id', None)
+        })
+    
+    elif event.name == "handoff_requested":
+        base_event.update({
+            "target_agent": getattr(event.item, 'target_agent_name', None),
+            "reason": getattr(event.item, 'reason', None)
+        })
+    
+    elif event.name == "handoff_occured":
+        base_event.update({
+            "target_agent": getattr(event.item, 'target_agent_name', None),
+            "previous_agent": getattr(event.item, 'previous_agent_name', None)
+        })
+    
+    elif event.name == "reasoning_item_created":
+        base_event.update({
+            "reasoning_content": getattr(event.item, 'content', None)
+        })
+    
+    # MCP-related events
+    elif event.name == "mcp_approval_requested":
+        base_event.update({
+            "tool_name": getattr(event.item, 'tool_name', None),
+            "server_name": getattr(event.item, 'server_name', None)
+        })
+    
+    elif event.name == "mcp_list_tools":
+        base_event.update({
+            "server_name": getattr(event.item, 'server_name', None),
+            "tools": getattr(event.item, 'tools', [])
+        })
+    
+    return base_event
+
+
+def _format_agent_updated_event(event: AgentUpdatedStreamEvent) -> dict[str, Any]:
+    """Format agent updated events (handoffs)."""
+    new_agent = event.new_agent
+    return {
+        "type": "agent_updated",
+        "agent_name": new_agent.name,
+        "agent_instructions": new_agent.instructions if isinstance(new_agent.instructions, str) else "Dynamic instructions",
+        "model": str(new_agent.model) if new_agent.model else None,
+        "tools_count": len(new_agent.tools),
+        "handoffs_count": len(new_agent.handoffs)
+    }
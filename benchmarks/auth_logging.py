@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: per-request logging cost of authentication.
+
+Compares the old pattern in get_current_user (two INFO lines, one of them an
+f-string of the full user payload) with the HotPathLogger policy, rendering
+through the application's real structlog configuration into /dev/null.
+
+Usage:
+    uv run -m benchmarks.auth_logging [iterations]
+"""
+
+import logging
+import os
+import sys
+import timeit
+
+import structlog
+
+from src.core.config import settings
+from src.core.logging import HotPathLogger, configure_logging
+
+# Representative Stack Auth profile payload
+USER_DATA = {
+    "user_id": "3f0c6c1e-5d55-4b8e-9a57-6c1f1f0d2a11",
+    "display_name": "Ada Lovelace",
+    "primary_email": "ada@example.com",
+    "email_verified": True,
+    "profile_image_url": "https://lh3.googleusercontent.com/a/ACg8ocK-example-avatar=s96-c",
+    "signed_up_at": 1718000000000,
+    "last_active_at": 1730000000000,
+    "oauth_providers": [
+        {"id": "google", "account_id": "104857600000000000000", "email": "ada@example.com"},
+        {"id": "github", "account_id": "1234567", "email": "ada@example.com"},
+    ],
+    "has_password": False,
+    "auth_with_email": True,
+    "client_metadata": {"theme": "dark", "onboarding": {"completed": True, "steps": [1, 2, 3, 4]}},
+    "client_read_only_metadata": {"plan": "pro", "seats": 5, "features": ["agents", "research"]},
+    "session_id": None,
+    "actor": None,
+    "session_claims": {"sub": "3f0c6c1e-5d55-4b8e-9a57-6c1f1f0d2a11", "email": "ada@example.com"},
+}
+
+
+def _before(logger) -> None:
+    logger.info("User authenticated successfully", user_id=USER_DATA["user_id"])
+    logger.info(f"user_data: {USER_DATA}")
+
+
+def _after(hot_logger: HotPathLogger) -> None:
+    hot_logger.info("User authenticated", user_id=USER_DATA["user_id"])
+
+
+def _per_call_us(func, iterations: int) -> float:
+    return min(timeit.repeat(func, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def main(iterations: int = 20000) -> None:
+    configure_logging()
+    devnull = open(os.devnull, "w")
+    for handler in logging.getLogger().handlers:
+        handler.setStream(devnull)
+
+    logger = structlog.get_logger("benchmarks.auth")
+    results = [
+        ("before: INFO + f-string payload", _per_call_us(lambda: _before(logger), iterations)),
+    ]
+    for rate in (1.0, settings.auth_log_sample_rate):
+        hot_logger = HotPathLogger("benchmarks.auth", sample_rate=rate)
+        results.append(
+            (f"after: ids only, sample_rate={rate}", _per_call_us(lambda: _after(hot_logger), iterations))
+        )
+
+    logging.getLogger("benchmarks.auth").setLevel(logging.WARNING)
+    hot_logger = HotPathLogger("benchmarks.auth", sample_rate=1.0)
+    results.append(("after: level disabled (WARNING)", _per_call_us(lambda: _after(hot_logger), iterations)))
+
+    print(f"Per-request auth logging overhead ({iterations} iterations, best of 3, LOG_FORMAT={settings.log_format})")
+    baseline = results[0][1]
+    for label, micros in results:
+        print(f"  {label:<40} {micros:8.2f} us   {baseline / micros:6.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,91 @@
+"""
+Record a real agent run in the format replayed by ``benchmarks.replay``.
+
+Runs an app agent through ``Runner.run_streamed`` the way ``/stream`` does
+(without a session) and writes every stream event as one JSON line, so the
+benchmarks can be run against real transcripts instead of the synthetic one.
+Needs OPENAI_API_KEY, and the search API keys of the agent's tools.
+
+Usage:
+    uv run -m benchmarks.capture OUTPUT.jsonl "prompt" [planner|executor|deep_research]
+"""
+
+import asyncio
+import json
+import sys
+import uuid
+from collections import Counter
+from typing import Any, Optional, Tuple
+
+from agents import Agent, Runner
+from agents.stream_events import StreamEvent
+
+from benchmarks.replay import SUPPORTED_ITEM_TYPES
+
+
+def _agent(name: str) -> Tuple[Agent, Any]:
+    """The agent to run and its context."""
+    if name == "planner":
+        from src.agent import planner_supervisor_agent
+        return planner_supervisor_agent, None
+    if name == "executor":
+        from src.executor_agent.agent import executor_supervisor_agent
+        return executor_supervisor_agent, None
+    if name == "deep_research":
+        from src.deep_research_agent.agent import create_main_orchestrator_agent
+        from src.deep_research_agent.config import get_default_config
+        from src.deep_research_agent.models import ResearchContext
+        return create_main_orchestrator_agent(), ResearchContext(config=get_default_config(), session_id=uuid.uuid4().hex)
+    raise ValueError(f"Unknown agent: {name}")
+
+
+def _dump(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    return value
+
+
+def _record(event: StreamEvent) -> Optional[dict]:
+    """The recording line of an event, or None if the replay cannot rebuild it."""
+    if event.type == "raw_response_event":
+        return {"kind": "raw", "data": _dump(event.data)}
+    if event.type == "agent_updated_stream_event":
+        agent = event.new_agent
+        return {
+            "kind": "agent_updated",
+            "name": agent.name,
+            "instructions": agent.instructions if isinstance(agent.instructions, str) else None,
+            "model": str(agent.model) if agent.model else None,
+        }
+    item = event.item
+    if item.type not in SUPPORTED_ITEM_TYPES:
+        return None
+    record = {"kind": "run_item", "name": event.name, "item_type": item.type, "raw_item": _dump(item.raw_item)}
+    if item.type == "tool_call_output_item":
+        record["output"] = item.output if isinstance(item.output, str) else json.dumps(item.output, default=str)
+    return record
+
+
+async def capture(path: str, prompt: str, agent_name: str = "planner") -> None:
+    agent, context = _agent(agent_name)
+    result = Runner.run_streamed(starting_agent=agent, input=prompt, context=context)
+    skipped: Counter = Counter()
+    written = 0
+    with open(path, "w") as f:
+        async for event in result.stream_events():
+            record = _record(event)
+            if record is None:
+                skipped[event.item.type] += 1
+                continue
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            written += 1
+
+    print(f"Recorded {written} events of a {agent_name} run to {path}")
+    if skipped:
+        print(f"  skipped (not replayable): {dict(skipped)}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    asyncio.run(capture(sys.argv[1], sys.argv[2], *sys.argv[3:4]))
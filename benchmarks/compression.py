@@ -0,0 +1,131 @@
+"""
+Benchmark: bandwidth and CPU cost of compressing agent responses.
+
+Replays an agent stream recording (default: the synthetic
+``data/synthetic_planner_stream.jsonl``, whose filler text compresses far
+better than real output; record real runs with ``benchmarks.capture``) as the
+frames a client of ``/stream`` receives (with event ids; full and compact
+schema) and compresses them the way ``src.api.utils.compression`` does: one
+compressor per stream, flushed after every frame. Whole-body compression of
+the same bytes is shown as the best case the per-frame flushes are paid
+against.
+
+The ``/run`` row is a JSON body with the run's final output as
+``final_output``, taken from the stream recording or from a second one (e.g.
+a captured deep research run, whose final report is the large body case).
+
+Every compressed frame is checked to decode to exactly its frame on its own.
+Brotli rows need the ``compression`` extra.
+
+Usage:
+    uv run -m benchmarks.compression [rounds] [stream.jsonl] [run_body.jsonl]
+"""
+
+import json
+import sys
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+from benchmarks.replay import DEFAULT_RECORDING, load_events
+from src.api.utils.compression import StreamCompressor, SUPPORTED_ENCODINGS, brotli, compress_body
+from src.api.utils.sse import encode_stream_event
+from src.core.config import settings
+
+
+def _stream_frames(events, compact: bool):
+    id_prefix = b"id: " + uuid.uuid4().hex.encode() + b"-"
+    frames = [encode_stream_event(event, compact) for event in events]
+    return [id_prefix + str(seq).encode() + b"\n" + frame for seq, frame in enumerate(filter(None, frames), 1)]
+
+
+def _final_output(events) -> str:
+    """Text of the run's last message (what /run returns as final_output)."""
+    for event in reversed(events):
+        if event.type == "run_item_stream_event" and event.item.type == "message_output_item":
+            return "".join(part.text for part in event.item.raw_item.content if hasattr(part, "text"))
+    return "".join(
+        event.data.delta for event in events
+        if event.type == "raw_response_event" and event.data.type == "response.output_text.delta"
+    )
+
+
+def _run_body(events) -> bytes:
+    return json.dumps({
+        "final_output": _final_output(events),
+        "success": True,
+        "error": None,
+        "usage": {"requests": 3, "input_tokens": 5210, "output_tokens": 1894, "total_tokens": 7104},
+        "response_id": "resp_0",
+        "session_id": None,
+    }, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _decompressor(encoding: str):
+    if encoding == "br":
+        return brotli.Decompressor().process
+    return zlib.decompressobj(31).decompress
+
+
+def _check_frames(frames, encoding: str) -> None:
+    compressor = StreamCompressor(encoding)
+    decompress = _decompressor(encoding)
+    for frame in frames:
+        assert decompress(compressor.compress(frame)) == frame, f"{encoding} frame not flushed"
+
+
+def _compress_stream(frames, encoding: str) -> int:
+    compressor = StreamCompressor(encoding)
+    size = sum(len(compressor.compress(frame)) for frame in frames)
+    return size + len(compressor.finish())
+
+
+def _cpu_seconds(fn, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        start = time.process_time()
+        for _ in range(rounds):
+            fn()
+        best = min(best, time.process_time() - start)
+    return best / rounds
+
+
+def main(rounds: int = 20, recording: Path = DEFAULT_RECORDING, body_recording: Path = None) -> None:
+    events = load_events(recording)
+    streams = {
+        "stream": _stream_frames(events, compact=False),
+        "stream (compact)": _stream_frames(events, compact=True),
+    }
+    body_recording = body_recording or recording
+    body = _run_body(events if body_recording == recording else load_events(body_recording))
+
+    print(f"Response compression, {recording.name} ({len(events)} events), best of 3 x {rounds} rounds")
+    print(f"  gzip level {settings.response_compression_gzip_level}, "
+          f"brotli quality {settings.response_compression_brotli_quality}"
+          f"{'' if brotli else ' (brotli not installed: uv sync --extra compression)'}")
+    for name, frames in streams.items():
+        raw = b"".join(frames)
+        print(f"  {name}: {len(frames)} frames, {len(raw):,} bytes")
+        for encoding in SUPPORTED_ENCODINGS:
+            _check_frames(frames, encoding)
+            size = _compress_stream(frames, encoding)
+            whole = len(compress_body(raw, encoding))
+            cpu = _cpu_seconds(lambda: _compress_stream(frames, encoding), rounds)
+            print(f"    {encoding:4} per-frame flush {size:9,} bytes ({size / len(raw):6.1%})   "
+                  f"whole body {whole:9,} bytes ({whole / len(raw):6.1%})   "
+                  f"{cpu / len(frames) * 1e6:5.1f} us/frame")
+
+    print(f"  /run body (final output of {body_recording.name}): {len(body):,} bytes")
+    for encoding in SUPPORTED_ENCODINGS:
+        size = len(compress_body(body, encoding))
+        cpu = _cpu_seconds(lambda: compress_body(body, encoding), rounds)
+        print(f"    {encoding:4} {size:9,} bytes ({size / len(body):6.1%})   {cpu * 1e3:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_RECORDING,
+        Path(sys.argv[3]) if len(sys.argv) > 3 else None,
+    )
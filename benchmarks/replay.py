@@ -0,0 +1,92 @@
+"""
+Replay a recorded agent stream as Agents SDK stream events.
+
+A recording holds one event per line:
+
+- ``{"kind": "raw", "data": {...}}``: a Responses API stream event
+- ``{"kind": "run_item", "name": ..., "item_type": ..., "raw_item": {...}}``
+- ``{"kind": "agent_updated", "name": ..., "instructions": ..., "model": ...}``
+
+Real runs are recorded with ``benchmarks.capture``. The default recording,
+``data/synthetic_planner_stream.jsonl``, is synthetic: generated to have the
+shape of a planner run (two handoffs, two tool calls with streamed arguments,
+~700 text deltas), with repetitive filler text that compresses better than
+real output. Prefer a captured recording for absolute numbers.
+"""
+
+import json
+from pathlib import Path
+from typing import List
+
+from agents import Agent
+from agents.items import (
+    HandoffCallItem,
+    HandoffOutputItem,
+    MessageOutputItem,
+    ReasoningItem,
+    ToolCallItem,
+    ToolCallOutputItem,
+)
+from agents.stream_events import (
+    AgentUpdatedStreamEvent,
+    RawResponsesStreamEvent,
+    RunItemStreamEvent,
+    StreamEvent,
+)
+from openai.types.responses import (
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseReasoningItem,
+    ResponseStreamEvent,
+)
+from pydantic import TypeAdapter
+
+DEFAULT_RECORDING = Path(__file__).parent / "data" / "synthetic_planner_stream.jsonl"
+
+# Run item types that can be rebuilt from a recording
+SUPPORTED_ITEM_TYPES = (
+    "message_output_item",
+    "tool_call_item",
+    "tool_call_output_item",
+    "handoff_call_item",
+    "handoff_output_item",
+    "reasoning_item",
+)
+
+_raw_event_adapter = TypeAdapter(ResponseStreamEvent)
+
+
+def load_events(path: Path = DEFAULT_RECORDING) -> List[StreamEvent]:
+    """Load a recording into SDK stream event objects."""
+    agent = Agent(name="Replay Agent")
+    events: List[StreamEvent] = []
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            kind = record["kind"]
+            if kind == "raw":
+                events.append(RawResponsesStreamEvent(data=_raw_event_adapter.validate_python(record["data"])))
+            elif kind == "agent_updated":
+                agent = Agent(name=record["name"], instructions=record["instructions"], model=record["model"])
+                events.append(AgentUpdatedStreamEvent(new_agent=agent))
+            elif kind == "run_item":
+                events.append(RunItemStreamEvent(name=record["name"], item=_run_item(agent, record)))
+    return events
+
+
+def _run_item(agent: Agent, record: dict):
+    item_type = record["item_type"]
+    if item_type == "message_output_item":
+        return MessageOutputItem(agent=agent, raw_item=ResponseOutputMessage.model_validate(record["raw_item"]))
+    if item_type == "tool_call_item":
+        return ToolCallItem(agent=agent, raw_item=ResponseFunctionToolCall.model_validate(record["raw_item"]))
+    if item_type == "tool_call_output_item":
+        return ToolCallOutputItem(agent=agent, raw_item=record["raw_item"], output=record["output"])
+    if item_type == "handoff_call_item":
+        return HandoffCallItem(agent=agent, raw_item=ResponseFunctionToolCall.model_validate(record["raw_item"]))
+    if item_type == "handoff_output_item":
+        # The agent of the next agent_updated event is the real target; only names are streamed
+        return HandoffOutputItem(agent=agent, raw_item=record["raw_item"], source_agent=agent, target_agent=agent)
+    if item_type == "reasoning_item":
+        return ReasoningItem(agent=agent, raw_item=ResponseReasoningItem.model_validate(record["raw_item"]))
+    raise ValueError(f"Unsupported run item type: {item_type}")
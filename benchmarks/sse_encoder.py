@@ -0,0 +1,76 @@
+"""
+Benchmark: SSE encoding throughput for an agent stream recording.
+
+Replays a recording (default: the synthetic ``data/synthetic_planner_stream.jsonl``;
+record real runs with ``benchmarks.capture``) through the previous formatter (kept in
+``_legacy_sse.py``; logs every event at INFO through the app's structlog
+configuration into /dev/null) and through ``src.api.utils.sse``, and reports
+events per second. Both encoders must produce the same JSON payloads, except
+that ``agent_updated`` events carry an ``agent_id`` instead of the instructions.
+
+Usage:
+    uv run -m benchmarks.sse_encoder [rounds] [recording.jsonl]
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import structlog
+
+from benchmarks._legacy_sse import encode_legacy
+from benchmarks.replay import DEFAULT_RECORDING, load_events
+from src.api.utils.sse import encode_stream_event, orjson
+from src.core.logging import configure_logging
+
+
+def _payloads(frames):
+    payloads = [json.loads(frame[len("data: "):]) for frame in frames]
+    for payload in payloads:
+        if payload["type"] == "agent_updated":
+            payload.pop("agent_instructions", None)
+            payload.pop("agent_id", None)
+    return payloads
+
+
+def _events_per_second(encode, events, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for event in events:
+                encode(event)
+        best = min(best, time.perf_counter() - start)
+    return len(events) * rounds / best
+
+
+def main(rounds: int = 20, recording: Path = DEFAULT_RECORDING) -> None:
+    configure_logging()
+    devnull = open(os.devnull, "w")
+    for handler in logging.getLogger().handlers:
+        handler.setStream(devnull)
+    logger = structlog.get_logger("Agent")
+
+    events = load_events(recording)
+    legacy_frames = [encode_legacy(event, logger) for event in events]
+    new_frames = [encode_stream_event(event) for event in events]
+    assert _payloads(legacy_frames) == _payloads(new_frames), "encoders disagree"
+
+    legacy = _events_per_second(lambda event: encode_legacy(event, logger), events, rounds)
+    new = _events_per_second(encode_stream_event, events, rounds)
+
+    print(f"SSE encoding, {recording.name}: {len(events)} events x {rounds} rounds (best of 3), "
+          f"json backend: {'orjson' if orjson else 'stdlib'}")
+    print(f"  before: legacy formatter + json.dumps + INFO log   {legacy:12,.0f} events/s")
+    print(f"  after:  dispatch tables + byte templates           {new:12,.0f} events/s   {new / legacy:5.1f}x")
+    print(f"  stream size: {sum(map(len, legacy_frames)):,} -> {sum(map(len, new_frames)):,} bytes")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_RECORDING
+    )
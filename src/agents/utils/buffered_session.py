@@ -0,0 +1,124 @@
+"""
+Write-buffering wrapper for database sessions used during streaming runs.
+
+``BufferedSession`` keeps items added during a run in memory and writes them to
+the wrapped session in one transaction: at the end of the turn, when the buffer
+reaches a size threshold, or after a debounce interval. Callers must call
+``aclose()`` when the run ends (also on error or cancellation) so nothing is lost.
+"""
+
+import asyncio
+from typing import List, Optional
+
+import structlog
+
+from src.agents.utils.sessions import DatabaseSession
+
+logger = structlog.get_logger(__name__)
+
+
+class BufferedSession:
+    """
+    Session protocol implementation that buffers writes to a DatabaseSession.
+
+    Reads see buffered items as if they were already stored. All access to
+    the wrapped session is serialized, since it shares one AsyncSession.
+    """
+
+    def __init__(
+        self,
+        session: DatabaseSession,
+        flush_interval: Optional[float] = None,
+        max_items: Optional[int] = None
+    ):
+        """
+        Initialize the buffered session.
+
+        Args:
+            session: Session the buffered items are eventually written to
+            flush_interval: Seconds after the first buffered item before a
+                background flush (None or 0 to only flush explicitly)
+            max_items: Flush as soon as this many items are buffered (None to disable)
+        """
+        self.session = session
+        self.session_id = session.chat_id
+        self.flush_interval = flush_interval
+        self.max_items = max_items
+        self._pending: List[dict] = []
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def chat_id(self) -> str:
+        return self.session.chat_id
+
+    async def get_items(self, limit: Optional[int] = None) -> List[dict]:
+        """Retrieve stored items followed by buffered ones."""
+        async with self._lock:
+            items = await self.session.get_items(limit)
+            items = items + self._pending
+        return items if limit is None else items[-limit:]
+
+    async def add_items(self, items: List[dict]) -> None:
+        """Buffer items, flushing if the size threshold is reached."""
+        if not items:
+            return
+
+        self._pending.extend(items)
+        if self.max_items and len(self._pending) >= self.max_items:
+            await self.flush()
+        elif self.flush_interval and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def pop_item(self) -> Optional[dict]:
+        """Remove and return the most recent item, buffered or stored."""
+        async with self._lock:
+            if self._pending:
+                return self._pending.pop()
+            return await self.session.pop_item()
+
+    async def clear_session(self) -> None:
+        """Drop buffered items and clear the stored history."""
+        self._cancel_flush_task()
+        async with self._lock:
+            self._pending.clear()
+            await self.session.clear_session()
+
+    async def flush(self) -> None:
+        """Write all buffered items to the wrapped session in one transaction."""
+        async with self._lock:
+            if not self._pending:
+                return
+
+            items, self._pending = self._pending, []
+            try:
+                await self.session.add_items(items)
+            except BaseException:
+                # Also on cancellation: keep the items so a later flush (e.g. aclose) retries them
+                self._pending = items + self._pending
+                raise
+
+            logger.debug("Flushed buffered session items",
+                        chat_id=self.chat_id,
+                        items_count=len(items))
+
+    async def aclose(self) -> None:
+        """Stop the background flush and write any remaining items."""
+        self._cancel_flush_task()
+        await self.flush()
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        # Detach before flushing so a running flush is never cancelled
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            # Items stay buffered and are retried by the final flush
+            logger.error("Background session flush failed", error=str(e), chat_id=self.chat_id)
+
+    def _cancel_flush_task(self) -> None:
+        """Cancel a pending (still sleeping) background flush."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        self._flush_task = None
@@ -0,0 +1,204 @@
+"""
+Process-level LRU cache of decoded conversation histories.
+
+Entries are keyed by ``chat_id`` and tagged with the chat's ``version`` column.
+Readers validate an entry against the current version (a primary-key lookup)
+before using it, so a write from another worker simply turns the next read
+into a miss. Writers in this process keep entries current (write-through).
+
+Items are stored JSON-encoded and decoded on every hit, so callers always get
+their own dicts (the SDK and callers may mutate them) and see exactly what a
+database read would return.
+"""
+
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+import structlog
+
+from src.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib encoder is used instead
+    orjson = None
+
+logger = structlog.get_logger(__name__)
+
+
+if orjson is not None:
+    def _encode(item: Any) -> bytes:
+        return orjson.dumps(item, default=str)
+
+    _decode = orjson.loads
+else:
+    _json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+
+    def _encode(item: Any) -> bytes:
+        return _json_encoder.encode(item).encode()
+
+    _decode = json.loads
+
+
+@dataclass
+class _CacheEntry:
+    # One JSON document per item
+    items: List[bytes]
+    version: int
+    size: int
+
+
+class ConversationHistoryCache:
+    """
+    Bounded LRU of conversation histories, capped by entry count and bytes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, enabled: bool = True):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of chats kept in memory
+            max_bytes: Memory budget for all cached items (encoded size)
+            enabled: When False every lookup is a miss and writes are ignored
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, chat_id: str, version: int) -> Optional[List[dict]]:
+        """
+        Return the cached history, decoded into new dicts, if it matches ``version``.
+
+        Args:
+            chat_id: Chat identifier
+            version: Current version of the chat row in the database
+
+        Returns:
+            The cached items, or None on a miss or stale entry
+        """
+        entry = self._entries.get(chat_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.version != version:
+            self.stale += 1
+            self.misses += 1
+            self._remove(chat_id)
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(chat_id)
+        return [_decode(item) for item in entry.items]
+
+    def put(self, chat_id: str, items: List[dict], version: int) -> None:
+        """Store the full history of a chat at ``version``."""
+        if not self.enabled:
+            return
+
+        self._remove(chat_id)
+        items = [_encode(item) for item in items]
+        size = sum(map(len, items))
+        if size > self.max_bytes:
+            # Larger than the whole budget - never worth caching
+            return
+
+        self._entries[chat_id] = _CacheEntry(items=items, version=version, size=size)
+        self._total_bytes += size
+        self._evict()
+
+    def append(self, chat_id: str, items: List[dict], version: int) -> None:
+        """
+        Write-through for appended items.
+
+        The entry is only extended if it was at ``version - 1``, i.e. no other
+        writer touched the chat in between; otherwise it is dropped.
+        """
+        entry = self._entries.get(chat_id)
+        if entry is None:
+            return
+
+        if entry.version != version - 1:
+            self._remove(chat_id)
+            return
+
+        encoded = [_encode(item) for item in items]
+        added = sum(map(len, encoded))
+        entry.items.extend(encoded)
+        entry.version = version
+        entry.size += added
+        self._total_bytes += added
+        self._entries.move_to_end(chat_id)
+        self._evict()
+
+    def pop(self, chat_id: str, version: int) -> None:
+        """Write-through for a removed most recent item."""
+        entry = self._entries.get(chat_id)
+        if entry is None:
+            return
+
+        if entry.version != version - 1 or not entry.items:
+            self._remove(chat_id)
+            return
+
+        removed_size = len(entry.items.pop())
+        entry.version = version
+        entry.size -= removed_size
+        self._total_bytes -= removed_size
+
+    def invalidate(self, chat_id: str) -> None:
+        """Drop a chat from the cache."""
+        self._remove(chat_id)
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)."""
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Cache counters and occupancy, for diagnostics endpoints."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def _remove(self, chat_id: str) -> None:
+        entry = self._entries.pop(chat_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            chat_id, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size
+            self.evictions += 1
+            logger.debug("Evicted conversation history from cache", chat_id=chat_id)
+
+
+# Global instance
+history_cache = ConversationHistoryCache(
+    max_entries=settings.history_cache_max_entries,
+    max_bytes=settings.history_cache_max_bytes,
+    enabled=settings.history_cache_enabled,
+)
@@ -1,9 +1,14 @@
 from agents.memory import Session
 from typing import List, Optional
+from sqlalchemy import bindparam, exists, func, insert, literal, null, true
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import DateTime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select
-from src.models.chat import Chat
-import json
+from sqlmodel import select, update, delete
+from src.models.chat import Chat, ChatItem
+from src.agents.utils.history_cache import history_cache
+from src.crud.chat_counts import chat_count_cache
+from src.core.database import read_session_scope, recent_writes
 import structlog
 from datetime import datetime, timezone
 import uuid
@@ -32,6 +37,11 @@ class DatabaseSession:
     """
     Custom session implementation that stores conversation history in PostgreSQL.
     Follows the OpenAI Agents SDK Session protocol.
+    
+    Items are stored append-only in the ``chat_items`` table (one row per item,
+    keyed by ``(chat_id, seq)``), so each write only touches the new items
+    instead of rewriting the whole conversation. Decoded histories are kept in
+    the process-level ``history_cache`` and validated against ``Chat.version``.
     """
     
     def __init__(self, chat_id: str, db_session: AsyncSession, user_id: Optional[str] = None):
@@ -47,42 +57,9 @@ class DatabaseSession:
             raise ValueError(f"Invalid UUID format: {chat_id}")
             
         self.chat_id = chat_id
+        self.session_id = chat_id
         self.db_session = db_session
         self.user_id = user_id
-        self._conversation_history: List[dict] = []
-        self._loaded = False
-    
-    async def _load_conversation_history(self) -> None:
-        """Load conversation history from database if not already loaded."""
-        if self._loaded:
-            return
-            
-        try:
-            # Query by chat_id
-            statement = select(Chat).where(Chat.chat_id == self.chat_id)
-            result = await self.db_session.execute(statement)
-            chat = result.scalars().first()
-            
-            if chat and chat.conversation:
-                # Load existing conversation from database
-                if isinstance(chat.conversation, str):
-                    self._conversation_history = json.loads(chat.conversation)
-                else:
-                    self._conversation_history = chat.conversation
-            else:
-                # Start with empty history if no existing conversation
-                self._conversation_history = []
-                
-            self._loaded = True
-            logger.debug("Loaded conversation history", 
-                        chat_id=self.chat_id, 
-                        items_count=len(self._conversation_history))
-            
-        except Exception as e:
-            logger.error("Failed to load conversation history", 
-                        error=str(e), chat_id=self.chat_id)
-            self._conversation_history = []
-            self._loaded = True
     
     async def get_items(self, limit: Optional[int] = None) -> List[dict]:
         """
@@ -92,110 +69,322 @@ class DatabaseSession:
             limit: Maximum number of items to return (None for all)
             
         Returns:
-            List of conversation items
+            List of conversation items in chronological order
         """
-        await self._load_conversation_history()
-        
-        if limit is None:
-            return self._conversation_history.copy()
-        else:
-            return self._conversation_history[-limit:].copy()
+        try:
+            # Served by the read replica unless this chat was written recently
+            async with read_session_scope(self.db_session, chat_id=self.chat_id) as reader:
+                if history_cache.enabled:
+                    items = await self._get_history_via_cache(reader)
+                    return items if limit is None else items[-limit:]
+                
+                return await self._load_items(limit, reader)
+            
+        except Exception as e:
+            logger.error("Failed to load conversation history", 
+                        error=str(e), chat_id=self.chat_id)
+            return []
     
     async def add_items(self, items: List[dict]) -> None:
         """
         Store new items for this session.
         
+        Only the new items are written; existing history is never rewritten.
+        For an existing chat this is a single statement that bumps the chat row
+        (allocating sequence numbers from ``next_seq``) and inserts the items.
+        
         Args:
             items: List of conversation items to add
         """
-        await self._load_conversation_history()
-        
-        # Add new items to memory
-        self._conversation_history.extend(items)
+        if not items:
+            return
         
-        # Save to database
-        await self._save_to_database()
+        try:
+            now = datetime.now(timezone.utc)
+            version = await self._append_items(items, now)
+            if version is None:
+                # No chat row yet - create it and number the items from 0
+                version = await self._create_chat(len(items))
+                if version is None:
+                    return
+                await self.db_session.execute(
+                    insert(ChatItem),
+                    [
+                        {"chat_id": self.chat_id, "seq": seq, "item": item, "created_at": now}
+                        for seq, item in enumerate(items)
+                    ]
+                )
+            await self.db_session.commit()
+            await recent_writes.mark(self.chat_id, self.user_id)
+            
+            # Write-through: version 0 means the chat was just created with these items
+            if version == 0:
+                history_cache.put(self.chat_id, items, version)
+                chat_count_cache.adjust(self.user_id, total_delta=1, active_delta=1)
+            else:
+                history_cache.append(self.chat_id, items, version)
+            
+            logger.debug("Appended conversation items", 
+                       chat_id=self.chat_id, 
+                       items_count=len(items))
+        except Exception as e:
+            logger.error("Failed to save conversation history", 
+                        error=str(e), chat_id=self.chat_id)
+            history_cache.invalidate(self.chat_id)
+            await self.db_session.rollback()
+            raise
     
     async def pop_item(self) -> Optional[dict]:
         """
         Remove and return the most recent item from this session.
         
+        The delete and the chat row update run as one statement.
+        
         Returns:
             The most recent conversation item or None if empty
         """
-        await self._load_conversation_history()
-        
-        if not self._conversation_history:
-            return None
+        try:
+            chats = Chat.__table__
+            chat_items = ChatItem.__table__
             
-        item = self._conversation_history.pop()
-        
-        # Save updated history to database
-        await self._save_to_database()
-        
-        return item
+            latest_seq = (
+                select(func.max(chat_items.c.seq))
+                .where(chat_items.c.chat_id == self.chat_id)
+                .scalar_subquery()
+            )
+            popped = (
+                delete(chat_items)
+                .where(chat_items.c.chat_id == self.chat_id, chat_items.c.seq == latest_seq)
+                .returning(chat_items.c.item, chat_items.c.seq)
+                .cte("popped")
+            )
+            touched = (
+                update(chats)
+                .where(chats.c.chat_id == self.chat_id, exists(select(popped.c.seq)))
+                .values(
+                    updated_at=datetime.now(timezone.utc),
+                    version=chats.c.version + 1,
+                    message_count=chats.c.message_count - 1
+                )
+                .returning(chats.c.version)
+                .cte("touched")
+            )
+            statement = select(popped.c.item, popped.c.seq, touched.c.version).select_from(
+                popped.outerjoin(touched, true())
+            )
+            
+            result = await self.db_session.execute(statement)
+            row = result.first()
+            await self.db_session.commit()
+            await recent_writes.mark(self.chat_id, self.user_id)
+            if row is None:
+                return None
+            
+            if row.version is None:
+                history_cache.invalidate(self.chat_id)
+            else:
+                history_cache.pop(self.chat_id, row.version)
+            
+            logger.debug("Popped conversation item", chat_id=self.chat_id, seq=row.seq)
+            return row.item
+        except Exception as e:
+            logger.error("Failed to pop conversation item", 
+                        error=str(e), chat_id=self.chat_id)
+            history_cache.invalidate(self.chat_id)
+            await self.db_session.rollback()
+            raise
     
     async def clear_session(self) -> None:
         """Clear all items for this session."""
-        self._conversation_history = []
-        self._loaded = True
-        
-        # Clear from database
-        await self._save_to_database(clear=True)
-    
-    async def _save_to_database(self, clear: bool = False) -> None:
-        """Save current conversation history to database."""
         try:
-            statement = select(Chat).where(Chat.chat_id == self.chat_id)
-            result = await self.db_session.execute(statement)
-            chat = result.scalars().first()
+            await self.db_session.execute(
+                delete(ChatItem).where(ChatItem.chat_id == self.chat_id)
+            )
+            version = await self._reset_chat()
+            await self.db_session.commit()
+            await recent_writes.mark(self.chat_id, self.user_id)
             
-            if chat:
-                # Update existing chat
-                if clear:
-                    chat.conversation = None
-                else:
-                    chat.conversation = self._conversation_history
-                chat.updated_at = datetime.now(timezone.utc)
-                await self.db_session.commit()
-                logger.debug("Updated conversation history", 
-                           chat_id=self.chat_id, 
-                           items_count=len(self._conversation_history))
+            if version is None:
+                history_cache.invalidate(self.chat_id)
             else:
-                # Chat doesn't exist - try to create it if we have user_id
-                if self.user_id:
-                    try:
-                        # Create new chat with the provided chat_id
-                        new_chat = Chat(
-                            chat_id=self.chat_id,  # Use the provided UUID
-                            user_id=self.user_id,
-                            title=f"Chat {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-                            conversation=None if clear else self._conversation_history,
-                            is_active=True,
-                            created_at=datetime.now(timezone.utc),
-                            updated_at=datetime.now(timezone.utc)
-                        )
-                        
-                        self.db_session.add(new_chat)
-                        await self.db_session.commit()
-                        
-                        logger.info("Auto-created new chat for user", 
-                                  chat_id=self.chat_id, 
-                                  user_id=self.user_id,
-                                  items_count=len(self._conversation_history))
-                    except Exception as create_error:
-                        logger.error("Failed to auto-create chat", 
-                                   error=str(create_error), 
-                                   chat_id=self.chat_id, 
-                                   user_id=self.user_id)
-                        await self.db_session.rollback()
-                        raise
-                else:
-                    logger.warning("No chat record found for conversation storage and no user_id provided for auto-creation", 
-                                 chat_id=self.chat_id)
-                
+                history_cache.put(self.chat_id, [], version)
+            if version == 0:
+                chat_count_cache.adjust(self.user_id, total_delta=1, active_delta=1)
+            
+            logger.debug("Cleared conversation history", chat_id=self.chat_id)
         except Exception as e:
-            logger.error("Failed to save conversation history", 
+            logger.error("Failed to clear conversation history", 
                         error=str(e), chat_id=self.chat_id)
+            history_cache.invalidate(self.chat_id)
             await self.db_session.rollback()
             raise
+    
+    async def _get_history_via_cache(self, reader: AsyncSession) -> List[dict]:
+        """
+        Return the full history, served from the process cache when it is current.
+        
+        The chat's version is read first, so an entry loaded here can only be
+        tagged with a version older than (or equal to) the items it holds; a
+        concurrent writer therefore causes a miss, never a stale hit.
+        """
+        result = await reader.execute(
+            select(Chat.version).where(Chat.chat_id == self.chat_id)
+        )
+        version = result.scalar()
+        if version is None:
+            # No chat row means no items (chat_items references chats)
+            history_cache.invalidate(self.chat_id)
+            return []
+        
+        items = history_cache.get(self.chat_id, version)
+        if items is None:
+            items = await self._load_items(reader=reader)
+            history_cache.put(self.chat_id, items, version)
+        return items
+    
+    async def _load_items(self, limit: Optional[int] = None, reader: Optional[AsyncSession] = None) -> List[dict]:
+        """Load items from the database (``reader`` or the primary session), oldest first."""
+        reader = reader or self.db_session
+        if limit is None:
+            statement = (
+                select(ChatItem.item)
+                .where(ChatItem.chat_id == self.chat_id)
+                .order_by(ChatItem.seq)
+            )
+            result = await reader.execute(statement)
+            items = list(result.scalars().all())
+        else:
+            # Tail query: newest `limit` rows via the (chat_id, seq) primary key
+            statement = (
+                select(ChatItem.item)
+                .where(ChatItem.chat_id == self.chat_id)
+                .order_by(ChatItem.seq.desc())
+                .limit(limit)
+            )
+            result = await reader.execute(statement)
+            items = list(reversed(result.scalars().all()))
+        
+        logger.debug("Loaded conversation history", 
+                    chat_id=self.chat_id, 
+                    items_count=len(items))
+        return items
+    
+    async def _append_items(self, items: List[dict], now: datetime) -> Optional[int]:
+        """
+        Append items to an existing chat in a single statement.
+        
+        The chat row update reserves ``len(items)`` sequence numbers from
+        ``next_seq`` and bumps version/message_count; its RETURNING feeds an
+        INSERT ... SELECT over ``jsonb_array_elements`` of the new items.
+        
+        Returns:
+            The chat's new version, or None if the chat row does not exist
+        """
+        chats = Chat.__table__
+        chat_items = ChatItem.__table__
+        count = len(items)
+        
+        touched = (
+            update(chats)
+            .where(chats.c.chat_id == self.chat_id)
+            .values(
+                updated_at=now,
+                next_seq=chats.c.next_seq + count,
+                version=chats.c.version + 1,
+                message_count=chats.c.message_count + count
+            )
+            .returning((chats.c.next_seq - count).label("first_seq"), chats.c.version)
+            .cte("touched")
+        )
+        elements = (
+            func.jsonb_array_elements(bindparam("items", items, type_=JSONB))
+            .table_valued("value", with_ordinality="ordinality")
+            .render_derived()
+        )
+        rows = (
+            select(
+                literal(self.chat_id),
+                touched.c.first_seq + elements.c.ordinality - 1,
+                elements.c.value,
+                literal(now, DateTime(timezone=True))
+            )
+            .select_from(touched)
+            .join(elements, true())
+        )
+        statement = (
+            insert(chat_items)
+            .from_select(["chat_id", "seq", "item", "created_at"], rows)
+            .returning(select(touched.c.version).scalar_subquery())
+            .add_cte(touched)
+        )
+        
+        result = await self.db_session.execute(statement)
+        return result.scalar()
+    
+    async def _reset_chat(self) -> Optional[int]:
+        """
+        Mark the chat as cleared, auto-creating the chat row if needed.
+        
+        Bumps updated_at and version and resets message_count, the legacy
+        conversation column and the rolling summary. Runs inside the caller's
+        transaction; the caller commits.
+        
+        Returns:
+            The chat's new version (0 for a newly created chat), or None if
+            no chat row exists after the call
+        """
+        result = await self.db_session.execute(
+            update(Chat)
+            .where(Chat.chat_id == self.chat_id)
+            .values(
+                updated_at=datetime.now(timezone.utc),
+                version=Chat.version + 1,
+                message_count=0,
+                conversation=null(),
+                summary=None,
+                summary_seq=None
+            )
+            .returning(Chat.version)
+        )
+        version = result.scalar()
+        if version is not None:
+            return version
+        
+        return await self._create_chat(0)
+    
+    async def _create_chat(self, item_count: int) -> Optional[int]:
+        """
+        Create the chat row for this session's chat_id (requires user_id).
+        
+        Runs inside the caller's transaction; the caller inserts the
+        ``item_count`` items numbered from 0 and commits.
+        
+        Returns:
+            0 (the version of a new chat), or None if no user_id is available
+        """
+        if not self.user_id:
+            logger.warning("No chat record found for conversation storage and no user_id provided for auto-creation", 
+                         chat_id=self.chat_id)
+            return None
+        
+        # Chat doesn't exist - create it with the provided chat_id
+        now = datetime.now(timezone.utc)
+        new_chat = Chat(
+            chat_id=self.chat_id,  # Use the provided UUID
+            user_id=self.user_id,
+            title=f"Chat {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+            conversation=None,
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+            version=0,
+            message_count=item_count,
+            next_seq=item_count
+        )
+        self.db_session.add(new_chat)
+        await self.db_session.flush()
+        
+        logger.info("Auto-created new chat for user", 
+                  chat_id=self.chat_id, 
+                  user_id=self.user_id)
+        return 0
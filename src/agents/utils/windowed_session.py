@@ -0,0 +1,373 @@
+"""
+Token-budgeted session mode for long conversations.
+
+``WindowedDatabaseSession`` returns only the most recent items that fit a token
+budget. Older items are folded into a rolling summary that is persisted on the
+chat row (``Chat.summary`` / ``Chat.summary_seq``) and sent to the model as a
+single system item in front of the window. The newest turn (from the last user
+message on) is always sent; items that alone exceed the budget are truncated.
+
+Token counts use tiktoken (a declared dependency); if its encoding cannot be
+loaded, e.g. offline without a cached encoding file, ~4 characters per token
+are assumed instead.
+"""
+
+import json
+from typing import List, Optional, Tuple
+
+from agents import Agent, Runner
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select, update
+import structlog
+
+from src.agents.utils.sessions import DatabaseSession
+from src.core.config import settings
+from src.core.database import read_session_scope, recent_writes
+from src.models.chat import Chat, ChatItem
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - fallback estimate is used instead
+    tiktoken = None
+
+logger = structlog.get_logger(__name__)
+
+# Rows fetched per query while walking the history backwards
+_PAGE_SIZE = 50
+
+# Longest tool output/argument text kept when rendering items for the summarizer
+_MAX_RENDERED_CHARS = 2000
+
+# Smallest size an oversized item is truncated to, in tokens
+_MIN_TRUNCATED_TOKENS = 64
+_TRUNCATION_MARKER = "\n[... truncated]"
+
+_encoding = None
+_encoding_failed = False
+
+
+def estimate_tokens(item: dict) -> int:
+    """
+    Estimate the prompt tokens an item costs.
+
+    Uses tiktoken's ``o200k_base`` encoding when available and falls back to
+    ~4 characters per token otherwise.
+    """
+    global _encoding, _encoding_failed
+    text = json.dumps(item, ensure_ascii=False, default=str)
+
+    if _encoding is None and not _encoding_failed and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.warning("tiktoken encoding unavailable, using character estimate", error=str(e))
+            _encoding_failed = True
+
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+summarizer_agent = Agent(
+    name="Conversation Summarizer",
+    instructions=(
+        "You maintain a running summary of a conversation between a user and an AI assistant "
+        "that designs AI agents. You receive the previous summary (possibly empty) and a "
+        "transcript of the turns that follow it. Produce an updated summary that keeps every "
+        "requirement, decision, constraint, name, open question and tool result the assistant "
+        "may need later. Be concise, use bullet points, and do not invent information."
+    ),
+    model=settings.session_summary_model,
+)
+
+
+class WindowedDatabaseSession(DatabaseSession):
+    """
+    DatabaseSession that sends a rolling summary plus the most recent items.
+
+    The window is only moved when the unsummarized items exceed the token
+    budget; it is then shrunk to ``target_ratio`` of the budget, so a summary
+    is produced every few turns rather than on every turn, and the prompt
+    prefix stays stable in between.
+    """
+
+    def __init__(
+        self,
+        chat_id: str,
+        db_session: AsyncSession,
+        user_id: Optional[str] = None,
+        token_budget: Optional[int] = None,
+        target_ratio: Optional[float] = None
+    ):
+        """
+        Initialize windowed database session.
+
+        Args:
+            chat_id: Unique chat identifier
+            db_session: SQLAlchemy async session for database operations
+            user_id: Optional user ID for auto-creating chats when they don't exist
+            token_budget: Maximum estimated tokens of history sent to the model
+            target_ratio: Fraction of the budget kept when the window is moved
+        """
+        super().__init__(chat_id=chat_id, db_session=db_session, user_id=user_id)
+        self.token_budget = token_budget or settings.session_token_budget
+        self.target_ratio = target_ratio or settings.session_window_target_ratio
+
+    async def get_items(self, limit: Optional[int] = None) -> List[dict]:
+        """
+        Retrieve the summary item (if any) followed by the newest items that fit the budget.
+
+        Args:
+            limit: Maximum number of items to return (None for all)
+
+        Returns:
+            List of conversation items in chronological order
+        """
+        try:
+            # Reads may go to the replica; the summary update always goes to the primary
+            async with read_session_scope(self.db_session, chat_id=self.chat_id) as reader:
+                result = await reader.execute(
+                    select(Chat.summary, Chat.summary_seq).where(Chat.chat_id == self.chat_id)
+                )
+                row = result.first()
+                if row is None:
+                    return []
+
+                summary, summary_seq = row.summary, row.summary_seq
+                summary_tokens = estimate_tokens(_summary_item(summary)) if summary else 0
+                window, overflow = await self._collect_window(
+                    reader, summary_seq, self.token_budget - summary_tokens
+                )
+
+                if overflow:
+                    summary, window = await self._advance_window(reader, summary, summary_seq, window)
+
+            items = [item for _, item, _ in reversed(window)]
+            if summary:
+                items.insert(0, _summary_item(summary))
+
+            logger.debug("Loaded windowed conversation history",
+                        chat_id=self.chat_id,
+                        items_count=len(items),
+                        summarized=bool(summary))
+            return items if limit is None else items[-limit:]
+
+        except Exception as e:
+            logger.error("Failed to load windowed conversation history",
+                        error=str(e), chat_id=self.chat_id)
+            return []
+
+    async def _collect_window(
+        self, reader: AsyncSession, summary_seq: Optional[int], budget: int
+    ) -> Tuple[List[Tuple[int, dict, int]], bool]:
+        """
+        Walk unsummarized items newest-first until the budget is exhausted.
+
+        The newest turn is always collected whole, even past the budget.
+
+        Returns:
+            ``(window, overflow)`` where window holds ``(seq, item, tokens)``
+            newest first and overflow is True if the window exceeds the
+            budget or older unsummarized items did not fit
+        """
+        window: List[Tuple[int, dict, int]] = []
+        used = 0
+        in_newest_turn = True
+        before: Optional[int] = None
+
+        while True:
+            statement = select(ChatItem.seq, ChatItem.item).where(ChatItem.chat_id == self.chat_id)
+            if summary_seq is not None:
+                statement = statement.where(ChatItem.seq >= summary_seq)
+            if before is not None:
+                statement = statement.where(ChatItem.seq < before)
+            statement = statement.order_by(ChatItem.seq.desc()).limit(_PAGE_SIZE)
+
+            result = await reader.execute(statement)
+            rows = result.all()
+
+            for seq, item in rows:
+                tokens = estimate_tokens(item)
+                if not in_newest_turn and used + tokens > budget:
+                    return window, True
+                window.append((seq, item, tokens))
+                used += tokens
+                if item.get("role") == "user":
+                    in_newest_turn = False
+
+            if len(rows) < _PAGE_SIZE:
+                return window, used > budget
+            before = rows[-1].seq
+
+    async def _advance_window(
+        self,
+        reader: AsyncSession,
+        summary: Optional[str],
+        summary_seq: Optional[int],
+        window: List[Tuple[int, dict, int]]
+    ) -> Tuple[Optional[str], List[Tuple[int, dict, int]]]:
+        """
+        Shrink the window to the target size and fold the dropped items into the summary.
+
+        The newest turn is never dropped; if it alone exceeds the target, its
+        largest items are truncated instead.
+        """
+        if not window:
+            return summary, window
+        target = int(self.token_budget * self.target_ratio)
+        kept: List[Tuple[int, dict, int]] = []
+        used = 0
+        in_newest_turn = True
+        for entry in window:
+            if not in_newest_turn and used + entry[2] > target:
+                break
+            kept.append(entry)
+            used += entry[2]
+            if entry[1].get("role") == "user":
+                in_newest_turn = False
+
+        kept = _align_to_turn_start(kept)
+        if not kept:
+            # No user message and nothing but tool outputs: no valid window
+            return summary, kept
+        kept = _fit_window(kept, target)
+        new_start = kept[-1][0]
+
+        statement = select(ChatItem.item).where(
+            ChatItem.chat_id == self.chat_id,
+            ChatItem.seq < new_start
+        )
+        if summary_seq is not None:
+            statement = statement.where(ChatItem.seq >= summary_seq)
+        result = await reader.execute(statement.order_by(ChatItem.seq))
+        dropped = list(result.scalars().all())
+        if not dropped:
+            # Only the newest turn is unsummarized; truncating it is all there is to do
+            return summary, kept
+
+        try:
+            new_summary = await self._summarize(summary, dropped)
+            await self.db_session.execute(
+                update(Chat)
+                .where(Chat.chat_id == self.chat_id)
+                .values(summary=new_summary, summary_seq=new_start)
+            )
+            await self.db_session.commit()
+            await recent_writes.mark(self.chat_id)
+        except Exception as e:
+            # Still send a bounded window; the dropped items are retried next turn
+            logger.error("Failed to update rolling summary",
+                        error=str(e), chat_id=self.chat_id)
+            await self.db_session.rollback()
+            return summary, kept
+
+        logger.info("Advanced conversation window",
+                   chat_id=self.chat_id,
+                   summarized_items=len(dropped),
+                   window_items=len(kept),
+                   summary_seq=new_start)
+        return new_summary, kept
+
+    async def _summarize(self, summary: Optional[str], items: List[dict]) -> str:
+        """Fold ``items`` into the previous summary using the summarizer agent."""
+        transcript = "\n".join(_render_item(item) for item in items)
+        prompt = (
+            f"PREVIOUS SUMMARY:\n{summary or '(none)'}\n\n"
+            f"TRANSCRIPT TO FOLD INTO THE SUMMARY:\n{transcript}"
+        )
+        result = await Runner.run(starting_agent=summarizer_agent, input=prompt)
+        return str(result.final_output)
+
+
+def _summary_item(summary: str) -> dict:
+    """Conversation item carrying the rolling summary."""
+    return {
+        "role": "system",
+        "content": f"Summary of the earlier conversation:\n{summary}"
+    }
+
+
+def _align_to_turn_start(window: List[Tuple[int, dict, int]]) -> List[Tuple[int, dict, int]]:
+    """
+    Drop the oldest items of a newest-first window until it starts at a user message.
+
+    Starting mid-turn could leave a tool output without its call, which the
+    Responses API rejects. If no user message is in the window, only dangling
+    tool outputs are dropped.
+    """
+    for index in range(len(window) - 1, -1, -1):
+        if window[index][1].get("role") == "user":
+            return window[:index + 1]
+
+    while window and window[-1][1].get("type") == "function_call_output":
+        window = window[:-1]
+    return window
+
+
+def _fit_window(window: List[Tuple[int, dict, int]], budget: int) -> List[Tuple[int, dict, int]]:
+    """Truncate the largest items of a window until it fits ``budget`` tokens."""
+    used = sum(tokens for _, _, tokens in window)
+    if used <= budget:
+        return window
+
+    window = list(window)
+    for index in sorted(range(len(window)), key=lambda i: window[i][2], reverse=True):
+        if used <= budget:
+            break
+        seq, item, tokens = window[index]
+        allowed = max(tokens - (used - budget), _MIN_TRUNCATED_TOKENS)
+        if allowed >= tokens:
+            continue
+        truncated = _truncate_item(item, allowed / tokens)
+        truncated_tokens = estimate_tokens(truncated)
+        window[index] = (seq, truncated, truncated_tokens)
+        used += truncated_tokens - tokens
+    return window
+
+
+def _truncate_item(item: dict, ratio: float) -> dict:
+    """
+    Copy of an item with its text (tool output or message content) cut to ``ratio`` of its length.
+
+    Items without such text (e.g. tool calls, whose arguments must stay
+    valid) are returned unchanged.
+    """
+    def cut(text: str) -> str:
+        return text[:int(len(text) * ratio)] + _TRUNCATION_MARKER
+
+    if item.get("type") == "function_call_output" and isinstance(item.get("output"), str):
+        return {**item, "output": cut(item["output"])}
+
+    content = item.get("content")
+    if isinstance(content, str):
+        return {**item, "content": cut(content)}
+    if isinstance(content, list):
+        parts = [
+            {**part, "text": cut(part["text"])}
+            if isinstance(part, dict) and isinstance(part.get("text"), str) else part
+            for part in content
+        ]
+        return {**item, "content": parts}
+    return item
+
+
+def _render_item(item: dict) -> str:
+    """Render a conversation item as one transcript line for the summarizer."""
+    item_type = item.get("type")
+    if item_type == "function_call":
+        text = f"[tool call] {item.get('name')}({item.get('arguments', '')})"
+    elif item_type == "function_call_output":
+        text = f"[tool output] {item.get('output', '')}"
+    elif "role" in item:
+        content = item.get("content")
+        if isinstance(content, list):
+            content = " ".join(
+                part.get("text", "") for part in content if isinstance(part, dict)
+            )
+        text = f"{item['role']}: {content}"
+    else:
+        text = json.dumps(item, ensure_ascii=False, default=str)
+
+    if len(text) > _MAX_RENDERED_CHARS:
+        text = text[:_MAX_RENDERED_CHARS] + " ..."
+    return text
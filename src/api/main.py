@@ -8,10 +8,16 @@ from agents import set_default_openai_api
 
 from src.api.routers.agent_router import router as agent_router
 from src.api.routers.chat_storage import router as chat_storage_router
+from src.api.routers.metrics import router as metrics_router
+from src.api.utils.jobs import job_manager
+from src.api.utils.stream_runs import stream_runs
 from src.core.logging import configure_logging
-from src.core.database import engine
+from src.core.stack_auth import stack_auth_client
+from src.core.database import engine, read_engine, AsyncSessionLocal
+from src.core.migrations import upgrade_schema, migrate_chat_conversations
 from sqlmodel import SQLModel
-from src.models.chat import Chat  # Import Chat model for database creation
+from src.models.chat import Chat, ChatItem  # Import models for database creation
+from src.models.job import AgentJob
 import structlog
 
 logger = structlog.get_logger(__name__)
@@ -32,15 +38,33 @@ async def lifespan(app: FastAPI):
         set_default_openai_api(api_key)
         logger.info("OpenAI API key configured")
     
+    # Shared keep-alive HTTP client for token verification
+    await stack_auth_client.start()
+    
     # Create all tables if they don't exist
     logger.info("Creating database tables (if not exist)...")
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+        await upgrade_schema(conn)
     logger.info("Database tables created/ensured.")
+    
+    # Move legacy Chat.conversation blobs into chat_items rows (idempotent)
+    async with AsyncSessionLocal() as session:
+        await migrate_chat_conversations(session)
+    
+    # Fail jobs whose worker died, then keep this worker's jobs alive
+    await job_manager.start()
     logger.info("AgentWeaver startup complete")
     
     yield
     
+    # Stop background stream runs before their database sessions go away
+    await stream_runs.aclose()
+    await job_manager.aclose()
+    await stack_auth_client.aclose()
+    await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
     logger.info("AgentWeaver shutdown complete")
 
 
@@ -65,6 +89,7 @@ app.add_middleware(
 
 app.include_router(agent_router)         # /* endpoints
 app.include_router(chat_storage_router) # /chats/* endpoints
+app.include_router(metrics_router)      # /metrics
 
 @app.get("/")
 async def root():
@@ -2,7 +2,9 @@ from fastapi import APIRouter
 
 from src.api.utils.agent_router import create_agent_router
 from src.dependencies.database import get_session
+from src.core.config import settings
 from src.agent import planner_supervisor_agent
+from src.executor_agent.agent import executor_supervisor_agent
 
 
 router = APIRouter()
@@ -11,5 +13,7 @@ router = create_agent_router(
     agent=planner_supervisor_agent,
     prefix="/agent",
     agent_name="Agent",
-    get_db_session=get_session
+    get_db_session=get_session,
+    session_mode=settings.planner_session_mode,
+    handoff_agents=[executor_supervisor_agent]
 )
\ No newline at end of file
@@ -1,19 +1,33 @@
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.dependencies.auth import get_current_user
-from src.dependencies.database import get_session
-from src.schemas.chat import ChatCreate, ChatUpdate, ChatResponse, ChatListResponse
+from src.dependencies.database import get_session, get_read_session
+from src.schemas.chat import (
+    ChatCreate, ChatUpdate, ChatResponse, ChatListResponse, ChatSummary, ChatMessagesResponse
+)
 from src.crud.chat import (
     create_chat, get_chat_by_id, get_user_chats, update_chat, 
-    delete_chat, get_chat_count
+    delete_chat, get_chat_count, get_chat_conversation, get_chat_messages
 )
+from src.models.chat import Chat
+from src.api.utils.pagination import encode_cursor, decode_cursor
 import structlog
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/chats", tags=["Chats"])
 
+MAX_MESSAGES_PAGE_SIZE = 200
+MAX_CHATS_PAGE_SIZE = 1000
+
+async def _to_chat_response(session: AsyncSession, chat: Chat) -> ChatResponse:
+    """Build a ChatResponse, loading the conversation from chat_items."""
+    response = ChatResponse.model_validate(chat)
+    response.conversation = await get_chat_conversation(session, chat.chat_id)
+    return response
+
 @router.post("/", response_model=ChatResponse, status_code=status.HTTP_201_CREATED)
 async def create_new_chat(
     chat_data: ChatCreate,
@@ -23,7 +37,7 @@ async def create_new_chat(
     """Create a new chat for the current user."""
     try:
         chat = await create_chat(session, user_data["user_id"], chat_data)
-        return ChatResponse.model_validate(chat)
+        return await _to_chat_response(session, chat)
     except Exception as e:
         logger.error("Failed to create chat", error=str(e), user_id=user_data["user_id"])
         raise HTTPException(
@@ -33,22 +47,52 @@ async def create_new_chat(
 
 @router.get("/", response_model=ChatListResponse)
 async def get_chats(
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_CHATS_PAGE_SIZE),
     active_only: bool = True,
+    cursor: Optional[str] = None,
     user_data: Dict[str, Any] = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
-    """Get all chats for the current user with pagination."""
+    """
+    Get chat summaries for the current user with pagination.
+    
+    Conversations are not included; use GET /chats/{chat_id}/messages.
+    Prefer `cursor` (from `next_cursor`) over `skip`: keyset pages stay fast
+    and consistent while chats are being updated.
+    """
+    after = None
+    if cursor:
+        try:
+            values = decode_cursor(cursor)
+            after = (datetime.fromisoformat(values["updated_at"]), str(values["chat_id"]))
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
     try:
-        chats = await get_user_chats(session, user_data["user_id"], skip, limit, active_only)
+        # Fetch one extra row to know whether another page exists
+        chats = await get_user_chats(session, user_data["user_id"], skip, limit + 1, active_only, after)
         total = await get_chat_count(session, user_data["user_id"], active_only)
         
+        next_cursor = None
+        if len(chats) > limit:
+            chats = chats[:limit]
+            if chats:
+                last = chats[-1]
+                next_cursor = encode_cursor({
+                    "updated_at": last.updated_at.isoformat(),
+                    "chat_id": last.chat_id
+                })
+        
         return ChatListResponse(
-            chats=[ChatResponse.model_validate(chat) for chat in chats],
+            chats=[ChatSummary.model_validate(chat) for chat in chats],
             total=total,
-            skip=skip,
-            limit=limit
+            skip=skip if after is None else 0,
+            limit=limit,
+            next_cursor=next_cursor
         )
     except Exception as e:
         logger.error("Failed to get chats", error=str(e), user_id=user_data["user_id"])
@@ -61,7 +105,7 @@ async def get_chats(
 async def get_chat(
     chat_id: str,
     user_data: Dict[str, Any] = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """Get a specific chat by ID."""
     try:
@@ -72,7 +116,7 @@ async def get_chat(
                 detail="Chat not found"
             )
         
-        return ChatResponse.model_validate(chat)
+        return await _to_chat_response(session, chat)
     except HTTPException:
         raise
     except Exception as e:
@@ -82,6 +126,55 @@ async def get_chat(
             detail="Failed to get chat"
         )
 
+@router.get("/{chat_id}/messages", response_model=ChatMessagesResponse)
+async def get_chat_messages_page(
+    chat_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_MESSAGES_PAGE_SIZE),
+    user_data: Dict[str, Any] = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Get a page of messages for a chat, newest page first.
+    
+    Messages within a page are in chronological order. Pass `next_cursor`
+    back as `cursor` to fetch the previous (older) page.
+    """
+    before_seq = None
+    if cursor:
+        try:
+            before_seq = int(decode_cursor(cursor)["seq"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    try:
+        chat = await get_chat_by_id(session, chat_id, user_data["user_id"])
+        if not chat:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Chat not found"
+            )
+        
+        messages, oldest_seq, has_more = await get_chat_messages(session, chat_id, before_seq, limit)
+        return ChatMessagesResponse(
+            chat_id=chat_id,
+            messages=messages,
+            message_count=chat.message_count,
+            next_cursor=encode_cursor({"seq": oldest_seq}) if has_more else None,
+            has_more=has_more
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get chat messages", error=str(e), chat_id=chat_id)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get chat messages"
+        )
+
 @router.put("/{chat_id}", response_model=ChatResponse)
 async def update_chat_details(
     chat_id: str,
@@ -98,7 +191,7 @@ async def update_chat_details(
                 detail="Chat not found"
             )
         
-        return ChatResponse.model_validate(chat)
+        return await _to_chat_response(session, chat)
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,51 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from src.agents.utils.history_cache import history_cache
+from src.api.utils.jobs import job_manager
+from src.api.utils.run_metrics import run_metrics
+from src.api.utils.stream_runs import stream_runs
+from src.core.config import settings
+from src.core.database import pool_stats
+from src.core.token_cache import token_cache
+
+
+async def require_metrics_token(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Only let scrapers holding METRICS_TOKEN through (``Authorization: Bearer ...``).
+    
+    Without a configured token the endpoint does not exist (404).
+    """
+    if not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), settings.metrics_token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"], dependencies=[Depends(require_metrics_token)])
+
+
+@router.get("")
+async def get_metrics():
+    """
+    Live process metrics for capacity planning.
+    
+    Values are per worker process and reset on restart. Requires
+    ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+    return {
+        "database_pools": pool_stats(),
+        "history_cache": history_cache.stats(),
+        "auth_cache": token_cache.stats(),
+        "stream_runs": stream_runs.stats(),
+        "agent_jobs": job_manager.stats(),
+        "agent_runs": run_metrics.stats(),
+    }
@@ -0,0 +1,84 @@
+"""
+Content-addressed agent metadata.
+
+Stream events refer to agents by ``agent_id``, a hash of the agent's metadata
+(name, instructions, model, tools, handoffs), instead of embedding the full
+instructions in every event. The metadata is served once per id by
+``GET {prefix}/agents/{agent_id}``; because the id changes whenever the
+metadata does, responses can be cached indefinitely.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from agents import Agent
+
+
+class AgentRegistry:
+    """
+    Agents seen by this process, indexed by their content hash.
+    """
+
+    def __init__(self):
+        # id(agent) -> (agent, agent_id); the agent is kept so its id() is never reused
+        self._ids: Dict[int, Tuple[Agent, str]] = {}
+        self._descriptors: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, agent: Agent) -> str:
+        """
+        Register an agent and return its id.
+
+        The hash is computed once per agent object, so this is cheap on the
+        streaming path.
+        """
+        entry = self._ids.get(id(agent))
+        if entry is not None:
+            return entry[1]
+
+        descriptor = describe_agent(agent)
+        agent_id = descriptor["id"]
+        self._ids[id(agent)] = (agent, agent_id)
+        self._descriptors[agent_id] = descriptor
+        return agent_id
+
+    def register_all(self, agents: Iterable[Agent]) -> None:
+        """Register agents and every Agent reachable through their handoffs."""
+        pending = list(agents)
+        while pending:
+            agent = pending.pop()
+            if id(agent) in self._ids:
+                continue
+            self.register(agent)
+            pending.extend(h for h in agent.handoffs if isinstance(h, Agent))
+
+    def get(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Return the metadata of a registered agent id."""
+        return self._descriptors.get(agent_id)
+
+
+def describe_agent(agent: Agent) -> Dict[str, Any]:
+    """Build the metadata of an agent, including its content hash as ``id``."""
+    if isinstance(agent.instructions, str):
+        instructions = agent.instructions
+    elif agent.instructions is None:
+        instructions = None
+    else:
+        instructions = "Dynamic instructions (function-based)"
+
+    descriptor = {
+        "name": agent.name,
+        "instructions": instructions,
+        "model": str(agent.model) if agent.model else None,
+        "tools": [getattr(tool, "name", type(tool).__name__) for tool in agent.tools],
+        "handoffs": [
+            h.name if isinstance(h, Agent) else getattr(h, "agent_name", None)
+            for h in agent.handoffs
+        ],
+    }
+    digest = hashlib.sha256(json.dumps(descriptor, sort_keys=True).encode()).hexdigest()
+    return {"id": digest[:16], **descriptor}
+
+
+# Global instance
+agent_registry = AgentRegistry()
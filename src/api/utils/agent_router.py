@@ -1,28 +1,39 @@
-import json
-import logging
-from typing import Any, AsyncGenerator, Optional, List
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncGenerator, AsyncIterator, Optional, List
 
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, Response, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import from OpenAI Agents SDK
 from agents import Agent, Runner, TResponseInputItem
-from agents.stream_events import (
-    AgentUpdatedStreamEvent, 
-    RawResponsesStreamEvent, 
-    RunItemStreamEvent,
-    StreamEvent
-)
 from agents.items import ItemHelpers
 from agents.run_context import RunContextWrapper
 from openai.types.responses.response_text_delta_event import ResponseTextDeltaEvent
 
 import structlog
 
-from .session_utils import create_session_if_enabled, clear_session, get_session_messages, get_session_info
-from src.dependencies.auth import get_current_user
+from .agent_registry import agent_registry
+from .sse import Frame, encode_sse
+from .coalescing import coalesce_events, encode_events
+from .compression import compress_frames, compress_response, negotiate_encoding
+from .subscriptions import EventGroup, subscribed_events
+from .responses import EventStreamResponse
+from .run_metrics import run_metrics
+from .jobs import JobLimitError, LiveJob, job_manager
+from .stream_runs import parse_event_id, stream_runs
+from .session_utils import buffer_session, create_session_if_enabled, clear_session, get_session_messages, get_session_info, SessionMode
+from .websocket import AgentWebSocket, ChatContext
+from src.dependencies.auth import accept_websocket_user, get_current_user
+from src.agents.utils.buffered_session import BufferedSession
+from src.core.config import settings
+from src.crud.agent_job import get_job
+from src.models.job import AgentJob
 
 
 
@@ -31,6 +42,13 @@ class AgentRequest(BaseModel):
     input: str | list[TResponseInputItem]
     context: Optional[dict[str, Any]] = None
     session_id: Optional[str] = None 
+    # Merge consecutive text/argument deltas into fewer SSE frames (stream only)
+    coalesce_deltas: bool = False
+    coalesce_window_ms: Optional[int] = Field(None, ge=1, le=1000)
+    # Event groups to stream (all when omitted); stream_complete and errors are always sent
+    events: Optional[List[EventGroup]] = None
+    # Short-key wire schema for stream events
+    compact: bool = False
 
 
 class AgentResponse(BaseModel):
@@ -64,7 +82,40 @@ class AgentInfo(BaseModel):
     session_config: dict[str, Any]  # Session configuration info
 
 
-def create_agent_router(agent: Agent, prefix: str, agent_name: str, get_db_session) -> APIRouter:
+class AgentJobResponse(BaseModel):
+    """Status and result of a detached agent run."""
+    job_id: str
+    status: str
+    partial_output: Optional[str] = None
+    final_output: Any = None
+    usage: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+    session_id: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    stream_url: Optional[str] = None
+
+
+class AgentDescriptor(BaseModel):
+    """Agent metadata referenced by agent_id in stream events."""
+    id: str
+    name: str
+    instructions: Optional[str] = None
+    model: Optional[str] = None
+    tools: List[str]
+    handoffs: List[Optional[str]]
+
+
+def create_agent_router(
+    agent: Agent, 
+    prefix: str, 
+    agent_name: str, 
+    get_db_session,
+    session_mode: SessionMode = "full",
+    session_token_budget: Optional[int] = None,
+    handoff_agents: Optional[List[Agent]] = None
+) -> APIRouter:
     """
     Create a standardized router for an agent with run and stream endpoints.
     
@@ -80,6 +131,12 @@ def create_agent_router(agent: Agent, prefix: str, agent_name: str, get_db_sessi
         prefix: URL prefix for the router (e.g., "/chat")
         agent_name: Human-readable name for the agent
         get_db_session: Dependency to get database session
+        session_mode: "full" to send the whole history to the model, or "windowed"
+            to send a rolling summary plus the newest items within a token budget
+        session_token_budget: Token budget for windowed sessions (defaults to settings)
+        handoff_agents: Agents reachable through ``handoff()`` objects, which do not
+            expose their target agent; registered up front so every worker can serve
+            their metadata
     
     Returns:
         APIRouter with agent execution endpoints
@@ -89,16 +146,145 @@ def create_agent_router(agent: Agent, prefix: str, agent_name: str, get_db_sessi
     
     router = APIRouter(prefix=prefix, tags=[agent_name])
     
+    agent_registry.register_all([agent, *(handoff_agents or [])])
+    
+    # Sessions for work that outlives a request (get_db_session must not take parameters)
+    db_session_scope = asynccontextmanager(get_db_session)
+    
+    async def generate_stream(
+        request: AgentRequest,
+        user_id: str,
+        db_session: AsyncSession,
+        job: Optional[LiveJob] = None,
+        chat_session: Optional[Any] = None
+    ) -> AsyncGenerator[Frame, None]:
+        """
+        Frames of one streaming run; also records the result when run as a job.
+        
+        ``chat_session`` is an existing session of ``request.session_id`` to reuse
+        (WebSocket turns); otherwise one is created on ``db_session``.
+        """
+        session = None
+        stream_result = None
+        try:
+            # Automatically create PostgreSQL session if session_id provided.
+            # Writes are buffered so the stream never waits on per-item commits.
+            if chat_session is not None:
+                session = buffer_session(chat_session) if settings.session_buffered_streaming else chat_session
+            else:
+                session = await create_session_if_enabled(
+                    request.session_id, 
+                    db_session, 
+                    user_id,
+                    mode=session_mode,
+                    token_budget=session_token_budget,
+                    buffered=settings.session_buffered_streaming
+                )
+            if session:
+                logger.info(f"Using PostgreSQL session memory for streaming: {request.session_id}")
+            
+            stream_result = Runner.run_streamed(
+                starting_agent=agent,
+                input=request.input,
+                context=request.context,
+                session=session
+            )
+            
+            events = stream_result.stream_events()
+            if job is not None:
+                events = job.track(events)
+            if request.events is not None:
+                # Unsubscribed events are dropped before they are formatted
+                events = subscribed_events(events, request.events)
+            
+            # Encoded straight to SSE bytes; no per-event logging on this path
+            if request.coalesce_deltas:
+                window_ms = request.coalesce_window_ms or settings.stream_coalesce_window_ms
+                frames = coalesce_events(
+                    events,
+                    window_seconds=window_ms / 1000,
+                    max_bytes=settings.stream_coalesce_max_bytes,
+                    compact=request.compact
+                )
+            else:
+                frames = encode_events(events, compact=request.compact)
+            async for frame in frames:
+                yield frame
+            if asyncio.current_task().cancelling():
+                # stream_events() swallows the cancellation and just stops; surface it
+                raise asyncio.CancelledError()
+            
+            usage = _extract_usage_info(stream_result) if hasattr(stream_result, 'usage') else None
+            run_metrics.record_completed(agent_name, usage["total_tokens"] if usage else 0)
+            if job is not None:
+                job.complete(stream_result.final_output, usage)
+            
+            # Send completion event
+            completion_event = {
+                "type": "stream_complete",
+                "final_output": stream_result.final_output,
+                "current_turn": stream_result.current_turn,
+                "usage": usage,
+                "session_id": request.session_id
+            }
+            yield Frame(encode_sse(completion_event, request.compact))
+            
+        except asyncio.CancelledError:
+            # Client gone (or shutdown): stop the run and every nested Runner.run in its tools
+            if stream_result is not None:
+                stream_result.cancel()
+                usage = _extract_usage_info(stream_result)
+                tokens_used = usage["total_tokens"] if usage else 0
+                tokens_saved = run_metrics.record_cancelled(agent_name, tokens_used)
+                logger.info(
+                    "Cancelled streaming run",
+                    session_id=request.session_id,
+                    tokens_used=tokens_used,
+                    estimated_tokens_saved=tokens_saved
+                )
+            raise
+        except Exception as e:
+            logger.error(f"Streaming error: {str(e)}")
+            if job is not None:
+                job.fail(str(e))
+            error_event = {
+                "type": "error", 
+                "message": str(e),
+                "timestamp": str(logger.info.__self__.makeRecord("", 0, "", 0, "", (), None).created),
+                "session_id": request.session_id if hasattr(request, 'session_id') else None
+            }
+            yield Frame(encode_sse(error_event, request.compact))
+        finally:
+            # Flush buffered items on completion, error and client disconnect alike;
+            # shielded so a cancelled stream still persists the turn
+            if isinstance(session, BufferedSession):
+                try:
+                    await asyncio.shield(session.aclose())
+                except Exception as e:
+                    logger.error(f"Failed to flush session {request.session_id}: {e}")
+    
+    async def run_stream(
+        request: AgentRequest,
+        user_id: str,
+        job: Optional[LiveJob] = None
+    ) -> AsyncGenerator[Frame, None]:
+        """Run ``generate_stream`` with a database session of its own (the run outlives the request)."""
+        async with db_session_scope() as db_session:
+            async for frame in generate_stream(request, user_id, db_session, job):
+                yield frame
+    
     @router.post("/run", response_model=AgentResponse)
     async def run_agent(
         request: AgentRequest, 
         db_session: AsyncSession = Depends(get_db_session),
-        user_data: dict = Depends(get_current_user)
+        user_data: dict = Depends(get_current_user),
+        accept_encoding: Optional[str] = Header(None)
     ):
         """
         Run the agent and return the final result.
         
         Automatically uses PostgreSQL session memory if session_id is provided in request.
+        Large results are compressed when compression is enabled and the client accepts it.
         """
         try:
             logger.info(f"Running {agent_name} with input: {request.input}")
@@ -107,7 +293,9 @@ def create_agent_router(agent: Agent, prefix: str, agent_name: str, get_db_sessi
             session = await create_session_if_enabled(
                 request.session_id, 
                 db_session, 
-                user_data["user_id"]
+                user_data["user_id"],
+                mode=session_mode,
+                token_budget=session_token_budget
             )
             if session:
                 logger.info(f"Using PostgreSQL session memory: {request.session_id}")
@@ -122,13 +310,13 @@ def create_agent_router(agent: Agent, prefix: str, agent_name: str, get_db_sessi
             
             logger.info(f"{agent_name} completed successfully")
             
-            return AgentResponse(
+            return await _json_response(AgentResponse(
                 final_output=result.final_output,
                 success=True,
                 usage=_extract_usage_info(result),
                 response_id=_extract_response_id(result),
                 session_id=request.session_id
-            )
+            ), accept_encoding)
             
         except Exception as e:
             logger.error(f"Error running {agent_name}: {e}")
@@ -142,68 +330,155 @@ def create_agent_router(agent: Agent, prefix: str, agent_name: str, get_db_sessi
     @router.post("/stream")
     async def stream_agent(
         request: AgentRequest, 
-        db_session: AsyncSession = Depends(get_db_session),
-        user_data: dict = Depends(get_current_user)
+        user_data: dict = Depends(get_current_user),
+        last_event_id: Optional[str] = Header(None),
+        accept_encoding: Optional[str] = Header(None)
     ):
         """
         Stream agent responses with events and automatic PostgreSQL session support.
         
         Automatically uses PostgreSQL session memory if session_id is provided in request.
+        
+        The run is driven in the background and every frame carries an event id.
+        A reconnect sending ``Last-Event-ID`` re-attaches to the same run and only
+        receives the frames it missed; no new run is started.
+        
+        When compression is enabled and accepted, frames are compressed with a
+        flush after each one, so they are not delayed.
         """
-        async def generate_stream() -> AsyncGenerator[str, None]:
-            try:
-                # Automatically create PostgreSQL session if session_id provided
-                session = await create_session_if_enabled(
-                    request.session_id, 
-                    db_session, 
-                    user_data["user_id"]
-                )
-                if session:
-                    logger.info(f"Using PostgreSQL session memory for streaming: {request.session_id}")
-                
-                stream_result = Runner.run_streamed(
-                    starting_agent=agent,
-                    input=request.input,
-                    context=request.context,
-                    session=session
-                )
-                
-                async for event in stream_result.stream_events():
-                    # Process each event type with proper serialization
-                    formatted_event = _format_stream_event(event, logger)
-                    if formatted_event:
-                        yield f"data: {json.dumps(formatted_event)}\n\n"
-                
-                # Send completion event
-                completion_event = {
-                    "type": "stream_complete",
-                    "final_output": stream_result.final_output,
-                    "current_turn": stream_result.current_turn,
-                    "usage": _extract_usage_info(stream_result) if hasattr(stream_result, 'usage') else None,
-                    "session_id": request.session_id
-                }
-                yield f"data: {json.dumps(completion_event)}\n\n"
-                
-            except Exception as e:
-                logger.error(f"Streaming error: {str(e)}")
-                error_event = {
-                    "type": "error", 
-                    "message": str(e),
-                    "timestamp": str(logger.info.__self__.makeRecord("", 0, "", 0, "", (), None).created),
-                    "session_id": request.session_id if hasattr(request, 'session_id') else None
-                }
-                yield f"data: {json.dumps(error_event)}\n\n"
+        encoding = negotiate_encoding(accept_encoding, stream=True)
+        if last_event_id:
+            return _attach_stream_run(last_event_id, user_data["user_id"], encoding=encoding)
         
-        return StreamingResponse(
-            generate_stream(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Cache-Control"
-            }
+        run = stream_runs.start(run_stream(request, user_data["user_id"]), user_data["user_id"])
+        return _sse_response(run.frames(), encoding)
+
+    @router.get("/stream/{run_id}")
+    async def attach_stream(
+        run_id: str,
+        user_data: dict = Depends(get_current_user),
+        last_event_id: Optional[str] = Header(None),
+        accept_encoding: Optional[str] = Header(None)
+    ):
+        """
+        Re-attach to a running (or recently finished) stream.
+        
+        Replays the buffered frames after ``Last-Event-ID``, or from the start of the buffer.
+        """
+        encoding = negotiate_encoding(accept_encoding, stream=True)
+        if last_event_id:
+            return _attach_stream_run(last_event_id, user_data["user_id"], run_id=run_id, encoding=encoding)
+        run = stream_runs.get(run_id, user_data["user_id"])
+        if run is None:
+            raise HTTPException(status_code=404, detail="Stream run not found or expired")
+        return _sse_response(run.frames(), encoding)
+
+    @router.post("/jobs", response_model=AgentJobResponse, status_code=202)
+    async def submit_job(
+        request: AgentRequest,
+        user_data: dict = Depends(get_current_user)
+    ):
+        """
+        Start the agent as a detached background run and return its job id.
+        
+        Poll ``GET {prefix}/jobs/{job_id}`` for status and result, or attach to
+        the run's event stream with ``GET {prefix}/jobs/{job_id}/stream``.
+        """
+        record = AgentJob(
+            user_id=user_data["user_id"],
+            agent_name=agent_name,
+            session_id=request.session_id
         )
+        job = LiveJob(record)
+        try:
+            await job_manager.submit(job, run_stream(request, user_data["user_id"], job))
+        except JobLimitError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        
+        logger.info(f"Submitted {agent_name} job {record.job_id}")
+        return _job_response(job, record, prefix)
+
+    @router.get("/jobs/{job_id}", response_model=AgentJobResponse)
+    async def get_job_status(
+        job_id: str,
+        db_session: AsyncSession = Depends(get_db_session),
+        user_data: dict = Depends(get_current_user)
+    ):
+        """
+        Get the status, partial output, usage and (once finished) result of a job.
+        """
+        job = job_manager.get(job_id, user_data["user_id"])
+        if job is not None:
+            return _job_response(job, job.record, prefix)
+        
+        # Finished, or running on another worker
+        record = await get_job(db_session, job_id, user_data["user_id"])
+        if record is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return _job_response(None, record, prefix)
+
+    @router.get("/jobs/{job_id}/stream")
+    async def attach_job_stream(
+        job_id: str,
+        user_data: dict = Depends(get_current_user),
+        last_event_id: Optional[str] = Header(None),
+        accept_encoding: Optional[str] = Header(None)
+    ):
+        """
+        Attach to the event stream of a job running on this worker.
+        
+        Replays the buffered frames after ``Last-Event-ID``, or from the start of the buffer.
+        """
+        encoding = negotiate_encoding(accept_encoding, stream=True)
+        if last_event_id:
+            return _attach_stream_run(last_event_id, user_data["user_id"], run_id=job_id, encoding=encoding)
+        run = stream_runs.get(job_id, user_data["user_id"])
+        if run is None:
+            raise HTTPException(status_code=404, detail="Job stream not available; poll the job for its result")
+        return _sse_response(run.frames(), encoding)
+
+    @router.websocket("/ws")
+    async def agent_websocket(websocket: WebSocket):
+        """
+        Run many turns, and cancel them, over one authenticated connection.
+        
+        Turns are streamed with the same event payloads as ``/stream``, each
+        wrapped as ``{"turn_id": ..., "event": ...}``. The database session of
+        every chat used on the connection is kept for its lifetime, so
+        follow-up turns skip session setup. See ``websocket.py`` for the protocol
+        and ``accept_websocket_user`` for authentication (header or first message).
+        """
+        user_data = await accept_websocket_user(websocket)
+        if user_data is None:
+            return
+        user_id = user_data["user_id"]
+        
+        async with AsyncExitStack() as chat_scopes:
+            async def open_chat(chat_id: Optional[str]) -> ChatContext:
+                db_session = await chat_scopes.enter_async_context(db_session_scope())
+                session = await create_session_if_enabled(
+                    chat_id,
+                    db_session,
+                    user_id,
+                    mode=session_mode,
+                    token_budget=session_token_budget
+                )
+                return ChatContext(db_session, session)
+            
+            def run_turn(request: AgentRequest, chat: ChatContext) -> AsyncGenerator[Frame, None]:
+                return generate_stream(request, user_id, chat.db_session, chat_session=chat.session)
+            
+            connection = AgentWebSocket(
+                websocket,
+                parse_request=AgentRequest.model_validate,
+                open_chat=open_chat,
+                run_turn=run_turn,
+                max_concurrent_turns=settings.ws_max_concurrent_turns,
+                send_queue_size=settings.ws_send_queue_max_messages
+            )
+            logger.info(f"WebSocket connected for {agent_name}", user_id=user_id)
+            await connection.serve()
+            logger.info(f"WebSocket closed for {agent_name}", user_id=user_id)
 
     @router.get("/info", response_model=AgentInfo)
     async def get_agent_info():
@@ -234,11 +509,15 @@ def create_agent_router(agent: Agent, prefix: str, agent_name: str, get_db_sessi
             endpoints = {
                 "run": f"{prefix}/run",
                 "stream": f"{prefix}/stream",
-                "info": f"{prefix}/info"
+                "attach_stream": f"{prefix}/stream/{{run_id}}",
+                "jobs": f"{prefix}/jobs",
+                "ws": f"{prefix}/ws",
+                "info": f"{prefix}/info",
+                "agents": f"{prefix}/agents/{{agent_id}}"
             }
             
             # Get session configuration
-            session_config = get_session_info()
+            session_config = get_session_info(session_mode, session_token_budget)
             
             return AgentInfo(
                 name=agent_name,
@@ -254,206 +533,85 @@ def create_agent_router(agent: Agent, prefix: str, agent_name: str, get_db_sessi
             logger.error(f"Error getting {agent_name} info: {e}")
             raise HTTPException(status_code=500, detail=str(e))
     
+    @router.get("/agents/{agent_id}", response_model=AgentDescriptor)
+    async def get_agent_descriptor(agent_id: str, request: Request):
+        """
+        Get the metadata of an agent referenced by agent_id in stream events.
+        
+        The id is a hash of the metadata, so responses never change and are cacheable forever.
+        """
+        descriptor = agent_registry.get(agent_id)
+        if descriptor is None:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        
+        headers = {
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "ETag": f'"{agent_id}"'
+        }
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(descriptor, headers=headers)
+    
     return router
 
 
-def _format_stream_event(event: StreamEvent, logger: logging.Logger) -> Optional[dict[str, Any]]:
-    """
-    Format stream events into a consistent, frontend-friendly structure.
-    
-    This avoids double JSON encoding and provides clean event structures.
-    """
-    try:
-        formatted_event = None
-        if isinstance(event, RawResponsesStreamEvent):
-            formatted_event = _format_raw_response_event(event)
-        elif isinstance(event, RunItemStreamEvent):
-            formatted_event = _format_run_item_event(event)
-        elif isinstance(event, AgentUpdatedStreamEvent):
-            formatted_event = _format_agent_updated_event(event)
-        else:
-            # Fallback for unknown event types
-            logger.warning(f"Unknown event type: {type(event)}")
-            formatted_event = {
-                "type": "unknown_event",
-                "event_class": str(type(event).__name__),
-                "data": str(event) if event else None
-            }
-        
-        if formatted_event:
-            logger.info(f"{formatted_event}")
-        return formatted_event
-    except Exception as e:
-        logger.error(f"Error formatting event {type(event)}: {e}")
-        return None
+def _sse_response(frames: AsyncIterator[bytes], encoding: Optional[str] = None) -> StreamingResponse:
+    """Wrap SSE frames in a streaming response that detaches from the run on disconnect."""
+    headers = {
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Headers": "Cache-Control, Last-Event-ID"
+    }
+    if encoding is not None:
+        frames = compress_frames(frames, encoding)
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = "Accept-Encoding"
+    return EventStreamResponse(frames, media_type="text/event-stream", headers=headers)
 
 
-def _format_raw_response_event(event: RawResponsesStreamEvent) -> dict[str, Any]:
-    """Format raw response events with proper JSON structure."""
-    base_event = {
-        "type": "raw_response",
-        "event_type": event.data.type if hasattr(event.data, 'type') else 'unknown',
-        "sequence_number": getattr(event.data, 'sequence_number', None),
-    }
-    
-    # Handle specific raw event types
-    if hasattr(event.data, 'type'):
-        event_type = event.data.type
-        
-        # Text streaming events
-        if event_type == "response.output_text.delta":
-            base_event.update({
-                "delta": getattr(event.data, 'delta', ''),
-                "content_index": getattr(event.data, 'content_index', 0),
-                "item_id": getattr(event.data, 'item_id', None),
-                "output_index": getattr(event.data, 'output_index', 0)
-            })
-        
-        # Reasoning events (for models like deepseek-reasoner)
-        elif event_type == "response.reasoning_summary_text.delta":
-            base_event.update({
-                "delta": getattr(event.data, 'delta', ''),
-                "reasoning": True
-            })
-        
-        # Refusal events
-        elif event_type == "response.refusal.delta":
-            base_event.update({
-                "delta": getattr(event.data, 'delta', ''),
-                "refusal": True
-            })
-            
-        # Capture tool name when tool call starts 
-        elif event_type == "response.output_item.added":  
-            item_obj = getattr(event.data, 'item', None)  
-            base_event.update({  
-                "output_index": getattr(event.data, 'output_index', 0),  
-                "item_type": getattr(item_obj, 'type', None) if item_obj else None  
-            })  
-              
-            # Extract tool name if this is a function tool call  
-            if item_obj and hasattr(item_obj, 'name'):  
-                base_event.update({  
-                    "tool_name": item_obj.name,  # Tool name available here!  
-                    "call_id": getattr(item_obj, 'call_id', None)  
-                })
-        
-        # Function call arguments
-        elif event_type == "response.function_call_arguments.delta":
-            base_event.update({
-                "delta": getattr(event.data, 'delta', ''),
-                "function_call": True,
-                "call_id": getattr(event.data, 'call_id', None)
-            })
-        
-        # Response lifecycle events
-        elif event_type in ["response.created", "response.completed"]:
-            response_obj = getattr(event.data, 'response', None)
-            base_event.update({
-                "response_id": getattr(response_obj, 'id', None) if response_obj else None,
-                "status": getattr(response_obj, 'status', None) if response_obj else None
-            })
-        
-        # Content lifecycle events
-        elif event_type in ["response.content_part.added", "response.content_part.done"]:
-            base_event.update({
-                "content_index": getattr(event.data, 'content_index', 0),
-                "item_id": getattr(event.data, 'item_id', None)
-            })
-        
-        # Output item events
-        elif event_type in ["response.output_item.added", "response.output_item.done"]:
-            item_obj = getattr(event.data, 'item', None)
-            base_event.update({
-                "output_index": getattr(event.data, 'output_index', 0),
-                "item_type": getattr(item_obj, 'type', None) if item_obj else None
-            })
-        
-        # Text completion events
-        elif event_type == "response.output_text.done":
-            base_event.update({
-                "text": getattr(event.data, 'text', ''),
-                "content_index": getattr(event.data, 'content_index', 0),
-                "item_id": getattr(event.data, 'item_id', None)
-            })
-    
-    return base_event
+async def _json_response(model: BaseModel, accept_encoding: Optional[str]) -> Any:
+    """Return a response model, compressed if it is large and the client accepts it."""
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is None:
+        return model
+    # Compressed in a worker thread: final reports can be large
+    return await run_in_threadpool(compress_response, JSONResponse(jsonable_encoder(model)), encoding)
 
 
-def _format_run_item_event(event: RunItemStreamEvent) -> dict[str, Any]:
-    """Format run item events (semantic agent events)."""
-    base_event = {
-        "type": "run_item",
-        "name": event.name,
-        "item_type": getattr(event.item, 'type', None) if event.item else None,
-    }
-        
-    # Handle specific run item types
-    if event.name == "message_output_created":
-        base_event.update({
-            "role": getattr(event.item, 'role', None),
-            "status": getattr(event.item, 'status', None),
-            "message_id": getattr(event.item, 'id', None)
-        })
-    
-    elif event.name == "tool_called":
-        base_event.update({
-            "tool_name": getattr(event.item.raw_item, 'name', None),
-            "tool_arguments": getattr(event.item.raw_item, 'arguments', None),
-            "call_id": getattr(event.item.raw_item, 'id', None)
-        })
-    
-    elif event.name == "tool_output":
-        base_event.update({
-            "tool_name": getattr(event.item, 'name', None),
-            "output": getattr(event.item, 'output', None),
-            "call_id": getattr(event.item, 'id', None)
-        })
-    
-    elif event.name == "handoff_requested":
-        base_event.update({
-            "target_agent": getattr(event.item, 'target_agent_name', None),
-            "reason": getattr(event.item, 'reason', None)
-        })
+def _attach_stream_run(
+    last_event_id: str,
+    user_id: str,
+    run_id: Optional[str] = None,
+    encoding: Optional[str] = None
+) -> StreamingResponse:
+    """Resume a stream run after the frame named by a Last-Event-ID header."""
+    parsed = parse_event_id(last_event_id)
+    if parsed is None or (run_id is not None and parsed[0] != run_id):
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
     
-    elif event.name == "handoff_occured":
-        base_event.update({
-            "target_agent": getattr(event.item, 'target_agent_name', None),
-            "previous_agent": getattr(event.item, 'previous_agent_name', None)
-        })
-    
-    elif event.name == "reasoning_item_created":
-        base_event.update({
-            "reasoning_content": getattr(event.item, 'content', None)
-        })
-    
-    # MCP-related events
-    elif event.name == "mcp_approval_requested":
-        base_event.update({
-            "tool_name": getattr(event.item, 'tool_name', None),
-            "server_name": getattr(event.item, 'server_name', None)
-        })
-    
-    elif event.name == "mcp_list_tools":
-        base_event.update({
-            "server_name": getattr(event.item, 'server_name', None),
-            "tools": getattr(event.item, 'tools', [])
-        })
-    
-    return base_event
-
-
-def _format_agent_updated_event(event: AgentUpdatedStreamEvent) -> dict[str, Any]:
-    """Format agent updated events (handoffs)."""
-    new_agent = event.new_agent
-    return {
-        "type": "agent_updated",
-        "agent_name": new_agent.name,
-        "agent_instructions": new_agent.instructions if isinstance(new_agent.instructions, str) else "Dynamic instructions",
-        "model": str(new_agent.model) if new_agent.model else None,
-        "tools_count": len(new_agent.tools),
-        "handoffs_count": len(new_agent.handoffs)
-    }
+    run = stream_runs.get(parsed[0], user_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Stream run not found or expired")
+    return _sse_response(run.frames(after=parsed[1]), encoding)
+
+
+def _job_response(job: Optional[LiveJob], record: AgentJob, prefix: str) -> AgentJobResponse:
+    """Build a job response from live state (if the job runs here) and its record."""
+    running = record.status in ("queued", "running")
+    return AgentJobResponse(
+        job_id=record.job_id,
+        status=record.status,
+        partial_output=job.partial_output if job is not None and running else None,
+        final_output=record.final_output,
+        usage=record.usage,
+        error=record.error,
+        session_id=record.session_id,
+        created_at=record.created_at,
+        started_at=record.started_at,
+        finished_at=record.finished_at,
+        stream_url=f"{prefix}/jobs/{record.job_id}/stream" if running else None
+    )
 
 
 def _extract_usage_info(result) -> Optional[dict[str, Any]]:
@@ -0,0 +1,114 @@
+"""
+Slow-consumer handling for stream connections.
+
+Each connection reads a run's frames from the run's ring buffer at its own pace;
+how far it is behind the producer is its send queue depth. Memory stays bounded
+by the ring buffer either way, but a connection that keeps falling behind would
+eventually lose frames to eviction. Once its depth exceeds a bound, the backlog
+is shrunk with the configured policy before it is written:
+
+- ``coalesce``: merge consecutive text / argument deltas of the same item
+- ``drop_lifecycle``: drop non-essential lifecycle events (response created /
+  completed, content parts, non-tool output items)
+- ``both``: both of the above
+- ``none``: send the backlog as is
+"""
+
+from typing import List, Literal, Optional, Tuple
+
+from .coalescing import PendingDelta, delta_key
+from .sse import Frame
+from .subscriptions import event_group
+
+SlowConsumerPolicy = Literal["coalesce", "drop_lifecycle", "both", "none"]
+
+
+class SendQueueMetrics:
+    """
+    Send queue depth of the open stream connections, and what the policy did.
+    """
+
+    def __init__(self):
+        self._depths: dict = {}
+        self.peak_depth = 0
+        self.degraded_batches = 0
+        self.frames_merged = 0
+        self.frames_dropped = 0
+
+    def observe(self, connection: object, depth: int) -> None:
+        """Record the current depth of a connection's send queue."""
+        self._depths[id(connection)] = depth
+        self.peak_depth = max(self.peak_depth, depth)
+
+    def discard(self, connection: object) -> None:
+        """Forget a closed connection."""
+        self._depths.pop(id(connection), None)
+
+    def stats(self) -> dict:
+        """Depth gauges and policy counters, for diagnostics endpoints."""
+        depths = self._depths.values()
+        return {
+            "connections": len(self._depths),
+            "queued_frames": sum(depths),
+            "max_queued_frames": max(depths, default=0),
+            "peak_queued_frames": self.peak_depth,
+            "degraded_batches": self.degraded_batches,
+            "frames_merged": self.frames_merged,
+            "frames_dropped": self.frames_dropped,
+        }
+
+
+def relieve_backlog(
+    backlog: List[Tuple[int, Frame]],
+    policy: SlowConsumerPolicy,
+    metrics: SendQueueMetrics
+) -> List[Tuple[int, bytes]]:
+    """
+    Shrink a connection's backlog of ``(seq, frame)`` with ``policy``.
+
+    A merged frame is sent with the sequence number of the last frame merged
+    into it, so a reconnect resumes after everything it contained.
+
+    Returns:
+        ``(seq, data)`` pairs to send
+    """
+    coalesce = policy in ("coalesce", "both")
+    drop_lifecycle = policy in ("drop_lifecycle", "both")
+    metrics.degraded_batches += 1
+
+    out: List[Tuple[int, bytes]] = []
+    pending: Optional[PendingDelta] = None
+    pending_seq = 0
+    pending_compact = False
+
+    for seq, frame in backlog:
+        event = frame.event
+        if event is None:
+            key = None
+        else:
+            if drop_lifecycle and event_group(event) == "lifecycle":
+                metrics.frames_dropped += 1
+                continue
+            key = delta_key(event) if coalesce else None
+
+        if key is not None and pending is not None and pending.key == key:
+            pending.add(event.data)
+            pending_seq = seq
+            metrics.frames_merged += 1
+            continue
+
+        if pending is not None:
+            out.append((pending_seq, pending.frame(pending_compact)))
+            pending = None
+
+        if key is not None:
+            pending = PendingDelta(key, event.data, deadline=0)
+            pending.add(event.data)
+            pending_seq = seq
+            pending_compact = frame.compact
+        else:
+            out.append((seq, frame.data))
+
+    if pending is not None:
+        out.append((pending_seq, pending.frame(pending_compact)))
+    return out
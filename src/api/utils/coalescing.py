@@ -0,0 +1,124 @@
+"""
+Optional delta coalescing for agent streams.
+
+Consecutive text / function-argument deltas of the same output item are merged
+into one SSE frame. A merged frame is flushed when its time window elapses,
+when it reaches a byte threshold, or as soon as any other event arrives, so
+structural events (tool calls, handoffs, ``stream_complete``) are never delayed
+or reordered. Merged frames look exactly like single delta events; their
+``sequence_number`` is that of the last merged event.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from agents.stream_events import StreamEvent
+
+from .sse import DELTA_EVENT_TYPES, Frame, encode_delta, encode_stream_event
+
+
+class PendingDelta:
+    """Deltas of one output item waiting to be sent as one frame."""
+
+    __slots__ = ("key", "data", "parts", "sequence_number", "size", "deadline")
+
+    def __init__(self, key: Tuple[Any, ...], data: Any, deadline: float):
+        self.key = key
+        self.data = data
+        self.parts: List[str] = []
+        self.sequence_number: Optional[int] = None
+        self.size = 0
+        self.deadline = deadline
+
+    def add(self, data: Any) -> None:
+        self.parts.append(data.delta)
+        self.sequence_number = data.sequence_number
+        self.size += len(data.delta.encode())
+
+    def frame(self, compact: bool) -> bytes:
+        return encode_delta(self.data, "".join(self.parts), self.sequence_number, compact)
+
+
+def delta_key(event: StreamEvent) -> Optional[Tuple[Any, ...]]:
+    """Merge key of a coalescible delta event, None for every other event."""
+    if event.type != "raw_response_event":
+        return None
+    data = event.data
+    if data.type not in DELTA_EVENT_TYPES:
+        return None
+    return (data.type, data.item_id, getattr(data, "output_index", None), getattr(data, "content_index", None))
+
+
+async def encode_events(events: AsyncIterator[StreamEvent], compact: bool = False) -> AsyncIterator[Frame]:
+    """Encode every event as its own SSE frame."""
+    async for event in events:
+        data = encode_stream_event(event, compact)
+        if data:
+            yield Frame(data, event, compact)
+
+
+async def coalesce_events(
+    events: AsyncIterator[StreamEvent],
+    window_seconds: float,
+    max_bytes: int,
+    compact: bool = False
+) -> AsyncIterator[Frame]:
+    """
+    Encode events, merging consecutive deltas of the same item.
+
+    Args:
+        events: SDK stream events
+        window_seconds: Longest time the first delta of a frame is held back
+        max_bytes: Flush a merged frame once its deltas reach this many UTF-8 bytes
+        compact: Use the short-key schema
+    """
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    pending: Optional[PendingDelta] = None
+    # The next event is awaited as a task so a window timeout never cancels the SDK stream
+    next_event: Optional[asyncio.Future] = None
+
+    try:
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(iterator.__anext__())
+
+            if pending is not None:
+                timeout = max(pending.deadline - loop.time(), 0)
+                done, _ = await asyncio.wait((next_event,), timeout=timeout)
+                if not done:
+                    yield Frame(pending.frame(compact))
+                    pending = None
+                    continue
+            else:
+                await asyncio.wait((next_event,))
+
+            completed, next_event = next_event, None
+            try:
+                event = completed.result()
+            except StopAsyncIteration:
+                break
+
+            key = delta_key(event)
+            if pending is not None and pending.key != key:
+                yield Frame(pending.frame(compact))
+                pending = None
+
+            if key is None:
+                data = encode_stream_event(event, compact)
+                if data:
+                    yield Frame(data, event, compact)
+                continue
+
+            if pending is None:
+                pending = PendingDelta(key, event.data, loop.time() + window_seconds)
+            pending.add(event.data)
+            if pending.size >= max_bytes:
+                yield Frame(pending.frame(compact))
+                pending = None
+
+        if pending is not None:
+            yield Frame(pending.frame(compact))
+    finally:
+        if next_event is not None and not next_event.done():
+            next_event.cancel()
@@ -0,0 +1,148 @@
+"""
+Opt-in compression of agent responses.
+
+Event streams are compressed frame by frame: every frame is followed by a sync
+flush, so the client can decode it as soon as it arrives while the compressor
+keeps its history across frames (repeated keys and event types cost almost
+nothing after the first frame). Complete JSON bodies are compressed in one go
+when they reach a size threshold; smaller ones are sent as is.
+
+The encoding is negotiated from ``Accept-Encoding``. Brotli (``br``) needs the
+``compression`` extra (``uv sync --extra compression``); without it only gzip
+is offered. When a client accepts both, bodies prefer brotli and streams
+prefer gzip. ``benchmarks/compression.py`` measures both on a captured
+transcript (``benchmarks/capture.py``) and is the place to check that
+choice against real traffic.
+"""
+
+import zlib
+from typing import AsyncIterator, Optional
+
+from starlette.responses import Response
+
+from src.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip is used instead
+    brotli = None
+
+# Preferred first when the client accepts both equally
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+STREAM_ENCODINGS = tuple(reversed(SUPPORTED_ENCODINGS))
+
+
+def negotiate_encoding(accept_encoding: Optional[str], stream: bool = False) -> Optional[str]:
+    """
+    Pick the response encoding for an ``Accept-Encoding`` header.
+
+    Args:
+        accept_encoding: Header value, e.g. ``"gzip, deflate, br;q=0.9"``
+        stream: Negotiate for an event stream rather than a complete body
+
+    Returns:
+        "br", "gzip", or None to send the response uncompressed (also when
+        compression is disabled)
+    """
+    if not settings.response_compression_enabled or not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for coding in STREAM_ENCODINGS if stream else SUPPORTED_ENCODINGS:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class StreamCompressor:
+    """
+    Compressor for one response stream that flushes after every chunk.
+    """
+
+    def __init__(self, encoding: str):
+        """
+        Initialize the compressor.
+
+        Args:
+            encoding: "br" or "gzip" (see ``negotiate_encoding``)
+        """
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.response_compression_brotli_quality)
+        else:
+            # wbits=31: gzip container
+            self._compressor = zlib.compressobj(settings.response_compression_gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk; the result is decodable without any later bytes."""
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """End the compressed stream."""
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+async def compress_frames(frames: AsyncIterator[bytes], encoding: str) -> AsyncIterator[bytes]:
+    """
+    Compress an event stream frame by frame.
+
+    The source iterator is closed with this one, so a disconnect reaches it
+    immediately.
+    """
+    compressor = StreamCompressor(encoding)
+    try:
+        async for frame in frames:
+            yield compressor.compress(frame)
+        yield compressor.finish()
+    finally:
+        aclose = getattr(frames, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """Compress a complete response body."""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.response_compression_brotli_quality)
+    return zlib.compress(body, settings.response_compression_gzip_level, wbits=31)
+
+
+def compress_response(response: Response, encoding: Optional[str]) -> Response:
+    """
+    Compress a response's body in place if it reaches the size threshold.
+
+    Blocking (zlib/brotli); call it from a worker thread for large bodies.
+
+    Args:
+        response: Response with a complete body (e.g. JSONResponse)
+        encoding: Negotiated encoding, or None to leave the response as is
+
+    Returns:
+        The same response
+    """
+    if encoding is None or len(response.body) < settings.response_compression_min_bytes:
+        return response
+
+    response.body = compress_body(response.body, encoding)
+    response.headers["Content-Length"] = str(len(response.body))
+    response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
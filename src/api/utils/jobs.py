@@ -0,0 +1,226 @@
+"""
+Detached agent runs (jobs).
+
+A job is a streaming run that no HTTP request waits for. It is started with
+``POST {prefix}/jobs``, queued behind a per-worker concurrency limit, and its
+frames are published into a ``StreamRun`` with the job id as run id, so clients
+can attach to it like to any resumable stream. Status, partial output, usage
+and the final result are served by ``GET {prefix}/jobs/{job_id}``: live from
+memory while the job runs on this worker, and from the ``agent_jobs`` table
+otherwise.
+
+Every worker heartbeats the rows of its live jobs. Queued or running rows whose
+heartbeat stopped (the worker was killed or restarted) are marked as failed at
+startup and then periodically, by whichever worker notices first.
+"""
+
+import asyncio
+import contextlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import null
+import structlog
+
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal
+from src.crud.agent_job import create_job, fail_orphaned_jobs, touch_jobs, update_job
+from src.models.job import AgentJob
+from .sse import Frame
+from .stream_runs import StreamRun, stream_runs
+
+logger = structlog.get_logger(__name__)
+
+# Missed heartbeats after which a job counts as orphaned
+_STALE_HEARTBEATS = 3
+
+
+class JobLimitError(Exception):
+    """Too many jobs are queued on this worker."""
+
+
+class LiveJob:
+    """
+    In-memory state of a job running (or queued) on this worker.
+    """
+
+    def __init__(self, record: AgentJob):
+        self.record = record
+        self.stream: Optional[StreamRun] = None
+        self._output_parts: List[str] = []
+
+    @property
+    def partial_output(self) -> str:
+        """Text streamed by the current agent message so far."""
+        return "".join(self._output_parts)
+
+    async def track(self, events: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """Pass SDK stream events through, collecting the streamed output text."""
+        async for event in events:
+            if event.type == "raw_response_event":
+                data_type = event.data.type
+                if data_type == "response.output_text.delta":
+                    self._output_parts.append(event.data.delta)
+                elif data_type == "response.created":
+                    # A new model response (e.g. after a tool call or handoff) starts a new message
+                    self._output_parts.clear()
+            yield event
+
+    def complete(self, final_output: Any, usage: Optional[Dict[str, Any]]) -> None:
+        """Record the result of a successful run."""
+        self.record.status = "completed"
+        self.record.final_output = jsonable_encoder(final_output)
+        self.record.usage = usage
+
+    def fail(self, error: str) -> None:
+        """Record a failed run."""
+        self.record.status = "failed"
+        self.record.error = error
+
+
+class JobManager:
+    """
+    Runs jobs in the background with a per-worker concurrency limit.
+    """
+
+    def __init__(self, max_concurrency: int, max_pending: int, heartbeat_seconds: float):
+        """
+        Initialize the manager.
+
+        Args:
+            max_concurrency: Jobs running at the same time on this worker
+            max_pending: Jobs queued or running before submissions are rejected
+            heartbeat_seconds: Interval of job heartbeats and orphan sweeps
+        """
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.heartbeat_seconds = heartbeat_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._jobs: Dict[str, LiveJob] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Fail jobs orphaned by dead workers and start heartbeating (application startup)."""
+        await self._fail_orphaned()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def aclose(self) -> None:
+        """Stop heartbeating (application shutdown, after the jobs were stopped)."""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._heartbeat_task
+            self._heartbeat_task = None
+
+    async def submit(self, job: LiveJob, frames: AsyncIterator[Frame]) -> None:
+        """
+        Persist a job and start it in the background.
+
+        Args:
+            job: New job; its record is inserted into agent_jobs
+            frames: Frames of the run; consumed once a concurrency slot is free
+
+        Raises:
+            JobLimitError: If this worker already has max_pending jobs
+        """
+        if len(self._jobs) >= self.max_pending:
+            raise JobLimitError(f"Too many pending jobs (limit {self.max_pending})")
+
+        # Take the slot before awaiting, so concurrent submissions see it
+        self._jobs[job.record.job_id] = job
+        try:
+            job.record.heartbeat_at = job.record.created_at
+            async with AsyncSessionLocal() as db_session:
+                await create_job(db_session, job.record)
+        except BaseException:
+            self._jobs.pop(job.record.job_id, None)
+            raise
+
+        job.stream = stream_runs.start(
+            self._run(job, frames),
+            job.record.user_id,
+            run_id=job.record.job_id,
+            cancel_when_abandoned=False
+        )
+
+    def get(self, job_id: str, user_id: str) -> Optional[LiveJob]:
+        """Return a job queued or running on this worker."""
+        job = self._jobs.get(job_id)
+        if job is None or job.record.user_id != user_id:
+            return None
+        return job
+
+    def stats(self) -> dict:
+        """Job counters, for diagnostics endpoints."""
+        running = sum(1 for job in self._jobs.values() if job.record.status == "running")
+        return {
+            "running": running,
+            "queued": len(self._jobs) - running,
+            "max_concurrency": self.max_concurrency,
+        }
+
+    async def _run(self, job: LiveJob, frames: AsyncIterator[Frame]) -> AsyncIterator[Frame]:
+        record = job.record
+        try:
+            async with self._semaphore:
+                record.status = "running"
+                record.started_at = datetime.now(timezone.utc)
+                await self._persist(record, "status", "started_at")
+
+                async for frame in frames:
+                    yield frame
+        except asyncio.CancelledError:
+            record.status = "cancelled"
+            raise
+        finally:
+            if record.status == "running":
+                # The frame generator ended without reporting a result
+                record.status = "failed"
+                record.error = record.error or "Run ended without a result"
+            record.finished_at = datetime.now(timezone.utc)
+            try:
+                # Shielded so a cancelled job still records its final state
+                await asyncio.shield(
+                    self._persist(record, "status", "final_output", "usage", "error", "finished_at")
+                )
+            finally:
+                self._jobs.pop(record.job_id, None)
+                logger.info("Agent job finished", job_id=record.job_id, status=record.status)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                if self._jobs:
+                    async with AsyncSessionLocal() as db_session:
+                        await touch_jobs(db_session, list(self._jobs), datetime.now(timezone.utc))
+                await self._fail_orphaned()
+            except Exception as e:
+                logger.error("Agent job heartbeat failed", error=str(e))
+
+    async def _fail_orphaned(self) -> None:
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.heartbeat_seconds * _STALE_HEARTBEATS)
+        async with AsyncSessionLocal() as db_session:
+            failed = await fail_orphaned_jobs(db_session, stale_before, "Worker restarted before the job finished")
+        if failed:
+            logger.warning("Marked orphaned agent jobs as failed", count=failed)
+
+    async def _persist(self, record: AgentJob, *fields: str) -> None:
+        try:
+            async with AsyncSessionLocal() as db_session:
+                # null() so that a missing result is SQL NULL rather than JSON null
+                values = {field: getattr(record, field) for field in fields}
+                await update_job(db_session, record.job_id, **{
+                    field: null() if value is None else value for field, value in values.items()
+                })
+        except Exception as e:
+            logger.error("Failed to persist agent job", job_id=record.job_id, error=str(e))
+
+
+# Global instance
+job_manager = JobManager(
+    max_concurrency=settings.agent_jobs_max_concurrency,
+    max_pending=settings.agent_jobs_max_pending,
+    heartbeat_seconds=settings.agent_jobs_heartbeat_seconds,
+)
@@ -0,0 +1,34 @@
+"""
+Opaque cursor helpers for keyset-paginated endpoints.
+
+Cursors are URL-safe base64 encoded JSON objects. Clients must treat them as
+opaque strings and only pass back values returned by the API.
+"""
+
+import base64
+import json
+from typing import Any, Dict
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode cursor values into an opaque, URL-safe string."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    
+    if not isinstance(values, dict):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
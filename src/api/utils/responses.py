@@ -0,0 +1,42 @@
+"""
+Streaming response that reliably notices client disconnects.
+"""
+
+import anyio
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+class EventStreamResponse(StreamingResponse):
+    """
+    ``StreamingResponse`` that always listens for ``http.disconnect``.
+
+    Starlette only watches for disconnects on servers speaking ASGI < 2.4 and
+    otherwise notices them on the next failed write, which never comes while
+    a run is busy with tool calls. This response stops streaming as soon as
+    the client leaves and closes the body iterator, so its ``finally`` blocks
+    run immediately.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            async with anyio.create_task_group() as task_group:
+
+                async def stream() -> None:
+                    try:
+                        await self.stream_response(send)
+                    except OSError:
+                        # Client went away mid-write
+                        pass
+                    task_group.cancel_scope.cancel()
+
+                task_group.start_soon(stream)
+                await self.listen_for_disconnect(receive)
+                task_group.cancel_scope.cancel()
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+        if self.background is not None:
+            await self.background()
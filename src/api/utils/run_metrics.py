@@ -0,0 +1,76 @@
+"""
+Token accounting for agent runs cancelled after their client went away.
+
+What a cancelled run would still have spent is unknown, so the saving is
+estimated as the average total tokens of this agent's completed runs minus the
+tokens the cancelled run had already used. Only the top-level run's usage is
+counted; nested ``Runner.run`` calls in tools report their usage separately.
+"""
+
+from typing import Dict
+
+
+class _AgentRunCounters:
+    __slots__ = ("completed", "completed_tokens", "cancelled", "tokens_before_cancel", "estimated_tokens_saved")
+
+    def __init__(self):
+        self.completed = 0
+        self.completed_tokens = 0
+        self.cancelled = 0
+        self.tokens_before_cancel = 0
+        self.estimated_tokens_saved = 0
+
+
+class RunMetrics:
+    """
+    Per-agent counters of completed and cancelled runs.
+    """
+
+    def __init__(self):
+        self._agents: Dict[str, _AgentRunCounters] = {}
+
+    def record_completed(self, agent_name: str, total_tokens: int) -> None:
+        """Record the total tokens of a run that finished."""
+        counters = self._counters(agent_name)
+        counters.completed += 1
+        counters.completed_tokens += total_tokens
+
+    def record_cancelled(self, agent_name: str, tokens_used: int) -> int:
+        """
+        Record a run cancelled before completion.
+
+        Returns:
+            The estimated number of tokens saved by cancelling it
+        """
+        counters = self._counters(agent_name)
+        counters.cancelled += 1
+        counters.tokens_before_cancel += tokens_used
+
+        saved = 0
+        if counters.completed:
+            saved = max(counters.completed_tokens // counters.completed - tokens_used, 0)
+        counters.estimated_tokens_saved += saved
+        return saved
+
+    def stats(self) -> dict:
+        """Counters per agent, for diagnostics endpoints."""
+        return {
+            agent_name: {
+                "completed_runs": counters.completed,
+                "avg_tokens_per_run": counters.completed_tokens // counters.completed if counters.completed else None,
+                "cancelled_runs": counters.cancelled,
+                "tokens_used_before_cancel": counters.tokens_before_cancel,
+                "estimated_tokens_saved": counters.estimated_tokens_saved,
+            }
+            for agent_name, counters in self._agents.items()
+        }
+
+    def _counters(self, agent_name: str) -> _AgentRunCounters:
+        counters = self._agents.get(agent_name)
+        if counters is None:
+            counters = self._agents[agent_name] = _AgentRunCounters()
+        return counters
+
+
+# Global instance
+run_metrics = RunMetrics()
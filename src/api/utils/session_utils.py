@@ -6,19 +6,30 @@ Sessions are enabled by default for all agent interactions.
 """
 
 import logging
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Literal
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from agents.items import TResponseInputItem
 from src.agents.utils.sessions import DatabaseSession
+from src.agents.utils.windowed_session import WindowedDatabaseSession
+from src.agents.utils.buffered_session import BufferedSession
+from src.agents.utils.history_cache import history_cache
+from src.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# "full" sends the whole history; "windowed" sends a rolling summary plus the
+# newest items that fit a token budget
+SessionMode = Literal["full", "windowed"]
+
 async def create_session_if_enabled(
     chat_id: Optional[str], 
     db_session: AsyncSession,
-    user_id: Optional[str] = None
-) -> Optional[DatabaseSession]:
+    user_id: Optional[str] = None,
+    mode: SessionMode = "full",
+    token_budget: Optional[int] = None,
+    buffered: bool = False
+) -> Optional[DatabaseSession | BufferedSession]:
     """
     Create a PostgreSQL session if chat_id is provided.
     
@@ -26,21 +37,53 @@ async def create_session_if_enabled(
         chat_id: Optional chat identifier
         db_session: SQLAlchemy async session for database operations
         user_id: Optional user ID for auto-creating chats when they don't exist
+        mode: Session mode ("full" or "windowed")
+        token_budget: Token budget for windowed sessions (defaults to settings)
+        buffered: Buffer writes in memory and flush them in one transaction;
+            the caller must ``await session.aclose()`` when the run ends
         
     Returns:
-        DatabaseSession if chat_id provided, None otherwise
+        DatabaseSession (or BufferedSession wrapping it) if chat_id provided, None otherwise
     """
     if not chat_id:
         return None
     
     try:
-        session = DatabaseSession(chat_id=chat_id, db_session=db_session, user_id=user_id)
+        if mode == "windowed":
+            session = WindowedDatabaseSession(
+                chat_id=chat_id, 
+                db_session=db_session, 
+                user_id=user_id,
+                token_budget=token_budget
+            )
+        else:
+            session = DatabaseSession(chat_id=chat_id, db_session=db_session, user_id=user_id)
+        if buffered:
+            session = buffer_session(session)
         logger.info(f"Created PostgreSQL session: {chat_id}")
         return session
     except Exception as e:
         logger.error(f"Failed to create session {chat_id}: {e}")
         return None
 
+
+def buffer_session(session: DatabaseSession) -> BufferedSession:
+    """
+    Wrap a session so that one run's writes are buffered (see ``create_session_if_enabled``).
+    
+    Args:
+        session: Session of the chat; may be reused across runs
+        
+    Returns:
+        BufferedSession the caller must ``aclose()`` when the run ends
+    """
+    return BufferedSession(
+        session,
+        flush_interval=settings.session_buffer_flush_interval,
+        max_items=settings.session_buffer_max_items
+    )
+
+
 async def get_session_messages(
     chat_id: str, 
     db_session: AsyncSession, 
@@ -89,15 +132,24 @@ async def clear_session(chat_id: str, db_session: AsyncSession, user_id: Optiona
         logger.error(f"Failed to clear session {chat_id}: {e}")
         return False
 
-def get_session_info() -> dict:
+def get_session_info(mode: SessionMode = "full", token_budget: Optional[int] = None) -> dict:
     """
     Get current session configuration information.
     
+    Args:
+        mode: Session mode used by the agent
+        token_budget: Token budget for windowed sessions (defaults to settings)
+    
     Returns:
         dict: Session configuration details
     """
-    return {
+    info = {
         "sessions_enabled": True,
         "session_type": "PostgreSQL",
-        "description": "Sessions are enabled by default with PostgreSQL storage"
-    } 
\ No newline at end of file
+        "session_mode": mode,
+        "description": "Sessions are enabled by default with PostgreSQL storage",
+        "history_cache": history_cache.stats()
+    }
+    if mode == "windowed":
+        info["token_budget"] = token_budget or settings.session_token_budget
+    return info 
\ No newline at end of file
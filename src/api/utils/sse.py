@@ -0,0 +1,453 @@
+"""
+Server-Sent Events encoding for agent stream events.
+
+``encode_stream_event`` turns an Agents SDK ``StreamEvent`` into a ready-to-send
+SSE frame (``bytes``). Events are dispatched through tables keyed on the event
+type instead of ``isinstance``/``hasattr`` chains, and the high-volume delta
+events are written through precomputed byte templates without building an
+intermediate dict. JSON is serialized with orjson (a project dependency; the
+stdlib encoder is only a fallback for environments without it).
+
+With ``compact=True`` payloads use the short-key schema of ``compact_payload``.
+"""
+
+import json
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from agents.stream_events import StreamEvent
+import structlog
+
+from .agent_registry import agent_registry
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib encoder is used instead
+    orjson = None
+
+logger = structlog.get_logger(__name__)
+
+
+if orjson is not None:
+    def dumps(value: Any) -> bytes:
+        """Serialize to compact JSON bytes."""
+        return orjson.dumps(value, default=str)
+else:
+    _json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+
+    def dumps(value: Any) -> bytes:
+        """Serialize to compact JSON bytes."""
+        return _json_encoder.encode(value).encode()
+
+
+class Frame(NamedTuple):
+    """
+    An encoded SSE frame, with the stream event it was encoded from.
+
+    The event lets a connection that falls behind merge or drop frames
+    (see ``stream_runs``); frames without one are always sent as they are.
+    """
+    data: bytes
+    event: Optional[StreamEvent] = None
+    compact: bool = False
+
+
+def encode_sse(payload: Dict[str, Any], compact: bool = False) -> bytes:
+    """Encode a payload as one SSE ``data:`` frame."""
+    if compact:
+        payload = compact_payload(payload)
+    return b"data: " + dumps(payload) + b"\n\n"
+
+
+def encode_stream_event(event: StreamEvent, compact: bool = False) -> Optional[bytes]:
+    """
+    Encode an SDK stream event as an SSE frame.
+
+    Args:
+        event: SDK stream event
+        compact: Use the short-key schema
+
+    Returns:
+        The frame, or None if the event could not be formatted
+    """
+    try:
+        if event.type == "raw_response_event":
+            data = event.data
+            fast_encoders = _COMPACT_FAST_ENCODERS if compact else _RAW_FAST_ENCODERS
+            fast_encoder = fast_encoders.get(data.type)
+            if fast_encoder is not None:
+                return fast_encoder(data, data.delta, data.sequence_number)
+        payload = format_stream_event(event)
+        return encode_sse(payload, compact) if payload is not None else None
+    except Exception as e:
+        logger.error("Error encoding stream event", event_class=type(event).__name__, error=str(e))
+        return None
+
+
+def format_stream_event(event: StreamEvent) -> Optional[Dict[str, Any]]:
+    """
+    Format stream events into a consistent, frontend-friendly structure.
+
+    Returns:
+        The event payload, or None if the event could not be formatted
+    """
+    formatter = _EVENT_FORMATTERS.get(getattr(event, "type", None))
+    if formatter is None:
+        logger.warning("Unknown stream event type", event_class=type(event).__name__)
+        return {
+            "type": "unknown_event",
+            "event_class": str(type(event).__name__),
+            "data": str(event) if event else None
+        }
+    return formatter(event)
+
+
+# ---------------------------------------------------------------------------
+# Raw response events (Responses API stream events, keyed on ``data.type``)
+# ---------------------------------------------------------------------------
+
+def _int(value: Optional[int]) -> bytes:
+    return b"null" if value is None else b"%d" % value
+
+
+_TEXT_DELTA_PREFIX = (
+    b'data: {"type":"raw_response","event_type":"response.output_text.delta","sequence_number":'
+)
+_ARGUMENTS_DELTA_PREFIX = (
+    b'data: {"type":"raw_response","event_type":"response.function_call_arguments.delta","sequence_number":'
+)
+
+
+def _encode_text_delta(data: Any, delta: str, sequence_number: Optional[int]) -> bytes:
+    return b"".join((
+        _TEXT_DELTA_PREFIX, _int(sequence_number),
+        b',"delta":', dumps(delta),
+        b',"content_index":', _int(data.content_index),
+        b',"item_id":', dumps(data.item_id),
+        b',"output_index":', _int(data.output_index),
+        b"}\n\n",
+    ))
+
+
+def _encode_arguments_delta(data: Any, delta: str, sequence_number: Optional[int]) -> bytes:
+    return b"".join((
+        _ARGUMENTS_DELTA_PREFIX, _int(sequence_number),
+        b',"delta":', dumps(delta),
+        b',"function_call":true,"call_id":', dumps(getattr(data, "call_id", None)),
+        b"}\n\n",
+    ))
+
+
+# Byte-template encoders for the events that make up most of a stream
+_RAW_FAST_ENCODERS: Dict[str, Callable[[Any, str, Optional[int]], bytes]] = {
+    "response.output_text.delta": _encode_text_delta,
+    "response.function_call_arguments.delta": _encode_arguments_delta,
+}
+
+# Raw event types whose ``delta`` can be merged across consecutive events
+DELTA_EVENT_TYPES = frozenset(_RAW_FAST_ENCODERS)
+
+
+def encode_delta(data: Any, delta: str, sequence_number: Optional[int], compact: bool = False) -> bytes:
+    """
+    Encode a delta event with a replaced (merged) delta and sequence number.
+
+    Args:
+        data: Raw Responses API event of a type in DELTA_EVENT_TYPES
+        delta: Text to send as the event's delta
+        sequence_number: Sequence number to report (of the last merged event)
+        compact: Use the short-key schema
+    """
+    fast_encoders = _COMPACT_FAST_ENCODERS if compact else _RAW_FAST_ENCODERS
+    return fast_encoders[data.type](data, delta, sequence_number)
+
+
+def _text_delta_fields(data: Any) -> Dict[str, Any]:
+    return {
+        "delta": data.delta,
+        "content_index": data.content_index,
+        "item_id": data.item_id,
+        "output_index": data.output_index
+    }
+
+
+def _reasoning_delta_fields(data: Any) -> Dict[str, Any]:
+    return {"delta": data.delta, "reasoning": True}
+
+
+def _refusal_delta_fields(data: Any) -> Dict[str, Any]:
+    return {"delta": data.delta, "refusal": True}
+
+
+def _arguments_delta_fields(data: Any) -> Dict[str, Any]:
+    return {"delta": data.delta, "function_call": True, "call_id": getattr(data, "call_id", None)}
+
+
+def _output_item_added_fields(data: Any) -> Dict[str, Any]:
+    item = data.item
+    fields = {"output_index": data.output_index, "item_type": getattr(item, "type", None)}
+    # Tool name is available as soon as a function tool call starts
+    if hasattr(item, "name"):
+        fields["tool_name"] = item.name
+        fields["call_id"] = getattr(item, "call_id", None)
+    return fields
+
+
+def _output_item_done_fields(data: Any) -> Dict[str, Any]:
+    return {"output_index": data.output_index, "item_type": getattr(data.item, "type", None)}
+
+
+def _response_lifecycle_fields(data: Any) -> Dict[str, Any]:
+    response = data.response
+    return {
+        "response_id": getattr(response, "id", None),
+        "status": getattr(response, "status", None)
+    }
+
+
+def _content_part_fields(data: Any) -> Dict[str, Any]:
+    return {"content_index": data.content_index, "item_id": data.item_id}
+
+
+def _text_done_fields(data: Any) -> Dict[str, Any]:
+    return {"text": data.text, "content_index": data.content_index, "item_id": data.item_id}
+
+
+_RAW_FIELD_FORMATTERS: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+    "response.output_text.delta": _text_delta_fields,
+    "response.reasoning_summary_text.delta": _reasoning_delta_fields,
+    "response.refusal.delta": _refusal_delta_fields,
+    "response.output_item.added": _output_item_added_fields,
+    "response.output_item.done": _output_item_done_fields,
+    "response.function_call_arguments.delta": _arguments_delta_fields,
+    "response.created": _response_lifecycle_fields,
+    "response.completed": _response_lifecycle_fields,
+    "response.content_part.added": _content_part_fields,
+    "response.content_part.done": _content_part_fields,
+    "response.output_text.done": _text_done_fields,
+}
+
+
+def _format_raw_response_event(event: Any) -> Dict[str, Any]:
+    data = event.data
+    event_type = getattr(data, "type", "unknown")
+    payload = {
+        "type": "raw_response",
+        "event_type": event_type,
+        "sequence_number": getattr(data, "sequence_number", None),
+    }
+    field_formatter = _RAW_FIELD_FORMATTERS.get(event_type)
+    if field_formatter is not None:
+        payload.update(field_formatter(data))
+    return payload
+
+
+# ---------------------------------------------------------------------------
+# Run item events (semantic agent events, keyed on ``event.name``)
+# ---------------------------------------------------------------------------
+
+def _message_output_fields(item: Any) -> Dict[str, Any]:
+    return {
+        "role": getattr(item, "role", None),
+        "status": getattr(item, "status", None),
+        "message_id": getattr(item, "id", None)
+    }
+
+
+def _tool_called_fields(item: Any) -> Dict[str, Any]:
+    raw_item = item.raw_item
+    return {
+        "tool_name": getattr(raw_item, "name", None),
+        "tool_arguments": getattr(raw_item, "arguments", None),
+        "call_id": getattr(raw_item, "id", None)
+    }
+
+
+def _tool_output_fields(item: Any) -> Dict[str, Any]:
+    return {
+        "tool_name": getattr(item, "name", None),
+        "output": getattr(item, "output", None),
+        "call_id": getattr(item, "id", None)
+    }
+
+
+def _handoff_requested_fields(item: Any) -> Dict[str, Any]:
+    return {
+        "target_agent": getattr(item, "target_agent_name", None),
+        "reason": getattr(item, "reason", None)
+    }
+
+
+def _handoff_occurred_fields(item: Any) -> Dict[str, Any]:
+    return {
+        "target_agent": getattr(item, "target_agent_name", None),
+        "previous_agent": getattr(item, "previous_agent_name", None)
+    }
+
+
+def _reasoning_item_fields(item: Any) -> Dict[str, Any]:
+    return {"reasoning_content": getattr(item, "content", None)}
+
+
+def _mcp_approval_fields(item: Any) -> Dict[str, Any]:
+    return {
+        "tool_name": getattr(item, "tool_name", None),
+        "server_name": getattr(item, "server_name", None)
+    }
+
+
+def _mcp_list_tools_fields(item: Any) -> Dict[str, Any]:
+    return {
+        "server_name": getattr(item, "server_name", None),
+        "tools": getattr(item, "tools", [])
+    }
+
+
+_RUN_ITEM_FIELD_FORMATTERS: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+    "message_output_created": _message_output_fields,
+    "tool_called": _tool_called_fields,
+    "tool_output": _tool_output_fields,
+    "handoff_requested": _handoff_requested_fields,
+    # Misspelled by the SDK
+    "handoff_occured": _handoff_occurred_fields,
+    "reasoning_item_created": _reasoning_item_fields,
+    "mcp_approval_requested": _mcp_approval_fields,
+    "mcp_list_tools": _mcp_list_tools_fields,
+}
+
+
+def _format_run_item_event(event: Any) -> Dict[str, Any]:
+    item = event.item
+    payload = {
+        "type": "run_item",
+        "name": event.name,
+        "item_type": getattr(item, "type", None) if item else None,
+    }
+    field_formatter = _RUN_ITEM_FIELD_FORMATTERS.get(event.name)
+    if field_formatter is not None:
+        payload.update(field_formatter(item))
+    return payload
+
+
+# ---------------------------------------------------------------------------
+# Agent updated events (handoffs)
+# ---------------------------------------------------------------------------
+
+def _format_agent_updated_event(event: Any) -> Dict[str, Any]:
+    new_agent = event.new_agent
+    # Instructions are served once per agent_id by GET {prefix}/agents/{agent_id}
+    return {
+        "type": "agent_updated",
+        "agent_id": agent_registry.register(new_agent),
+        "agent_name": new_agent.name,
+        "model": str(new_agent.model) if new_agent.model else None,
+        "tools_count": len(new_agent.tools),
+        "handoffs_count": len(new_agent.handoffs)
+    }
+
+
+_EVENT_FORMATTERS: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+    "raw_response_event": _format_raw_response_event,
+    "run_item_stream_event": _format_run_item_event,
+    "agent_updated_stream_event": _format_agent_updated_event,
+}
+
+
+# ---------------------------------------------------------------------------
+# Compact schema
+# ---------------------------------------------------------------------------
+
+# Short ``t`` values of raw response events; other raw events keep their event_type
+COMPACT_EVENT_TYPES: Dict[str, str] = {
+    "response.output_text.delta": "td",
+    "response.output_text.done": "tx",
+    "response.function_call_arguments.delta": "ad",
+    "response.reasoning_summary_text.delta": "rd",
+    "response.refusal.delta": "fd",
+    "response.output_item.added": "oa",
+    "response.output_item.done": "od",
+    "response.content_part.added": "pa",
+    "response.content_part.done": "pd",
+    "response.created": "rc",
+    "response.completed": "rx",
+}
+
+# Short names of payload keys; keys not listed are sent unchanged
+COMPACT_KEYS: Dict[str, str] = {
+    "delta": "d",
+    "text": "x",
+    "item_id": "i",
+    "output_index": "o",
+    "content_index": "c",
+    "item_type": "it",
+    "call_id": "id",
+    "tool_name": "tn",
+    "tool_arguments": "ta",
+    "output": "out",
+    "role": "r",
+    "status": "s",
+    "message_id": "m",
+    "response_id": "rid",
+    "target_agent": "to",
+    "previous_agent": "from",
+    "agent_name": "a",
+    "agent_id": "aid",
+    "server_name": "sv",
+    "session_id": "sid",
+    "final_output": "f",
+    "current_turn": "ct",
+    "usage": "u",
+    "message": "msg",
+}
+
+# Keys implied by ``t`` (or not useful to stream consumers)
+_COMPACT_DROPPED_KEYS = frozenset({
+    "type", "event_type", "name", "sequence_number", "reasoning", "refusal", "function_call",
+})
+
+
+def compact_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a payload to the compact schema.
+
+    The event kind moves to ``t`` (the short raw event type, the run item name,
+    or the payload type), keys are renamed through COMPACT_KEYS, and sequence
+    numbers, redundant flags and None values are dropped.
+    """
+    kind = payload.get("type")
+    if kind == "raw_response":
+        event_type = payload.get("event_type")
+        short_type = COMPACT_EVENT_TYPES.get(event_type, event_type)
+    elif kind == "run_item":
+        short_type = payload.get("name")
+    else:
+        short_type = kind
+
+    compact = {"t": short_type}
+    for key, value in payload.items():
+        if value is None or key in _COMPACT_DROPPED_KEYS:
+            continue
+        compact[COMPACT_KEYS.get(key, key)] = value
+    return compact
+
+
+def _encode_compact_text_delta(data: Any, delta: str, sequence_number: Optional[int]) -> bytes:
+    return b"".join((
+        b'data: {"t":"td","d":', dumps(delta),
+        b',"c":', _int(data.content_index),
+        b',"i":', dumps(data.item_id),
+        b',"o":', _int(data.output_index),
+        b"}\n\n",
+    ))
+
+
+def _encode_compact_arguments_delta(data: Any, delta: str, sequence_number: Optional[int]) -> bytes:
+    call_id = getattr(data, "call_id", None)
+    if call_id is None:
+        return b'data: {"t":"ad","d":' + dumps(delta) + b"}\n\n"
+    return b'data: {"t":"ad","d":' + dumps(delta) + b',"id":' + dumps(call_id) + b"}\n\n"
+
+
+_COMPACT_FAST_ENCODERS: Dict[str, Callable[[Any, str, Optional[int]], bytes]] = {
+    "response.output_text.delta": _encode_compact_text_delta,
+    "response.function_call_arguments.delta": _encode_compact_arguments_delta,
+}
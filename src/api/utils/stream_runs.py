@@ -0,0 +1,275 @@
+"""
+Resumable streaming runs.
+
+A streaming agent run is driven by a background task that publishes its SSE
+frames into a ``StreamRun``, instead of by the HTTP response that started it.
+Every frame carries an SSE ``id`` of the form ``<run_id>-<seq>`` and the newest
+frames are kept in a bounded ring buffer, so a client that lost its connection
+can re-attach with ``Last-Event-ID`` and receive only the frames it missed
+while the run keeps going.
+
+Runs are kept per worker process for a retention period after they finish;
+reconnects must reach the same worker (sticky sessions when scaled out).
+
+A run that has had no client attached for a grace period is cancelled, so a
+closed browser tab does not keep paying for model and tool calls. Detached
+runs (jobs) opt out of this.
+
+A connection that falls more than ``max_lag`` frames behind the run has its
+backlog shrunk by the slow-consumer policy (see ``backpressure``).
+"""
+
+import asyncio
+import uuid
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Callable, Deque, Dict, Optional, Set, Tuple
+
+import structlog
+
+from src.core.config import settings
+from .backpressure import SendQueueMetrics, SlowConsumerPolicy, relieve_backlog
+from .sse import Frame, encode_sse
+
+logger = structlog.get_logger(__name__)
+
+
+class StreamRun:
+    """
+    Frames of one streaming run, replayable from any event id still buffered.
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        user_id: Optional[str],
+        buffer_size: int,
+        on_abandoned: Optional[Callable[["StreamRun"], None]] = None,
+        max_lag: Optional[int] = None,
+        slow_consumer_policy: SlowConsumerPolicy = "none",
+        queue_metrics: Optional[SendQueueMetrics] = None
+    ):
+        """
+        Initialize the run.
+
+        Args:
+            run_id: Unique id of the run, used as event id prefix
+            user_id: Owner of the run; only the owner can attach
+            buffer_size: Number of most recent frames kept for replay
+            on_abandoned: Called when the last attached client detaches from an unfinished run
+            max_lag: Backlog (in frames) above which a connection's backlog is shrunk
+            slow_consumer_policy: How a backlog above ``max_lag`` is shrunk
+            queue_metrics: Receives the send queue depth of every connection
+        """
+        self.run_id = run_id
+        self.user_id = user_id
+        self.done = False
+        self.subscribers = 0
+        self._on_abandoned = on_abandoned
+        self._max_lag = max_lag
+        self._policy = slow_consumer_policy
+        self._queue_metrics = queue_metrics or SendQueueMetrics()
+        self._id_prefix = b"id: " + run_id.encode() + b"-"
+        self._frames: Deque[Tuple[int, Frame]] = deque(maxlen=buffer_size)
+        self._next_seq = 1
+        self._wakeup = asyncio.Event()
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest frame (0 before the first one)."""
+        return self._next_seq - 1
+
+    def publish(self, frame: Frame) -> None:
+        """Append a frame and wake up attached clients."""
+        self._frames.append((self._next_seq, frame))
+        self._next_seq += 1
+        self._notify()
+
+    def finish(self) -> None:
+        """Mark the run complete; attached clients end after the last frame."""
+        self.done = True
+        self._notify()
+
+    async def frames(self, after: int = 0) -> AsyncIterator[bytes]:
+        """
+        Yield the frames following sequence number ``after``, live until the run ends.
+
+        If frames after ``after`` were already evicted from the buffer, a
+        ``replay_gap`` event reporting how many were lost is sent first.
+        """
+        self.subscribers += 1
+        connection = object()
+        try:
+            async for frame in self._frames_after(after, connection):
+                yield frame
+        finally:
+            self._queue_metrics.discard(connection)
+            self.subscribers -= 1
+            if not self.subscribers and not self.done and self._on_abandoned is not None:
+                self._on_abandoned(self)
+
+    async def _frames_after(self, after: int, connection: object) -> AsyncIterator[bytes]:
+        id_prefix = self._id_prefix
+        while True:
+            wakeup = self._wakeup
+            first_seq = self._frames[0][0] if self._frames else self._next_seq
+            if after + 1 < first_seq:
+                yield encode_sse({"type": "replay_gap", "run_id": self.run_id, "missed": first_seq - after - 1})
+                after = first_seq - 1
+
+            backlog = list(islice(self._frames, after + 1 - first_seq, None))
+            self._queue_metrics.observe(connection, len(backlog))
+            if backlog:
+                after = backlog[-1][0]
+                if self._max_lag is not None and len(backlog) > self._max_lag and self._policy != "none":
+                    to_send = relieve_backlog(backlog, self._policy, self._queue_metrics)
+                else:
+                    to_send = [(seq, frame.data) for seq, frame in backlog]
+                for seq, data in to_send:
+                    yield id_prefix + b"%d\n" % seq + data
+                continue
+
+            if self.done:
+                return
+            await wakeup.wait()
+
+    def _notify(self) -> None:
+        # Waiters hold a reference to the current event; a fresh one is armed for the next wait
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+
+class StreamRunManager:
+    """
+    Starts streaming runs as background tasks and looks them up for re-attachment.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int,
+        retention_seconds: float,
+        abandon_grace_seconds: float,
+        max_lag: Optional[int] = None,
+        slow_consumer_policy: SlowConsumerPolicy = "none"
+    ):
+        """
+        Initialize the manager.
+
+        Args:
+            buffer_size: Frames kept per run for replay
+            retention_seconds: How long a finished run stays attachable
+            abandon_grace_seconds: How long a run without attached clients waits
+                for a reconnect before it is cancelled
+            max_lag: Per-connection backlog (in frames) above which the policy applies
+            slow_consumer_policy: How the backlog of a slow connection is shrunk
+        """
+        self.buffer_size = buffer_size
+        self.retention_seconds = retention_seconds
+        self.abandon_grace_seconds = abandon_grace_seconds
+        self.max_lag = max_lag
+        self.slow_consumer_policy = slow_consumer_policy
+        self.queue_metrics = SendQueueMetrics()
+        self.abandoned = 0
+        self._runs: Dict[str, StreamRun] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._run_tasks: Dict[str, asyncio.Task] = {}
+
+    def start(
+        self,
+        frames: AsyncIterator[Frame],
+        user_id: Optional[str],
+        run_id: Optional[str] = None,
+        cancel_when_abandoned: bool = True
+    ) -> StreamRun:
+        """
+        Drive ``frames`` in a background task, publishing them into a new run.
+
+        Args:
+            frames: Frames of the run
+            user_id: Owner of the run
+            run_id: Id of the run (a new random id by default)
+            cancel_when_abandoned: Cancel the task once no client has been attached
+                for ``abandon_grace_seconds``; otherwise it always runs to completion
+        """
+        run = StreamRun(
+            run_id or uuid.uuid4().hex,
+            user_id,
+            self.buffer_size,
+            on_abandoned=self._schedule_abandon_check if cancel_when_abandoned else None,
+            max_lag=self.max_lag,
+            slow_consumer_policy=self.slow_consumer_policy,
+            queue_metrics=self.queue_metrics
+        )
+        self._runs[run.run_id] = run
+        task = asyncio.create_task(self._drive(run, frames))
+        self._tasks.add(task)
+        self._run_tasks[run.run_id] = task
+        task.add_done_callback(self._tasks.discard)
+        if cancel_when_abandoned:
+            # Covers clients that leave before their response starts reading the run
+            self._schedule_abandon_check(run)
+        return run
+
+    def get(self, run_id: str, user_id: Optional[str]) -> Optional[StreamRun]:
+        """Return a live or recently finished run owned by ``user_id``."""
+        run = self._runs.get(run_id)
+        if run is None or run.user_id != user_id:
+            return None
+        return run
+
+    async def aclose(self) -> None:
+        """Cancel all running producers (application shutdown)."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Run counters, for diagnostics endpoints."""
+        return {
+            "active": len(self._tasks),
+            "attachable": len(self._runs),
+            "cancelled_abandoned": self.abandoned,
+            "send_queues": self.queue_metrics.stats(),
+        }
+
+    def _schedule_abandon_check(self, run: StreamRun) -> None:
+        asyncio.get_running_loop().call_later(self.abandon_grace_seconds, self._cancel_if_abandoned, run)
+
+    def _cancel_if_abandoned(self, run: StreamRun) -> None:
+        task = self._run_tasks.get(run.run_id)
+        if run.subscribers or run.done or task is None or task.done():
+            return
+        self.abandoned += 1
+        logger.info("Cancelling stream run without clients", run_id=run.run_id)
+        task.cancel()
+
+    async def _drive(self, run: StreamRun, frames: AsyncIterator[Frame]) -> None:
+        try:
+            async for frame in frames:
+                run.publish(frame)
+        except Exception as e:
+            # The frame generator reports run errors itself; this only catches bugs in it
+            logger.error("Stream run failed", run_id=run.run_id, error=str(e))
+            run.publish(Frame(encode_sse({"type": "error", "message": str(e)})))
+        finally:
+            run.finish()
+            self._run_tasks.pop(run.run_id, None)
+            asyncio.get_running_loop().call_later(self.retention_seconds, self._runs.pop, run.run_id, None)
+
+
+def parse_event_id(event_id: str) -> Optional[Tuple[str, int]]:
+    """Split an SSE event id into ``(run_id, seq)``, or None if it is not one of ours."""
+    run_id, _, seq = event_id.strip().rpartition("-")
+    if not run_id or not seq.isdigit():
+        return None
+    return run_id, int(seq)
+
+
+# Global instance
+stream_runs = StreamRunManager(
+    buffer_size=settings.stream_replay_buffer_size,
+    retention_seconds=settings.stream_replay_retention_seconds,
+    abandon_grace_seconds=settings.stream_abandon_grace_seconds,
+    max_lag=settings.stream_send_queue_max_frames,
+    slow_consumer_policy=settings.stream_slow_consumer_policy,
+)
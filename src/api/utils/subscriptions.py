@@ -0,0 +1,108 @@
+"""
+Event subscriptions for agent streams.
+
+A client can subscribe to groups of stream events instead of receiving all of
+them. Events are classified on the SDK event object, so anything outside the
+subscription is dropped before it is formatted or encoded.
+
+Groups:
+    text: output text and refusal deltas, completed messages
+    reasoning: reasoning summaries and reasoning items
+    tools: tool call starts, argument deltas, tool calls and outputs, MCP events
+    agents: agent changes and handoffs
+    lifecycle: response created/completed, content parts, other output items
+"""
+
+from typing import Any, AsyncIterator, Callable, Collection, Dict, Literal, Union
+
+from agents.stream_events import StreamEvent
+
+EventGroup = Literal["text", "reasoning", "tools", "agents", "lifecycle"]
+
+# Output item types whose added/done events belong to the tools group
+_TOOL_ITEM_TYPES = frozenset({
+    "function_call",
+    "file_search_call",
+    "web_search_call",
+    "computer_call",
+    "code_interpreter_call",
+    "image_generation_call",
+    "local_shell_call",
+    "mcp_call",
+    "mcp_list_tools",
+    "mcp_approval_request",
+})
+
+
+def _output_item_group(data: Any) -> str:
+    return "tools" if getattr(data.item, "type", None) in _TOOL_ITEM_TYPES else "lifecycle"
+
+
+_RAW_EVENT_GROUPS: Dict[str, Union[str, Callable[[Any], str]]] = {
+    "response.output_text.delta": "text",
+    "response.output_text.done": "text",
+    "response.refusal.delta": "text",
+    "response.refusal.done": "text",
+    "response.output_item.added": _output_item_group,
+    "response.output_item.done": _output_item_group,
+}
+
+# Fallback for raw event types not listed above
+_RAW_EVENT_PREFIX_GROUPS = (
+    ("response.reasoning", "reasoning"),
+    ("response.function_call_arguments", "tools"),
+    ("response.mcp", "tools"),
+    ("response.file_search_call", "tools"),
+    ("response.web_search_call", "tools"),
+    ("response.code_interpreter_call", "tools"),
+    ("response.image_generation_call", "tools"),
+)
+
+_RUN_ITEM_GROUPS: Dict[str, str] = {
+    "message_output_created": "text",
+    "reasoning_item_created": "reasoning",
+    "tool_called": "tools",
+    "tool_output": "tools",
+    "mcp_approval_requested": "tools",
+    "mcp_list_tools": "tools",
+    "handoff_requested": "agents",
+    # Misspelled by the SDK
+    "handoff_occured": "agents",
+}
+
+
+def event_group(event: StreamEvent) -> str:
+    """Return the subscription group of an SDK stream event."""
+    if event.type == "raw_response_event":
+        event_type = getattr(event.data, "type", "")
+        group = _RAW_EVENT_GROUPS.get(event_type)
+        if callable(group):
+            return group(event.data)
+        if group is not None:
+            return group
+        for prefix, prefix_group in _RAW_EVENT_PREFIX_GROUPS:
+            if event_type.startswith(prefix):
+                return prefix_group
+        return "lifecycle"
+    if event.type == "run_item_stream_event":
+        return _RUN_ITEM_GROUPS.get(event.name, "lifecycle")
+    if event.type == "agent_updated_stream_event":
+        return "agents"
+    return "lifecycle"
+
+
+async def subscribed_events(
+    events: AsyncIterator[StreamEvent],
+    groups: Collection[str]
+) -> AsyncIterator[StreamEvent]:
+    """
+    Yield only the events in one of the subscribed groups.
+
+    Args:
+        events: SDK stream events
+        groups: Subscribed event groups
+    """
+    groups = frozenset(groups)
+    async for event in events:
+        if event_group(event) in groups:
+            yield event
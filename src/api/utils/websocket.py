@@ -0,0 +1,190 @@
+"""
+WebSocket transport for agent runs.
+
+One authenticated connection carries many turns (authentication happens
+before, in ``accept_websocket_user``: x-stack-auth handshake header, or an
+``{"type": "auth", ...}`` first message). Client messages (JSON text):
+
+- ``{"type": "run", "turn_id": "...", ...AgentRequest fields}``: start a turn;
+  ``turn_id`` is optional and generated when missing
+- ``{"type": "cancel", "turn_id": "..."}``: cancel a running turn
+
+Server messages wrap the same event payloads as ``/stream``:
+``{"turn_id": "...", "event": {...}}``. Every turn starts with a
+``turn_started`` event and ends with ``stream_complete``, ``error`` or
+``turn_cancelled``. Connection-level problems (malformed messages) are sent as
+``{"type": "error", "message": "..."}``.
+
+Turns on different chats (or without a chat) run concurrently; turns on the
+same chat are queued, because they share the chat's warm database session.
+"""
+
+import asyncio
+import contextlib
+import json
+import uuid
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from .sse import Frame, dumps
+
+logger = structlog.get_logger(__name__)
+
+_SSE_PREFIX = len(b"data: ")
+_SSE_SUFFIX = len(b"\n\n")
+
+
+class ChatContext:
+    """
+    Database state of one chat, kept warm for the lifetime of a connection.
+    """
+
+    def __init__(self, db_session: AsyncSession, session: Any):
+        """
+        Initialize the context.
+
+        Args:
+            db_session: Database session used by this chat's turns only
+            session: Agent session (DatabaseSession) for the chat, or None without a chat
+        """
+        self.db_session = db_session
+        self.session = session
+        self.lock = asyncio.Lock()
+
+
+class AgentWebSocket:
+    """
+    Runs the turns of one WebSocket connection.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        parse_request: Callable[[Dict[str, Any]], Any],
+        open_chat: Callable[[Optional[str]], Awaitable[ChatContext]],
+        run_turn: Callable[[Any, ChatContext], AsyncGenerator[Frame, None]],
+        max_concurrent_turns: int,
+        send_queue_size: int
+    ):
+        """
+        Initialize the connection handler.
+
+        Args:
+            websocket: Accepted WebSocket
+            parse_request: Validates a run message into an AgentRequest (raises ValidationError)
+            open_chat: Creates the warm context of a chat (called once per chat);
+                the caller closes its database session after ``serve()`` returns
+            run_turn: Frames of one turn
+            max_concurrent_turns: Turns running at the same time on this connection
+            send_queue_size: Frames buffered for the socket before turns wait for it
+        """
+        self.websocket = websocket
+        self._parse_request = parse_request
+        self._open_chat = open_chat
+        self._run_turn = run_turn
+        self._max_concurrent_turns = max_concurrent_turns
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=send_queue_size)
+        self._turns: Dict[str, asyncio.Task] = {}
+        self._chats: Dict[Optional[str], ChatContext] = {}
+
+    async def serve(self) -> None:
+        """Handle messages until the client disconnects, then cancel its turns."""
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                try:
+                    message = json.loads(await self.websocket.receive_text())
+                except json.JSONDecodeError:
+                    await self._send_error("Messages must be JSON")
+                    continue
+                if not isinstance(message, dict):
+                    await self._send_error("Messages must be JSON objects")
+                    continue
+                await self._handle(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            turns = list(self._turns.values())
+            for task in turns:
+                task.cancel()
+            await asyncio.gather(*turns, return_exceptions=True)
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+
+    async def _handle(self, message: Dict[str, Any]) -> None:
+        message_type = message.pop("type", None)
+        turn_id = message.pop("turn_id", None) or uuid.uuid4().hex
+
+        if message_type == "cancel":
+            task = self._turns.get(turn_id)
+            if task is None:
+                await self._send_error(f"Unknown turn: {turn_id}")
+            else:
+                task.cancel()
+            return
+
+        if message_type != "run":
+            await self._send_error(f"Unknown message type: {message_type}")
+            return
+        if turn_id in self._turns:
+            await self._send_error(f"Turn already running: {turn_id}")
+            return
+        if len(self._turns) >= self._max_concurrent_turns:
+            await self._send_error(f"Too many concurrent turns (limit {self._max_concurrent_turns})")
+            return
+
+        try:
+            request = self._parse_request(message)
+        except ValidationError as e:
+            await self._send_error(f"Invalid run request: {e}")
+            return
+
+        task = asyncio.create_task(self._turn(turn_id, request))
+        self._turns[turn_id] = task
+        task.add_done_callback(lambda _: self._turns.pop(turn_id, None))
+
+    async def _turn(self, turn_id: str, request: Any) -> None:
+        prefix = b'{"turn_id":' + dumps(turn_id) + b',"event":'
+        await self._outbox.put(prefix + b'{"type":"turn_started"}}')
+        try:
+            chat = await self._chat(request.session_id)
+            # Turns without a chat never touch the database session and run unqueued
+            async with chat.lock if chat.session is not None else contextlib.nullcontext():
+                frames = self._run_turn(request, chat)
+                try:
+                    async for frame in frames:
+                        await self._outbox.put(prefix + frame.data[_SSE_PREFIX:-_SSE_SUFFIX] + b"}")
+                finally:
+                    if frames.ag_frame is not None:
+                        # Cancelled while waiting for the socket: let the run stop itself at its yield
+                        with contextlib.suppress(asyncio.CancelledError):
+                            await frames.athrow(asyncio.CancelledError())
+                    # Return the connection to the pool between turns; the session stays usable
+                    await asyncio.shield(chat.db_session.close())
+        except asyncio.CancelledError:
+            # Never wait here: on disconnect the writer is gone
+            if not self._outbox.full():
+                self._outbox.put_nowait(prefix + b'{"type":"turn_cancelled"}}')
+            raise
+        except Exception as e:
+            logger.error("WebSocket turn failed", turn_id=turn_id, error=str(e))
+            await self._outbox.put(prefix + dumps({"type": "error", "message": str(e)}) + b"}")
+
+    async def _chat(self, chat_id: Optional[str]) -> ChatContext:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            # Another turn may have opened the chat meanwhile; keep the first context
+            chat = self._chats.setdefault(chat_id, await self._open_chat(chat_id))
+        return chat
+
+    async def _send_error(self, message: str) -> None:
+        await self._outbox.put(dumps({"type": "error", "message": message}))
+
+    async def _write(self) -> None:
+        while True:
+            message = await self._outbox.get()
+            await self.websocket.send_text(message.decode())
@@ -1,18 +1,40 @@
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Protocol
+
 from sqlmodel import create_engine
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from src.core.config import settings
+from src.core.pool_metrics import PoolMetrics, engine_pool_stats, instrumented_pool_class
 import structlog
 
 logger = structlog.get_logger()
 
-# Create async engine with explicit asyncpg driver
-engine = create_async_engine(
-    settings.async_database_url,
-    echo=settings.database_echo,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    pool_size=10,
-    max_overflow=20,
+def _create_engine(url: str, metrics: PoolMetrics) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=settings.database_echo,
+        poolclass=instrumented_pool_class(metrics),
+        pool_pre_ping=settings.database_pool_pre_ping,
+        pool_recycle=settings.database_pool_recycle,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+        connect_args={"prepared_statement_cache_size": settings.database_statement_cache_size},
+    )
+
+# Checkout metrics per engine, reported by GET /metrics
+primary_pool_metrics = PoolMetrics()
+read_pool_metrics = PoolMetrics()
+
+# Create async engine with explicit asyncpg driver (primary: all writes)
+engine = _create_engine(settings.async_database_url, primary_pool_metrics)
+
+# Optional read-only engine (e.g. a streaming replica) for read-heavy endpoints
+read_engine: Optional[AsyncEngine] = (
+    _create_engine(settings.async_database_read_url, read_pool_metrics)
+    if settings.database_read_url else None
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -21,6 +43,196 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# Falls back to the primary when no replica is configured
+AsyncReadSessionLocal = async_sessionmaker(
+    read_engine or engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
+
+class WriteMarkerBackend(Protocol):
+    """Storage for recent-write markers."""
+
+    async def mark(self, keys: List[str], window_seconds: float) -> None:
+        """Mark ``keys`` as written for ``window_seconds``."""
+        ...
+
+    async def any_marked(self, keys: List[str]) -> bool:
+        """Whether any of ``keys`` is still marked."""
+        ...
+
+
+class MemoryWriteMarkerBackend:
+    """Bounded per-process markers (only sees writes made by this worker)."""
+
+    def __init__(self, max_keys: int = 10000):
+        """
+        Initialize the backend.
+
+        Args:
+            max_keys: Maximum number of keys remembered (oldest are dropped first)
+        """
+        self.max_keys = max_keys
+        self._written: "OrderedDict[str, float]" = OrderedDict()
+
+    async def mark(self, keys: List[str], window_seconds: float) -> None:
+        expires = time.monotonic() + window_seconds
+        for key in keys:
+            self._written[key] = expires
+            self._written.move_to_end(key)
+        while len(self._written) > self.max_keys:
+            self._written.popitem(last=False)
+
+    async def any_marked(self, keys: List[str]) -> bool:
+        now = time.monotonic()
+        for key in keys:
+            expires = self._written.get(key)
+            if expires is None:
+                continue
+            if expires > now:
+                return True
+            del self._written[key]
+        return False
+
+
+class RedisWriteMarkerBackend:
+    """Markers shared by all workers on Redis (requires the optional ``redis`` package)."""
+
+    def __init__(self, url: str, prefix: str = "db:written:"):
+        """
+        Initialize the backend.
+
+        Args:
+            url: Redis connection URL
+            prefix: Key prefix for markers
+        """
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError(
+                "DATABASE_READ_STICKY_BACKEND=redis requires the 'redis' package (pip install redis)"
+            ) from e
+
+        self.prefix = prefix
+        self._redis = redis_asyncio.from_url(url)
+
+    async def mark(self, keys: List[str], window_seconds: float) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(self.prefix + key, b"1", px=max(int(window_seconds * 1000), 1))
+            await pipe.execute()
+
+    async def any_marked(self, keys: List[str]) -> bool:
+        return await self._redis.exists(*(self.prefix + key for key in keys)) > 0
+
+
+class RecentWriteTracker:
+    """
+    Remembers which chats and users were written recently.
+
+    Reads for a recently written key go to the primary instead of the replica,
+    so a client always sees its own writes despite replication lag. With the
+    memory backend this only holds for reads served by the worker that wrote;
+    run several workers behind one replica with the Redis backend.
+    """
+
+    def __init__(self, backend: WriteMarkerBackend, window_seconds: float):
+        """
+        Initialize the tracker.
+
+        Args:
+            backend: Storage for the markers
+            window_seconds: How long after a write reads stay on the primary
+        """
+        self.backend = backend
+        self.window_seconds = window_seconds
+        self.backend_errors = 0
+
+    async def mark(self, chat_id: Optional[str] = None, user_id: Optional[str] = None) -> None:
+        """Record a write to a chat and/or to a user's chat list."""
+        if read_engine is None:
+            return
+        try:
+            await self.backend.mark(_write_keys(chat_id, user_id), self.window_seconds)
+        except Exception as e:
+            self.backend_errors += 1
+            logger.warning("Recording recent write failed", error=str(e))
+
+    async def is_recent(self, chat_id: Optional[str] = None, user_id: Optional[str] = None) -> bool:
+        """Whether the chat or user was written within the stickiness window."""
+        keys = _write_keys(chat_id, user_id)
+        if not keys:
+            return False
+        try:
+            return await self.backend.any_marked(keys)
+        except Exception as e:
+            # Unknown: stay on the primary rather than risk a stale read
+            self.backend_errors += 1
+            logger.warning("Recent write lookup failed", error=str(e))
+            return True
+
+
+def _write_keys(chat_id: Optional[str], user_id: Optional[str]) -> List[str]:
+    keys = []
+    if chat_id:
+        keys.append(f"chat:{chat_id}")
+    if user_id:
+        keys.append(f"user:{user_id}")
+    return keys
+
+
+def _create_write_marker_backend() -> WriteMarkerBackend:
+    if read_engine is not None and settings.database_read_sticky_backend == "redis":
+        return RedisWriteMarkerBackend(settings.database_read_sticky_redis_url)
+    return MemoryWriteMarkerBackend()
+
+
+recent_writes = RecentWriteTracker(
+    backend=_create_write_marker_backend(),
+    window_seconds=settings.database_read_sticky_seconds,
+)
+
+
+async def read_session_factory(chat_id: Optional[str] = None, user_id: Optional[str] = None) -> async_sessionmaker:
+    """
+    Pick the session factory for a read.
+
+    Returns the replica factory unless no replica is configured or the chat
+    (or the user's chat list) was written within the stickiness window.
+    """
+    if read_engine is None or await recent_writes.is_recent(chat_id, user_id):
+        return AsyncSessionLocal
+    return AsyncReadSessionLocal
+
+
+@asynccontextmanager
+async def read_session_scope(
+    primary: AsyncSession,
+    chat_id: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> AsyncIterator[AsyncSession]:
+    """
+    Yield a session for a read that may be served by the replica.
+
+    ``primary`` is yielded as-is when the read has to stay on the primary;
+    otherwise a short-lived replica session is opened and closed around the read.
+    """
+    if await read_session_factory(chat_id, user_id) is AsyncSessionLocal:
+        yield primary
+        return
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+
+def pool_stats() -> dict:
+    """Connection pool metrics of the primary and (if configured) replica engines."""
+    stats = {"primary": engine_pool_stats(engine, primary_pool_metrics)}
+    if read_engine is not None:
+        stats["replica"] = engine_pool_stats(read_engine, read_pool_metrics)
+    return stats
+
+
 async def get_session() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         try:
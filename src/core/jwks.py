@@ -0,0 +1,176 @@
+"""
+Cached JSON Web Key Set for local access token verification.
+
+``JWKSCache`` keeps the signing keys of the Stack Auth project in memory. Keys
+are refreshed in the background when the ``Cache-Control: max-age`` of the last
+response runs out, and refetched on demand when a token names an unknown
+``kid`` (key rotation), rate limited so that forged kids cannot turn every
+request into a network call. The same limit applies while no keys could be
+loaded at all: during a JWKS outage callers fail fast (and fall back to the
+API) instead of each waiting on a fetch, and the background refresh retries.
+"""
+
+import asyncio
+import re
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+import jwt
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+# Bounds applied to the server's max-age
+_MIN_TTL_SECONDS = 60
+_MAX_TTL_SECONDS = 24 * 60 * 60
+
+# Delay before retrying a failed background refresh
+_REFRESH_RETRY_SECONDS = 30
+
+
+class JWKSUnavailableError(Exception):
+    """No signing keys could be loaded (the JWKS endpoint is unreachable)."""
+
+
+class UnknownKeyError(Exception):
+    """The token's ``kid`` is not in the (freshly fetched) key set."""
+
+
+class JWKSCache:
+    """
+    In-memory JWKS with Cache-Control driven background refresh.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[httpx.Response]],
+        default_ttl: float = 300,
+        min_refetch_interval: float = 30
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            fetch: Coroutine function returning the JWKS HTTP response
+            default_ttl: Seconds keys are considered fresh when the response has no max-age
+            min_refetch_interval: Minimum seconds between on-demand fetches (unknown
+                kids, or no keys loaded yet)
+        """
+        self._fetch = fetch
+        self.default_ttl = default_ttl
+        self.min_refetch_interval = min_refetch_interval
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._last_error: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def get_signing_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        """
+        Return the key for ``kid``, fetching the key set if needed.
+
+        Raises:
+            JWKSUnavailableError: If no key set could be loaded at all
+            UnknownKeyError: If the key set does not contain ``kid``
+        """
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        if time.monotonic() - self._last_fetch >= self.min_refetch_interval:
+            await self.refresh(force=True)
+            key = self._keys.get(kid)
+            if key is not None:
+                return key
+
+        if not self._keys:
+            # Within min_refetch_interval of a failed fetch: fail without another request
+            raise JWKSUnavailableError(f"JWKS could not be loaded: {self._last_error}")
+        raise UnknownKeyError(f"Unknown signing key: {kid}")
+
+    async def refresh(self, force: bool = False) -> None:
+        """
+        Fetch the key set, coalescing concurrent callers into one request.
+
+        Args:
+            force: Fetch even if the cached keys are still fresh
+
+        Raises:
+            JWKSUnavailableError: If the fetch failed and no keys are cached
+        """
+        started = time.monotonic()
+        async with self._lock:
+            # Someone else fetched while we waited for the lock
+            if self._last_fetch >= started or (not force and started < self._expires_at):
+                return
+
+            self._last_fetch = time.monotonic()
+            try:
+                response = await self._fetch()
+                keys = _parse_keys(response.json())
+            except Exception as e:
+                self._last_error = str(e)
+                logger.error("Failed to fetch JWKS", error=str(e), cached_keys=len(self._keys))
+                if not self._keys:
+                    raise JWKSUnavailableError(str(e)) from e
+                # Keep serving the previous keys
+                return
+
+            ttl = _max_age(response.headers.get("cache-control"), self.default_ttl)
+            self._keys = keys
+            self._expires_at = time.monotonic() + ttl
+            logger.info("Loaded JWKS", keys_count=len(keys), ttl_seconds=ttl)
+
+    def start(self) -> None:
+        """Start refreshing the key set in the background before it expires."""
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def aclose(self) -> None:
+        """Stop the background refresh."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh(force=True)
+                delay = max(self._expires_at - time.monotonic(), _MIN_TTL_SECONDS)
+            except JWKSUnavailableError:
+                delay = _REFRESH_RETRY_SECONDS
+            await asyncio.sleep(delay)
+
+
+def _parse_keys(data: dict) -> Dict[str, jwt.PyJWK]:
+    """Build ``kid -> PyJWK`` from a JWKS document, skipping unusable keys."""
+    keys = {}
+    for jwk in data.get("keys", []):
+        if jwk.get("use", "sig") != "sig" or "kid" not in jwk:
+            continue
+        try:
+            keys[jwk["kid"]] = jwt.PyJWK(jwk)
+        except jwt.PyJWTError as e:
+            logger.warning("Skipping unsupported JWK", kid=jwk.get("kid"), error=str(e))
+    if not keys:
+        raise ValueError("JWKS contains no usable signing keys")
+    return keys
+
+
+def _max_age(cache_control: Optional[str], default: float) -> float:
+    """Freshness lifetime from a Cache-Control header, clamped to sane bounds."""
+    if cache_control:
+        if "no-store" in cache_control or "no-cache" in cache_control:
+            return _MIN_TTL_SECONDS
+        match = _MAX_AGE_RE.search(cache_control)
+        if match:
+            return min(max(int(match.group(1)), _MIN_TTL_SECONDS), _MAX_TTL_SECONDS)
+    return default
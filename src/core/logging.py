@@ -1,4 +1,7 @@
 import logging
+import random
+from typing import Any
+
 import structlog
 from src.core.config import settings
 
@@ -46,4 +49,45 @@ def configure_logging():
     root_logger = logging.getLogger()
     root_logger.handlers.clear() # Clear existing handlers to avoid duplicates
     root_logger.addHandler(handler)
-    root_logger.setLevel(settings.log_level)
\ No newline at end of file
+    root_logger.setLevel(settings.log_level)
+
+
+class HotPathLogger:
+    """
+    Logger for code that runs on every request (authentication, streaming).
+    
+    - Level-gated: the stdlib level is checked before anything else, so
+      disabled events never reach structlog's processor chain (which runs
+      before the stdlib level filter).
+    - Sampled: debug/info events are emitted for ``sample_rate`` of calls and
+      carry the rate, so counts can be scaled back up. Warnings and errors are
+      never sampled.
+    - Structured: callers pass ids and small scalars as fields; formatting
+      only happens for emitted events.
+    """
+    
+    def __init__(self, name: str, sample_rate: float = 1.0):
+        self._stdlib_logger = logging.getLogger(name)
+        self._logger = structlog.get_logger(name)
+        self.sample_rate = sample_rate
+    
+    def debug(self, event: str, **fields: Any) -> None:
+        self._log(logging.DEBUG, event, fields, sampled=True)
+    
+    def info(self, event: str, **fields: Any) -> None:
+        self._log(logging.INFO, event, fields, sampled=True)
+    
+    def warning(self, event: str, **fields: Any) -> None:
+        self._log(logging.WARNING, event, fields, sampled=False)
+    
+    def error(self, event: str, **fields: Any) -> None:
+        self._log(logging.ERROR, event, fields, sampled=False)
+    
+    def _log(self, level: int, event: str, fields: dict, sampled: bool) -> None:
+        if not self._stdlib_logger.isEnabledFor(level):
+            return
+        if sampled and self.sample_rate < 1.0:
+            if random.random() >= self.sample_rate:
+                return
+            fields["sample_rate"] = self.sample_rate
+        self._logger.log(level, event, **fields)
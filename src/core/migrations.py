@@ -0,0 +1,222 @@
+"""
+Lightweight, idempotent data migrations run on application startup.
+
+Schema objects themselves are created by ``SQLModel.metadata.create_all`` in the
+FastAPI lifespan; this module only moves existing data into new structures.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+
+from sqlalchemy import func, insert, null, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlmodel import SQLModel, select, update
+import structlog
+
+from src.models.chat import Chat, ChatItem
+
+logger = structlog.get_logger(__name__)
+
+
+# Columns added to existing tables after their first release. create_all only
+# creates missing tables, so these are added here, followed by an optional
+# backfill statement that runs only when the column was actually added.
+_ADDED_COLUMNS = [
+    ("chats", "version", "INTEGER NOT NULL DEFAULT 0", None),
+    ("chats", "summary", "TEXT", None),
+    ("chats", "summary_seq", "INTEGER", None),
+    (
+        "chats", "message_count", "INTEGER NOT NULL DEFAULT 0",
+        "UPDATE chats SET message_count = "
+        "(SELECT COUNT(*) FROM chat_items WHERE chat_items.chat_id = chats.chat_id)"
+    ),
+    (
+        "chats", "next_seq", "INTEGER NOT NULL DEFAULT 0",
+        "UPDATE chats SET next_seq = "
+        "(SELECT COALESCE(MAX(seq) + 1, 0) FROM chat_items WHERE chat_items.chat_id = chats.chat_id)"
+    ),
+    ("agent_jobs", "heartbeat_at", "TIMESTAMP WITH TIME ZONE", None),
+]
+
+# JSON columns converted to JSONB
+_JSONB_COLUMNS = [
+    ("chats", "conversation"),
+    ("chat_items", "item"),
+]
+
+
+async def add_missing_columns(conn: AsyncConnection) -> None:
+    """
+    Add columns introduced after a table was first created.
+
+    Args:
+        conn: Async connection inside a transaction (``engine.begin()``)
+    """
+    for table, column, ddl, backfill in _ADDED_COLUMNS:
+        result = await conn.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+            ),
+            {"table": table, "column": column}
+        )
+        if result.first() is not None:
+            continue
+
+        await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        if backfill:
+            await conn.execute(text(backfill))
+        logger.info("Added missing column", table=table, column=column)
+
+
+async def upgrade_schema(conn: AsyncConnection) -> None:
+    """
+    Bring tables created by earlier releases up to the current models.
+
+    Args:
+        conn: Async connection inside a transaction (``engine.begin()``)
+    """
+    await add_missing_columns(conn)
+    await convert_json_columns(conn)
+    await create_missing_indexes(conn)
+
+
+async def convert_json_columns(conn: AsyncConnection) -> None:
+    """
+    Convert legacy ``json`` columns to ``jsonb``.
+
+    Args:
+        conn: Async connection inside a transaction (``engine.begin()``)
+    """
+    for table, column in _JSONB_COLUMNS:
+        result = await conn.execute(
+            text(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+            ),
+            {"table": table, "column": column}
+        )
+        if result.scalar() != "json":
+            continue
+
+        await conn.execute(
+            text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb")
+        )
+        logger.info("Converted column to jsonb", table=table, column=column)
+
+
+# Indexes no longer declared on the models: superseded by a wider definition,
+# or (the GIN index on chat_items.item) unused by any query and only adding
+# write cost to every append
+_DROPPED_INDEXES = [
+    "ix_chats_user_active_updated",
+    "ix_chat_items_item_gin",
+]
+
+
+async def create_missing_indexes(conn: AsyncConnection) -> None:
+    """
+    Create indexes declared on models that existing tables do not have yet,
+    and drop indexes they replace.
+
+    Args:
+        conn: Async connection inside a transaction (``engine.begin()``)
+    """
+    for index_name in _DROPPED_INDEXES:
+        await conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+    def _create(sync_conn) -> None:
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(sync_conn, checkfirst=True)
+
+    await conn.run_sync(_create)
+
+
+async def migrate_chat_conversations(session: AsyncSession, batch_size: int = 100) -> int:
+    """
+    Move legacy ``Chat.conversation`` blobs into append-only ``chat_items`` rows.
+
+    Each chat is migrated in its own transaction and its conversation column is
+    reset to SQL NULL afterwards, so the migration can be interrupted and re-run
+    safely. Items already present for a chat are kept and the legacy items are
+    inserted before them.
+
+    Args:
+        session: SQLAlchemy async session
+        batch_size: Number of chats to load per query
+
+    Returns:
+        int: Number of chats migrated
+    """
+    migrated = 0
+    while True:
+        statement = (
+            select(Chat.chat_id, Chat.conversation)
+            .where(Chat.conversation.isnot(None))
+            .limit(batch_size)
+        )
+        result = await session.execute(statement)
+        rows = result.all()
+        if not rows:
+            break
+
+        for chat_id, conversation in rows:
+            items = _decode_conversation(conversation)
+            try:
+                next_seq = Chat.next_seq
+                if items:
+                    first_seq = await _prepend_items(session, chat_id, items)
+                    next_seq = func.greatest(Chat.next_seq, first_seq + len(items))
+                await session.execute(
+                    update(Chat)
+                    .where(Chat.chat_id == chat_id)
+                    .values(
+                        conversation=null(),
+                        version=Chat.version + 1,
+                        message_count=Chat.message_count + len(items),
+                        next_seq=next_seq
+                    )
+                )
+                await session.commit()
+                migrated += 1
+            except Exception as e:
+                logger.error("Failed to migrate chat conversation", error=str(e), chat_id=chat_id)
+                await session.rollback()
+                raise
+
+    if migrated:
+        logger.info("Migrated legacy chat conversations", chats_count=migrated)
+    return migrated
+
+
+def _decode_conversation(conversation: Any) -> List[dict]:
+    """Normalise a legacy conversation value (JSON text, JSON null or list)."""
+    if isinstance(conversation, str):
+        conversation = json.loads(conversation)
+    return list(conversation or [])
+
+
+async def _prepend_items(session: AsyncSession, chat_id: str, items: List[dict]) -> int:
+    """
+    Insert items ahead of any rows the chat already has in ``chat_items``.
+
+    Returns:
+        int: Sequence number of the first inserted item
+    """
+    result = await session.execute(
+        select(func.min(ChatItem.seq)).where(ChatItem.chat_id == chat_id)
+    )
+    min_seq: Optional[int] = result.scalar()
+    first_seq = 0 if min_seq is None else min_seq - len(items)
+    now = datetime.now(timezone.utc)
+
+    await session.execute(
+        insert(ChatItem),
+        [
+            {"chat_id": chat_id, "seq": first_seq + offset, "item": item, "created_at": now}
+            for offset, item in enumerate(items)
+        ]
+    )
+    return first_seq
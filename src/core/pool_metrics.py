@@ -0,0 +1,111 @@
+"""
+Connection pool instrumentation for the async database engines.
+
+``instrumented_pool_class`` returns an ``AsyncAdaptedQueuePool`` subclass that
+records how long each checkout waited and how many checkouts timed out. Live
+occupancy (checked out, overflow, idle) is read from the pool itself when the
+metrics are reported.
+"""
+
+import time
+from bisect import bisect_left
+from typing import List, Optional, Type
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Upper bounds (seconds) of the checkout wait time histogram buckets
+WAIT_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    """
+    Checkout counters and a wait time histogram for one pool.
+    """
+
+    def __init__(self, buckets: tuple = WAIT_TIME_BUCKETS):
+        """
+        Initialize the metrics.
+
+        Args:
+            buckets: Ascending upper bounds of the wait time histogram, in seconds
+        """
+        self.buckets = buckets
+        self.bucket_counts: List[int] = [0] * (len(buckets) + 1)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def observe(self, wait_seconds: float) -> None:
+        """Record the wait time of one checkout attempt."""
+        self.bucket_counts[bisect_left(self.buckets, wait_seconds)] += 1
+        self.wait_seconds_total += wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def stats(self, pool: Optional[AsyncAdaptedQueuePool] = None) -> dict:
+        """Counters, cumulative histogram and (if given) live pool occupancy."""
+        observed = sum(self.bucket_counts)
+        cumulative = 0
+        histogram = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.bucket_counts):
+            cumulative += count
+            histogram.append({"le": "+Inf" if bound == float("inf") else bound, "count": cumulative})
+
+        stats = {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "wait_seconds": {
+                "count": observed,
+                "sum": round(self.wait_seconds_total, 6),
+                "max": round(self.wait_seconds_max, 6),
+                "avg": round(self.wait_seconds_total / observed, 6) if observed else None,
+                "histogram": histogram,
+            },
+        }
+        if pool is not None:
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+                timeout_seconds=pool.timeout(),
+            )
+        return stats
+
+
+def instrumented_pool_class(metrics: PoolMetrics) -> Type[AsyncAdaptedQueuePool]:
+    """
+    Build a queue pool class that reports checkouts to ``metrics``.
+
+    A class (rather than an instance) is returned because the engine builds the
+    pool itself and rebuilds it on ``dispose()``; every rebuilt pool keeps
+    reporting to the same metrics.
+    """
+
+    class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                metrics.timeouts += 1
+                raise
+            except Exception:
+                metrics.errors += 1
+                raise
+            finally:
+                metrics.observe(time.perf_counter() - start)
+            metrics.checkouts += 1
+            return connection
+
+    return InstrumentedAsyncQueuePool
+
+
+def engine_pool_stats(engine: AsyncEngine, metrics: PoolMetrics) -> dict:
+    """Metrics of an engine's pool, for diagnostics endpoints."""
+    return metrics.stats(engine.sync_engine.pool)
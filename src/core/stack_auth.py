@@ -1,10 +1,18 @@
-import requests
+import asyncio
+import random
 from typing import Optional, Dict, Any
+
+import httpx
+import jwt
 from pydantic import BaseModel
 import structlog
 from src.core.config import settings
+from src.core.jwks import JWKSCache
+from src.core.logging import HotPathLogger
 
 logger = structlog.get_logger(__name__)
+# Per-request events: level-gated, sampled, ids only
+hot_logger = HotPathLogger(__name__, sample_rate=settings.auth_log_sample_rate)
 
 class StackAuthUser(BaseModel):
     """Official Stack Auth user data structure based on API documentation"""
@@ -21,74 +29,170 @@ class StackAuthUser(BaseModel):
     client_metadata: Optional[Dict[str, Any]] = None
     client_read_only_metadata: Optional[Dict[str, Any]] = None
 
+class _RetryableResponse(Exception):
+    """Internal signal for a response worth retrying (429 or 5xx)."""
+    
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code} from {response.request.url}")
+        self.response = response
+
+# Clock skew tolerated when checking exp/iat
+_JWT_LEEWAY_SECONDS = 5
+
+def _is_retryable_status(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
 class StackAuthClient:
     """Stack Auth client using official API headers and structure"""
     
     def __init__(self):
         self.settings = settings
         self.api_base_url = self.settings.stack_api_base_url
+        self._http: Optional[httpx.AsyncClient] = None
         
-        # Initialize JWKS client for JWT verification
-        # self.jwks_client = PyJWKClient(
-        #     f"{self.api_base_url}/api/v1/projects/{self.settings.stack_project_id}/.well-known/jwks.json"
-        # )
+        # Signing keys for local JWT verification
+        self.jwks_path = f"/api/v1/projects/{self.settings.stack_project_id}/.well-known/jwks.json"
+        self.jwks = JWKSCache(
+            fetch=self._fetch_jwks,
+            default_ttl=self.settings.stack_auth_jwks_default_ttl,
+            min_refetch_interval=self.settings.stack_auth_jwks_min_refetch_interval
+        )
         
         logger.info("Stack Auth client initialized", project_id=self.settings.stack_project_id)
     
-    def _make_stack_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
-        """Make authenticated request to Stack Auth API using official headers from docs"""
-        headers = {
-            'X-Stack-Access-Type': 'server',  # Official header name from docs
-            'X-Stack-Project-Id': self.settings.stack_project_id,
-            'X-Stack-Publishable-Client-Key': self.settings.stack_publishable_client_key,
-            'X-Stack-Secret-Server-Key': self.settings.stack_secret_server_key,
-            **kwargs.pop('headers', {})
-        }
+    async def start(self) -> None:
+        """
+        Create the shared HTTP client (keep-alive pool, HTTP/2 when available).
         
-        url = f"{self.api_base_url}/{endpoint}"
+        Called from the FastAPI lifespan; requests made before that start the
+        client lazily.
+        """
+        if self._http is not None:
+            return
         
-        try:
-            response = requests.request(method, url, headers=headers, **kwargs)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error("Stack Auth API request failed", 
-                        method=method, endpoint=endpoint, error=str(e))
-            raise Exception(f"Stack Auth API request failed: {str(e)}")
+        http2 = self.settings.stack_auth_http2
+        self._http = httpx.AsyncClient(
+            base_url=self.api_base_url,
+            http2=http2,
+            timeout=httpx.Timeout(
+                self.settings.stack_auth_read_timeout,
+                connect=self.settings.stack_auth_connect_timeout
+            ),
+            limits=httpx.Limits(
+                max_connections=self.settings.stack_auth_max_connections,
+                max_keepalive_connections=self.settings.stack_auth_max_keepalive_connections
+            ),
+            headers={
+                'X-Stack-Access-Type': 'server',  # Official header name from docs
+                'X-Stack-Project-Id': self.settings.stack_project_id,
+                'X-Stack-Publishable-Client-Key': self.settings.stack_publishable_client_key,
+                'X-Stack-Secret-Server-Key': self.settings.stack_secret_server_key,
+            }
+        )
+        logger.info("Stack Auth HTTP client started", http2=http2)
+        
+        if self.settings.stack_auth_verify_locally:
+            self.jwks.start()
+    
+    async def aclose(self) -> None:
+        """Stop the JWKS refresh and close the shared HTTP client."""
+        await self.jwks.aclose()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
+    async def _make_stack_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+        """
+        Make authenticated request to Stack Auth API using official headers from docs.
+        
+        Idempotent requests are retried on connection errors, timeouts, 429 and
+        5xx responses, with exponential backoff and full jitter.
+        """
+        if self._http is None:
+            await self.start()
+        
+        retries = self.settings.stack_auth_max_retries if method.upper() in ("GET", "HEAD") else 0
+        attempt = 0
+        while True:
+            try:
+                response = await self._http.request(method, f"/{endpoint}", **kwargs)
+                if _is_retryable_status(response.status_code) and attempt < retries:
+                    raise _RetryableResponse(response)
+                response.raise_for_status()
+                return response.json()
+            except (httpx.TransportError, _RetryableResponse) as e:
+                if attempt >= retries:
+                    logger.error("Stack Auth API request failed", 
+                                method=method, endpoint=endpoint, error=str(e), attempts=attempt + 1)
+                    raise Exception(f"Stack Auth API request failed: {str(e)}")
+                delay = random.uniform(0, self.settings.stack_auth_retry_backoff * (2 ** attempt))
+                logger.warning("Retrying Stack Auth API request",
+                              method=method, endpoint=endpoint, error=str(e), attempt=attempt + 1,
+                              delay=round(delay, 3))
+                attempt += 1
+                await asyncio.sleep(delay)
+            except httpx.HTTPError as e:
+                logger.error("Stack Auth API request failed", 
+                            method=method, endpoint=endpoint, error=str(e))
+                raise Exception(f"Stack Auth API request failed: {str(e)}")
     
     async def verify_token_via_api(self, access_token: str) -> StackAuthUser:
         """Verify access token via REST API (comprehensive user data)"""
         try:
-            user_data = self._make_stack_request(
+            user_data = await self._make_stack_request(
                 'GET', 
                 'api/v1/users/me',
                 headers={'X-Stack-Access-Token': access_token}  # Official header name
             )
             
-            logger.info("User authenticated via API", user_id=user_data.get('id'))
+            hot_logger.info("User authenticated via API", user_id=user_data.get('id'))
             return StackAuthUser(**user_data)
             
         except Exception as e:
-            logger.error("Token verification via API failed", error=str(e))
+            hot_logger.warning("Token verification via API failed", error=str(e))
             raise
     
-    # async def verify_token_via_jwt(self, access_token: str) -> Dict[str, Any]:
-    #     """Verify access token locally via JWT (faster, basic user data)"""
-    #     try:
-    #         signing_key = self.jwks_client.get_signing_key_from_jwt(access_token)
-    #         payload = jwt.decode(
-    #             access_token,
-    #             signing_key.key,
-    #             algorithms=["ES256"],
-    #             audience=self.settings.stack_project_id
-    #         )
-            
-    #         logger.info("User authenticated via JWT", user_id=payload.get('sub'))
-    #         return payload
-            
-    #     except Exception as e:
-    #         logger.error("JWT verification failed", error=str(e))
-    #         raise Exception("Invalid access token")
+    async def _fetch_jwks(self) -> httpx.Response:
+        """Fetch the project's JSON Web Key Set (the JWKS cache handles retries)."""
+        if self._http is None:
+            await self.start()
+        response = await self._http.get(self.jwks_path)
+        response.raise_for_status()
+        return response
+    
+    async def verify_token_via_jwt(self, access_token: str) -> Dict[str, Any]:
+        """
+        Verify access token locally via JWT (no network call once keys are cached).
+        
+        Returns:
+            The verified token claims (``sub`` is the user id)
+        
+        Raises:
+            JWKSUnavailableError: If the signing keys could not be loaded
+            Exception: If the token is invalid or expired
+        """
+        try:
+            header = jwt.get_unverified_header(access_token)
+        except jwt.PyJWTError as e:
+            hot_logger.warning("Malformed access token", error=str(e))
+            raise Exception("Invalid access token")
+        
+        signing_key = await self.jwks.get_signing_key(header.get("kid"))
+        try:
+            payload = jwt.decode(
+                access_token,
+                signing_key.key,
+                algorithms=["ES256"],
+                audience=self.settings.stack_project_id,
+                leeway=_JWT_LEEWAY_SECONDS,
+                options={"require": ["exp", "sub"]}
+            )
+        except jwt.PyJWTError as e:
+            hot_logger.warning("JWT verification failed", error=str(e))
+            raise Exception("Invalid access token")
+        
+        hot_logger.debug("User authenticated via JWT", user_id=payload.get('sub'))
+        return payload
 
 # Global instance
 stack_auth_client = StackAuthClient()
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+Cache of verified access tokens and the user data they resolve to.
+
+Entries are keyed by a SHA-256 hash of the token (tokens themselves are never
+stored) and expire after a TTL, but never later than the token's own ``exp``.
+Concurrent misses for the same token share one verification (single-flight).
+
+The storage is pluggable: ``MemoryTokenCacheBackend`` is per process,
+``RedisTokenCacheBackend`` lets several workers share verifications.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Protocol, Tuple
+
+import jwt
+import structlog
+
+from src.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+
+class TokenCacheBackend(Protocol):
+    """Storage for cached user data, keyed by token hash."""
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored value, or None if missing or expired."""
+        ...
+
+    async def set(self, key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        """Store a value for ``ttl_seconds``."""
+        ...
+
+
+class MemoryTokenCacheBackend:
+    """Bounded in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        """
+        Initialize the backend.
+
+        Args:
+            max_entries: Maximum number of tokens kept (least recently used evicted)
+        """
+        self.max_entries = max_entries
+        # key -> (expires_at wall clock, value)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        self._entries[key] = (time.time() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisTokenCacheBackend:
+    """Shared backend on Redis (requires the optional ``redis`` package)."""
+
+    def __init__(self, url: str, prefix: str = "auth:token:"):
+        """
+        Initialize the backend.
+
+        Args:
+            url: Redis connection URL
+            prefix: Key prefix for cache entries
+        """
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError(
+                "AUTH_CACHE_BACKEND=redis requires the 'redis' package (pip install redis)"
+            ) from e
+
+        self.prefix = prefix
+        self._redis = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self._redis.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl_seconds: float) -> None:
+        await self._redis.set(
+            self.prefix + key,
+            json.dumps(value, default=str),
+            px=max(int(ttl_seconds * 1000), 1)
+        )
+
+
+class TokenCache:
+    """
+    TTL cache in front of token verification, with single-flight misses.
+    """
+
+    def __init__(self, backend: TokenCacheBackend, ttl_seconds: float, enabled: bool = True):
+        """
+        Initialize the cache.
+
+        Args:
+            backend: Storage for cached entries
+            ttl_seconds: Maximum lifetime of an entry (capped by the token's exp)
+            enabled: When False every lookup runs the loader
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.backend_errors = 0
+
+    async def get_or_load(
+        self,
+        token: str,
+        loader: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Return cached user data for ``token``, verifying it with ``loader`` on a miss.
+
+        Failed verifications are not cached; every caller waiting on the same
+        miss receives the loader's exception.
+
+        Returns:
+            A copy of the user data, safe for the caller to modify
+        """
+        if not self.enabled:
+            return await loader()
+
+        key = _token_key(token)
+        value = await self._backend_get(key)
+        if value is not None:
+            self.hits += 1
+            return dict(value)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # A task of its own, so a caller that disconnects does not fail the others
+            task = asyncio.create_task(self._load(key, token, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_load(key, done))
+        return dict(await asyncio.shield(task))
+
+    async def update(self, token: str, value: Dict[str, Any]) -> None:
+        """Replace the cached user data of a token (e.g. after loading the profile)."""
+        if self.enabled:
+            await self._store(_token_key(token), token, value)
+
+    def stats(self) -> dict:
+        """Cache counters, for diagnostics endpoints."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "backend_errors": self.backend_errors,
+            "inflight": len(self._inflight),
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    async def _load(
+        self,
+        key: str,
+        token: str,
+        loader: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        value = await loader()
+        await self._store(key, token, value)
+        return value
+
+    def _finish_load(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
+
+    async def _backend_get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            # A broken shared cache must not break authentication
+            self.backend_errors += 1
+            logger.warning("Token cache lookup failed", error=str(e))
+            return None
+
+    async def _store(self, key: str, token: str, value: Dict[str, Any]) -> None:
+        ttl = self.ttl_seconds
+        expires_at = _token_expiry(token)
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        if ttl <= 0:
+            return
+
+        try:
+            await self.backend.set(key, value, ttl)
+        except Exception as e:
+            self.backend_errors += 1
+            logger.warning("Token cache store failed", error=str(e))
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _token_expiry(token: str) -> Optional[float]:
+    """
+    The token's ``exp`` claim, if it is a JWT.
+
+    Only called after the token was verified, so the signature is not checked again.
+    """
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        return float(exp) if exp is not None else None
+    except (jwt.PyJWTError, TypeError, ValueError):
+        return None
+
+
+def _create_backend() -> TokenCacheBackend:
+    if settings.auth_cache_backend == "redis":
+        return RedisTokenCacheBackend(settings.auth_cache_redis_url)
+    return MemoryTokenCacheBackend(max_entries=settings.auth_cache_max_entries)
+
+
+# Global instance
+token_cache = TokenCache(
+    backend=_create_backend(),
+    ttl_seconds=settings.auth_cache_ttl_seconds,
+    enabled=settings.auth_cache_enabled,
+)
@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Iterable, Optional, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func
+from sqlmodel import select, update
+import structlog
+
+from src.models.job import AgentJob
+
+logger = structlog.get_logger()
+
+async def create_job(session: AsyncSession, job: AgentJob) -> AgentJob:
+    """Persist a newly submitted job."""
+    session.add(job)
+    await session.commit()
+    logger.info("Created agent job", job_id=job.job_id, user_id=job.user_id)
+    return job
+
+async def update_job(session: AsyncSession, job_id: str, **fields: Any) -> None:
+    """Update columns of a job (status, result, timestamps)."""
+    await session.execute(
+        update(AgentJob).where(AgentJob.job_id == job_id).values(**fields)
+    )
+    await session.commit()
+
+async def touch_jobs(session: AsyncSession, job_ids: Iterable[str], now: datetime) -> None:
+    """Refresh the heartbeat of jobs owned by this worker."""
+    await session.execute(
+        update(AgentJob).where(AgentJob.job_id.in_(list(job_ids))).values(heartbeat_at=now)
+    )
+    await session.commit()
+
+async def fail_orphaned_jobs(session: AsyncSession, stale_before: datetime, error: str) -> int:
+    """
+    Mark queued or running jobs whose worker stopped heartbeating as failed.
+
+    Returns:
+        Number of jobs marked as failed
+    """
+    result = await session.execute(
+        update(AgentJob)
+        .where(
+            AgentJob.status.in_(("queued", "running")),
+            func.coalesce(AgentJob.heartbeat_at, AgentJob.created_at) < stale_before
+        )
+        .values(status="failed", error=error, finished_at=func.now())
+    )
+    await session.commit()
+    return result.rowcount
+
+async def get_job(session: AsyncSession, job_id: str, user_id: str) -> Optional[AgentJob]:
+    """Get a job by ID for a user."""
+    statement = select(AgentJob).where(
+        AgentJob.job_id == job_id,
+        AgentJob.user_id == user_id
+    )
+    result = await session.execute(statement)
+    return result.scalars().first()
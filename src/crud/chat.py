@@ -1,10 +1,14 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy import Row, func, insert, null, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select, update
+from sqlmodel import select, update, delete
 from datetime import datetime, timezone
 import structlog
 
-from src.models.chat import Chat
+from src.models.chat import Chat, ChatItem
+from src.agents.utils.history_cache import history_cache
+from src.crud.chat_counts import chat_count_cache
+from src.core.database import recent_writes
 from src.schemas.chat import ChatCreate, ChatUpdate
 
 logger = structlog.get_logger()
@@ -14,13 +18,20 @@ async def create_chat(session: AsyncSession, user_id: str, chat_data: ChatCreate
     chat = Chat(
         user_id=user_id,
         title=chat_data.title,
-        conversation=chat_data.conversation,
-        is_active=chat_data.is_active
+        conversation=None,
+        is_active=chat_data.is_active,
+        message_count=len(chat_data.conversation or []),
+        next_seq=len(chat_data.conversation or [])
     )
     
     session.add(chat)
+    await session.flush()
+    if chat_data.conversation:
+        await _insert_chat_items(session, chat.chat_id, chat_data.conversation)
     await session.commit()
     await session.refresh(chat)
+    chat_count_cache.adjust(user_id, total_delta=1, active_delta=1 if chat.is_active else 0)
+    await recent_writes.mark(chat.chat_id, user_id)
     
     logger.info("Created chat", chat_id=chat.chat_id, user_id=user_id)
     return chat
@@ -37,6 +48,8 @@ async def create_new_chat_for_user(session: AsyncSession, user_id: str, title: O
     session.add(chat)
     await session.commit()
     await session.refresh(chat)
+    chat_count_cache.adjust(user_id, total_delta=1, active_delta=1)
+    await recent_writes.mark(chat.chat_id, user_id)
     
     logger.info("Created new chat for user", chat_id=chat.chat_id, user_id=user_id)
     return chat.chat_id
@@ -50,23 +63,90 @@ async def get_chat_by_id(session: AsyncSession, chat_id: str, user_id: str) -> O
     result = await session.execute(statement)
     return result.scalars().first()
 
+async def get_chat_conversation(session: AsyncSession, chat_id: str) -> List[Dict[str, Any]]:
+    """Get the conversation items of a chat in chronological order."""
+    statement = (
+        select(ChatItem.item)
+        .where(ChatItem.chat_id == chat_id)
+        .order_by(ChatItem.seq)
+    )
+    result = await session.execute(statement)
+    return list(result.scalars().all())
+
+async def get_chat_messages(
+    session: AsyncSession,
+    chat_id: str,
+    before_seq: Optional[int] = None,
+    limit: int = 50
+) -> Tuple[List[Dict[str, Any]], Optional[int], bool]:
+    """
+    Get a page of conversation items, walking backwards from the newest.
+    
+    Returns:
+        (items oldest first, seq of the oldest returned item, whether older items exist)
+    """
+    statement = select(ChatItem.seq, ChatItem.item).where(ChatItem.chat_id == chat_id)
+    if before_seq is not None:
+        statement = statement.where(ChatItem.seq < before_seq)
+    statement = statement.order_by(ChatItem.seq.desc()).limit(limit + 1)
+    
+    result = await session.execute(statement)
+    rows = result.all()
+    has_more = len(rows) > limit
+    rows = list(reversed(rows[:limit]))
+    
+    oldest_seq = rows[0].seq if rows else None
+    return [row.item for row in rows], oldest_seq, has_more
+
+async def _insert_chat_items(session: AsyncSession, chat_id: str, items: List[Dict[str, Any]]) -> None:
+    """Bulk insert conversation items for a chat, numbering them from 0."""
+    if not items:
+        return
+    now = datetime.now(timezone.utc)
+    await session.execute(
+        insert(ChatItem),
+        [
+            {"chat_id": chat_id, "seq": seq, "item": item, "created_at": now}
+            for seq, item in enumerate(items)
+        ]
+    )
+
 async def get_user_chats(
     session: AsyncSession, 
     user_id: str, 
     skip: int = 0, 
     limit: int = 100,
-    active_only: bool = True
-) -> List[Chat]:
-    """Get all chats for a user with pagination."""
-    statement = select(Chat).where(Chat.user_id == user_id)
+    active_only: bool = True,
+    after: Optional[Tuple[datetime, str]] = None
+) -> List[Row]:
+    """
+    Get chat summaries for a user with pagination, without loading conversations.
+    
+    Chats are ordered by (updated_at, chat_id) descending. When `after` is given
+    (the updated_at and chat_id of the last chat of the previous page), keyset
+    pagination is used and `skip` is ignored.
+    """
+    statement = select(
+        Chat.chat_id,
+        Chat.title,
+        Chat.is_active,
+        Chat.message_count,
+        Chat.created_at,
+        Chat.updated_at
+    ).where(Chat.user_id == user_id)
     
     if active_only:
         statement = statement.where(Chat.is_active == True)
     
-    statement = statement.order_by(Chat.updated_at.desc()).offset(skip).limit(limit)
+    if after is not None:
+        statement = statement.where(tuple_(Chat.updated_at, Chat.chat_id) < tuple_(*after))
+    elif skip:
+        statement = statement.offset(skip)
+    
+    statement = statement.order_by(Chat.updated_at.desc(), Chat.chat_id.desc()).limit(limit)
     
     result = await session.execute(statement)
-    return result.scalars().all()
+    return result.all()
 
 async def update_chat(
     session: AsyncSession, 
@@ -81,6 +161,19 @@ async def update_chat(
     
     # Update fields if provided
     update_data = chat_data.model_dump(exclude_unset=True)
+    if "conversation" in update_data:
+        # Conversation lives in chat_items; replace the rows instead of the legacy column
+        conversation = update_data.pop("conversation") or []
+        await session.execute(delete(ChatItem).where(ChatItem.chat_id == chat_id))
+        await _insert_chat_items(session, chat_id, conversation)
+        update_data.update(
+            conversation=null(),
+            summary=None,
+            summary_seq=None,
+            message_count=len(conversation),
+            next_seq=len(conversation)
+        )
+        update_data["version"] = Chat.version + 1
     if update_data:
         update_data['updated_at'] = datetime.now(timezone.utc)
         
@@ -95,6 +188,9 @@ async def update_chat(
         await session.execute(statement)
         await session.commit()
         await session.refresh(chat)
+        await recent_writes.mark(chat_id, user_id)
+        if "is_active" in update_data:
+            chat_count_cache.invalidate(user_id)
         
         logger.info("Updated chat", chat_id=chat_id, user_id=user_id)
     
@@ -106,10 +202,14 @@ async def delete_chat(session: AsyncSession, chat_id: str, user_id: str) -> bool
     if not chat:
         return False
     
+    was_active = chat.is_active
     chat.is_active = False
     chat.updated_at = datetime.now(timezone.utc)
     
     await session.commit()
+    await recent_writes.mark(chat_id, user_id)
+    if was_active:
+        chat_count_cache.adjust(user_id, active_delta=-1)
     logger.info("Deleted chat", chat_id=chat_id, user_id=user_id)
     return True
 
@@ -119,18 +219,33 @@ async def hard_delete_chat(session: AsyncSession, chat_id: str, user_id: str) ->
     if not chat:
         return False
     
+    was_active = chat.is_active
     await session.delete(chat)
     await session.commit()
+    history_cache.invalidate(chat_id)
+    await recent_writes.mark(chat_id, user_id)
+    chat_count_cache.adjust(user_id, total_delta=-1, active_delta=-1 if was_active else 0)
     
     logger.info("Hard deleted chat", chat_id=chat_id, user_id=user_id)
     return True
 
 async def get_chat_count(session: AsyncSession, user_id: str, active_only: bool = True) -> int:
-    """Get the total count of chats for a user."""
-    statement = select(Chat).where(Chat.user_id == user_id)
+    """
+    Get the total count of chats for a user.
+    
+    Served from the per-user count cache when possible; otherwise a COUNT(*)
+    answered from the (user_id, is_active, updated_at) index.
+    """
+    cached = chat_count_cache.get(user_id, active_only)
+    if cached is not None:
+        return cached
+    
+    statement = select(func.count()).select_from(Chat).where(Chat.user_id == user_id)
     
     if active_only:
         statement = statement.where(Chat.is_active == True)
     
     result = await session.execute(statement)
-    return len(result.scalars().all())
+    count = result.scalar_one()
+    chat_count_cache.set(user_id, active_only, count)
+    return count
@@ -0,0 +1,87 @@
+"""
+Per-user cache of chat totals used for /chats pagination metadata.
+
+Counts are kept in sync by the chat mutators in this process and expire after
+a TTL, which bounds staleness from writes made by other workers.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from src.core.config import settings
+
+
+class ChatCountCache:
+    """Bounded TTL cache of ``(user_id, active_only) -> count``."""
+
+    def __init__(self, ttl_seconds: float, max_users: int, enabled: bool = True):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: Lifetime of a cached count
+            max_users: Maximum number of users kept (least recently used evicted)
+            enabled: When False every lookup is a miss and writes are ignored
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self.enabled = enabled
+        # user_id -> (expires_at, total count, active count); either count may be unknown
+        self._entries: "OrderedDict[str, Tuple[float, Optional[int], Optional[int]]]" = OrderedDict()
+
+    def get(self, user_id: str, active_only: bool) -> Optional[int]:
+        """Return the cached count, or None if unknown or expired."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, total, active = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+
+        self._entries.move_to_end(user_id)
+        return active if active_only else total
+
+    def set(self, user_id: str, active_only: bool, count: int) -> None:
+        """Store a count freshly read from the database."""
+        if not self.enabled:
+            return
+
+        expires_at, total, active = self._entries.pop(
+            user_id, (time.monotonic() + self.ttl_seconds, None, None)
+        )
+        if active_only:
+            active = count
+        else:
+            total = count
+        self._entries[user_id] = (expires_at, total, active)
+
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+    def adjust(self, user_id: str, total_delta: int = 0, active_delta: int = 0) -> None:
+        """Apply a committed change to the cached counts, if any are cached."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return
+
+        expires_at, total, active = entry
+        self._entries[user_id] = (
+            expires_at,
+            None if total is None else max(total + total_delta, 0),
+            None if active is None else max(active + active_delta, 0),
+        )
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget the counts of a user."""
+        self._entries.pop(user_id, None)
+
+
+# Global instance
+chat_count_cache = ChatCountCache(
+    ttl_seconds=settings.chat_count_cache_ttl_seconds,
+    max_users=settings.chat_count_cache_max_users,
+    enabled=settings.chat_count_cache_enabled,
+)
@@ -1,10 +1,19 @@
+import asyncio
 import json
+from dataclasses import dataclass
 from typing import Dict, Any, Optional
-from fastapi import Depends, HTTPException, status, Request, Header
-from src.core.stack_auth import stack_auth_client, StackAuthUser
+from fastapi import Depends, HTTPException, status, Request, WebSocket, WebSocketDisconnect
+from starlette.requests import HTTPConnection
+from src.core.stack_auth import stack_auth_client, StackAuthClient, StackAuthUser
+from src.core.jwks import JWKSUnavailableError
+from src.core.token_cache import token_cache
+from src.core.config import settings
+from src.core.logging import HotPathLogger
 import structlog
 
 logger = structlog.get_logger(__name__)
+# Per-request events: level-gated, sampled, ids only
+hot_logger = HotPathLogger(__name__, sample_rate=settings.auth_log_sample_rate)
 
 def get_stack_auth_client():
     """Get Stack Auth client instance."""
@@ -16,33 +25,188 @@ def get_stack_auth_client():
         )
     return stack_auth_client
 
-async def get_access_token(
-    x_stack_auth: Optional[str] = Header(None, alias="x-stack-auth")
-) -> str:
-    """Extract access token from request headers using official Stack Auth header name."""
+@dataclass
+class AuthContext:
+    """
+    Authentication state of one request, resolved once by the first auth
+    dependency that needs it (see ``get_auth_context``).
+    
+    Every auth dependency reads from this instead of parsing the header and
+    verifying the token itself.
+    """
+    access_token: Optional[str] = None
+    # Why no token could be extracted from the header (None if it could, or if there was no header)
+    header_error: Optional[str] = None
+    user: Optional[Dict[str, Any]] = None
+    # Verification failure for a token that was present
+    error: Optional[Exception] = None
+
+def _parse_auth_header(x_stack_auth: Optional[str]) -> AuthContext:
+    """Extract the access token from the official x-stack-auth header."""
     if not x_stack_auth:
-        logger.warning("Missing x-stack-auth header")
+        return AuthContext()
+    
+    try:
+        auth_data = json.loads(x_stack_auth)
+    except json.JSONDecodeError:
+        return AuthContext(header_error="Invalid JSON in x-stack-auth header")
+    
+    access_token = auth_data.get("accessToken") if isinstance(auth_data, dict) else None
+    if not access_token:
+        return AuthContext(header_error="'accessToken' not found in x-stack-auth header")
+    return AuthContext(access_token=access_token)
+
+async def resolve_auth_context(
+    x_stack_auth: Optional[str],
+    stack_client: Optional[StackAuthClient] = None
+) -> AuthContext:
+    """
+    Parse the x-stack-auth header and verify its token (at most once).
+    
+    Never raises: failures are recorded on the context and turned into
+    HTTP errors by the dependencies that require authentication.
+    """
+    context = _parse_auth_header(x_stack_auth)
+    if context.access_token is None:
+        return context
+    return await _verify_access_token(context.access_token, stack_client)
+
+async def _verify_access_token(
+    access_token: str,
+    stack_client: Optional[StackAuthClient] = None
+) -> AuthContext:
+    """Verify an access token; failures are recorded on the returned context."""
+    context = AuthContext(access_token=access_token)
+    try:
+        context.user = await _authenticate(stack_client or stack_auth_client, access_token)
+    except Exception as e:
+        context.error = e
+    return context
+
+async def get_auth_context(request: HTTPConnection) -> AuthContext:
+    """
+    Return the request's (or WebSocket connection's) auth context.
+    
+    Resolved on first use and stored on the request, so routes that combine
+    several auth dependencies verify the token once, and routes without any
+    (health checks, docs, 404s) never do.
+    """
+    context = getattr(request.state, "auth", None)
+    if context is None:
+        context = await resolve_auth_context(request.headers.get("x-stack-auth"))
+        request.state.auth = context
+    return context
+
+async def get_access_token(request: Request) -> str:
+    """Extract access token from request headers using official Stack Auth header name."""
+    context = await get_auth_context(request)
+    if context.access_token is None:
+        hot_logger.warning(context.header_error or "Missing x-stack-auth header")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication failed"
         )
+    return context.access_token
+
+def _user_data_from_profile(user: StackAuthUser) -> Dict[str, Any]:
+    """User data from the full Stack Auth profile (``api/v1/users/me``)."""
+    return {
+        "user_id": user.id,
+        "display_name": user.display_name,
+        "primary_email": user.primary_email,
+        "email_verified": user.primary_email_verified,
+        "profile_image_url": user.profile_image_url,
+        "signed_up_at": user.signed_up_at_millis,
+        "last_active_at": user.last_active_at_millis,
+        "oauth_providers": user.oauth_providers,
+        "has_password": user.has_password,
+        "auth_with_email": user.auth_with_email,
+        "client_metadata": user.client_metadata,
+        "client_read_only_metadata": user.client_read_only_metadata,
+        # Additional fields for compatibility with your Clerk pattern
+        "session_id": None,  # Stack Auth doesn't have session IDs like Clerk
+        "actor": None,       # Stack Auth doesn't have actor concept like Clerk
+        "session_claims": {
+            "sub": user.id,
+            "email": user.primary_email,
+            "email_verified": user.primary_email_verified
+        },
+        "profile_loaded": True
+    }
+
+def _user_data_from_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    User data from verified access token claims.
+    
+    Profile-only fields are None; endpoints that need them depend on
+    get_current_user_profile instead.
+    """
+    return {
+        "user_id": claims["sub"],
+        "display_name": claims.get("name"),
+        "primary_email": claims.get("email"),
+        "email_verified": claims.get("email_verified"),
+        "profile_image_url": None,
+        "signed_up_at": None,
+        "last_active_at": None,
+        "oauth_providers": None,
+        "has_password": None,
+        "auth_with_email": None,
+        "client_metadata": None,
+        "client_read_only_metadata": None,
+        "session_id": None,
+        "actor": None,
+        "session_claims": claims,
+        "profile_loaded": False
+    }
+
+async def _authenticate(stack_client: StackAuthClient, access_token: str) -> Dict[str, Any]:
+    """
+    Resolve an access token to user data through the verified-token cache.
+    
+    Concurrent requests with the same uncached token share one verification.
+    """
+    return await token_cache.get_or_load(
+        access_token, lambda: _verify_token(stack_client, access_token)
+    )
+
+async def _verify_token(stack_client: StackAuthClient, access_token: str) -> Dict[str, Any]:
+    """
+    Verify an access token, locally when possible.
+    
+    Falls back to the Stack Auth API only when the signing keys cannot be
+    loaded, so an outage of the JWKS endpoint does not lock users out.
+    """
+    if stack_client.settings.stack_auth_verify_locally:
+        try:
+            claims = await stack_client.verify_token_via_jwt(access_token)
+            return _user_data_from_claims(claims)
+        except JWKSUnavailableError as e:
+            logger.warning("JWKS unavailable, verifying token via API", error=str(e))
+    
+    user = await stack_client.verify_token_via_api(access_token)
+    return _user_data_from_profile(user)
+
+async def _load_profile(
+    user_data: Dict[str, Any],
+    access_token: str,
+    stack_client: StackAuthClient
+) -> Dict[str, Any]:
+    """Fill in profile fields that are not part of the access token."""
+    if user_data.get("profile_loaded"):
+        return user_data
     
     try:
-        auth_data = json.loads(x_stack_auth)
-        access_token = auth_data.get("accessToken")
-        if not access_token:
-            logger.warning("'accessToken' not found in x-stack-auth header")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Authentication failed"
-            )
-        return access_token
-    except json.JSONDecodeError:
-        logger.warning("Invalid JSON in x-stack-auth header")
+        user = await stack_client.verify_token_via_api(access_token)
+    except Exception as e:
+        logger.error("Failed to load user profile", error=str(e), user_id=user_data["user_id"])
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication failed"
         )
+    user_data.update(_user_data_from_profile(user))
+    await token_cache.update(access_token, user_data)
+    return user_data
 
 async def get_current_user(
     request: Request,
@@ -54,90 +218,90 @@ async def get_current_user(
     
     This dependency:
     1. Extracts the access token from the x-stack-auth header
-    2. Verifies the token using Stack Auth's official API
+    2. Verifies the token locally against the project's cached JWKS
+       (or via Stack Auth's official API when local verification is disabled)
     3. Returns the authenticated user data with official Stack Auth structure
+    
+    Steps 1 and 2 run once per request (see ``get_auth_context``), however
+    many auth dependencies the route uses.
+    
+    Profile fields that are not in the token (profile image, OAuth providers,
+    metadata, ...) are None unless the profile was fetched; use
+    get_current_user_profile when an endpoint needs them.
     """
-    try:
-        # Verify the token using Stack Auth's official API
-        user = await stack_client.verify_token_via_api(access_token)
-        
-        # Return user data in the same format as your Clerk implementation
-        user_data = {
-            "user_id": user.id,
-            "display_name": user.display_name,
-            "primary_email": user.primary_email,
-            "email_verified": user.primary_email_verified,
-            "profile_image_url": user.profile_image_url,
-            "signed_up_at": user.signed_up_at_millis,
-            "last_active_at": user.last_active_at_millis,
-            "oauth_providers": user.oauth_providers,
-            "has_password": user.has_password,
-            "auth_with_email": user.auth_with_email,
-            "client_metadata": user.client_metadata,
-            "client_read_only_metadata": user.client_read_only_metadata,
-            # Additional fields for compatibility with your Clerk pattern
-            "session_id": None,  # Stack Auth doesn't have session IDs like Clerk
-            "actor": None,       # Stack Auth doesn't have actor concept like Clerk
-            "session_claims": {
-                "sub": user.id,
-                "email": user.primary_email,
-                "email_verified": user.primary_email_verified
-            }
-        }
-
-        logger.info("User authenticated successfully", user_id=user_data["user_id"])
-        logger.info(f"user_data: {user_data}")
-        return user_data
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("Authentication failed", error=str(e), error_type=type(e).__name__)
+    context = await get_auth_context(request)
+    if context.error is not None:
+        hot_logger.warning("Authentication failed", error=str(context.error), error_type=type(context.error).__name__)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication failed"
         )
+    
+    user_data = context.user
+    hot_logger.info("User authenticated", user_id=user_data["user_id"])
+    return user_data
 
-async def get_optional_user(
-    request: Request,
+async def get_current_user_profile(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    access_token: str = Depends(get_access_token),
     stack_client = Depends(get_stack_auth_client)
-) -> Optional[Dict[str, Any]]:
+) -> Dict[str, Any]:
+    """Authenticated user data including the full Stack Auth profile (one API call)."""
+    return await _load_profile(current_user, access_token, stack_client)
+
+async def get_optional_user(request: Request) -> Optional[Dict[str, Any]]:
     """Optional authentication - returns user data if authenticated, None otherwise."""
-    try:
-        x_stack_auth = request.headers.get("x-stack-auth")
-        if not x_stack_auth:
-            return None
+    context = await get_auth_context(request)
+    if context.user is None:
+        if context.error is not None:
+            hot_logger.debug("Optional authentication failed", error_type=type(context.error).__name__)
+        return None
+    
+    hot_logger.info("Optional user authenticated", user_id=context.user["user_id"])
+    return context.user
 
-        auth_data = json.loads(x_stack_auth)
-        access_token = auth_data.get("accessToken")
-        if not access_token:
+async def accept_websocket_user(websocket: WebSocket) -> Optional[Dict[str, Any]]:
+    """
+    Accept a WebSocket connection and authenticate it once.
+    
+    Clients that can set headers send x-stack-auth on the handshake. Browser
+    WebSocket clients cannot, so without the header the first message must be
+    ``{"type": "auth", "accessToken": "..."}``, sent within
+    ``ws_auth_timeout_seconds``; it is answered with ``{"type": "authenticated"}``. On failure the connection is closed with
+    1008 (policy violation).
+    
+    Returns:
+        User data, or None if the connection was closed
+    """
+    context = await get_auth_context(websocket)
+    await websocket.accept()
+    
+    if context.access_token is None and context.header_error is None:
+        try:
+            message = await asyncio.wait_for(websocket.receive_json(), settings.ws_auth_timeout_seconds)
+        except WebSocketDisconnect:
             return None
-
-        # Verify the token
-        user = await stack_client.verify_token_via_api(access_token)
-        
-        user_data = {
-            "user_id": user.id,
-            "display_name": user.display_name,
-            "primary_email": user.primary_email,
-            "email_verified": user.primary_email_verified,
-            "profile_image_url": user.profile_image_url,
-            "signed_up_at": user.signed_up_at_millis,
-            "last_active_at": user.last_active_at_millis,
-            "oauth_providers": user.oauth_providers,
-            "has_password": user.has_password,
-            "auth_with_email": user.auth_with_email,
-            "client_metadata": user.client_metadata,
-            "client_read_only_metadata": user.client_read_only_metadata
-        }
-        
-        logger.info("Optional user authenticated successfully", user_id=user_data["user_id"])
-        logger.info(f"user_data: {user_data}")
-        return user_data
+        except (asyncio.TimeoutError, ValueError, KeyError):
+            # No, malformed or binary first message
+            message = None
         
-    except Exception as e:
-        logger.debug("Optional authentication failed", error=str(e))
+        access_token = message.get("accessToken") if isinstance(message, dict) and message.get("type") == "auth" else None
+        if access_token:
+            context = await _verify_access_token(access_token)
+        else:
+            context = AuthContext(header_error="Missing auth message")
+    
+    if context.user is None:
+        hot_logger.warning(
+            "WebSocket authentication failed",
+            error=str(context.error or context.header_error)
+        )
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Authentication failed")
         return None
+    
+    await websocket.send_json({"type": "authenticated"})
+    hot_logger.info("WebSocket user authenticated", user_id=context.user["user_id"])
+    return context.user
 
 # Convenience functions for common data extraction
 async def get_current_user_id(
@@ -147,16 +311,24 @@ async def get_current_user_id(
     return current_user["user_id"]
 
 async def get_current_user_email(
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    access_token: str = Depends(get_access_token),
+    stack_client = Depends(get_stack_auth_client)
 ) -> str:
-    """Extract user email from authenticated user data."""
+    """Extract user email from authenticated user data (loading the profile if the token has none)."""
+    if current_user.get("primary_email") is None:
+        current_user = await _load_profile(current_user, access_token, stack_client)
     return current_user["primary_email"]
 
 # Convenience function for checking if user has specific permission
 async def require_email_verification(
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    access_token: str = Depends(get_access_token),
+    stack_client = Depends(get_stack_auth_client)
 ) -> Dict[str, Any]:
     """Require email verification for protected endpoints."""
+    if current_user.get("email_verified") is None:
+        current_user = await _load_profile(current_user, access_token, stack_client)
     if not current_user.get("email_verified"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
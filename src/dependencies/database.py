@@ -1,7 +1,28 @@
+from typing import Any, Dict
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.core.database import AsyncSessionLocal
+from src.core.database import AsyncSessionLocal, read_session_factory
+from src.dependencies.auth import get_current_user
 
 async def get_session() -> AsyncSession:
     """Get database session."""
     async with AsyncSessionLocal() as session:
         yield session
+
+async def get_read_session(
+    request: Request,
+    user_data: Dict[str, Any] = Depends(get_current_user)
+) -> AsyncSession:
+    """
+    Get a database session for read-only endpoints.
+    
+    Served by the read replica (DATABASE_READ_URL) unless the requested chat,
+    or for list endpoints the user's chats, were written recently; those reads
+    stay on the primary so clients always see their own writes.
+    """
+    factory = await read_session_factory(
+        chat_id=request.path_params.get("chat_id"),
+        user_id=user_data["user_id"]
+    )
+    async with factory() as session:
+        yield session
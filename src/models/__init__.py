@@ -1,4 +1,5 @@
 # Models package
-from .chat import Chat
+from .chat import Chat, ChatItem
+from .job import AgentJob
 
-__all__ = ["Chat"]
+__all__ = ["Chat", "ChatItem", "AgentJob"]
@@ -3,10 +3,23 @@ from typing import Optional, Any
 from datetime import datetime, timezone
 import uuid
 from sqlalchemy import JSON, Column, Index
-from sqlalchemy.types import DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import DateTime, Text
+
+# JSONB on PostgreSQL (indexable, supports in-place operators), plain JSON elsewhere
+JSONB_VARIANT = JSON().with_variant(JSONB(), "postgresql")
 
 class Chat(SQLModel, table=True):
     __tablename__ = "chats"
+    __table_args__ = (
+        # Covering index for per-user listings: keyset pages ordered by
+        # (updated_at, chat_id) and COUNT(*) filtered by is_active are index-only scans
+        Index(
+            "ix_chats_user_active_updated_id",
+            "user_id", "is_active", "updated_at", "chat_id",
+            postgresql_include=["title", "message_count", "created_at"]
+        ),
+    )
     
     # Primary key should be chat_id for unique chats
     chat_id: str = Field(primary_key=True, default_factory=lambda: str(uuid.uuid4()), index=True)
@@ -14,10 +27,11 @@ class Chat(SQLModel, table=True):
     # Foreign key to user (not primary key)
     user_id: str = Field(index=True)  # Reference to Stack Auth user
     
-    # Conversation data stored as JSONB - List of conversation messages
+    # Legacy conversation blob - superseded by ChatItem rows and drained by
+    # src.core.migrations.migrate_chat_conversations on startup
     conversation: Optional[list[dict[str, Any]]] = Field(
         default=None, 
-        sa_type=JSON
+        sa_type=JSONB_VARIANT
     )
     
     # Metadata
@@ -33,3 +47,33 @@ class Chat(SQLModel, table=True):
     # Optional fields for chat management
     title: Optional[str] = Field(default=None, index=True)
     is_active: bool = Field(default=True)
+    
+    # Incremented on every conversation write; used to validate cached histories
+    version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    
+    # Next free chat_items.seq; appends reserve sequence numbers by incrementing it
+    next_seq: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    
+    # Number of rows in chat_items, maintained on every write for cheap listings
+    message_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    
+    # Rolling summary of items with seq < summary_seq (windowed sessions only)
+    summary: Optional[str] = Field(default=None, sa_type=Text)
+    summary_seq: Optional[int] = Field(default=None)
+
+
+class ChatItem(SQLModel, table=True):
+    """A single conversation item, stored append-only as one row per item."""
+    __tablename__ = "chat_items"
+
+    # (chat_id, seq) is the primary key, so tail queries ordered by seq are index scans
+    chat_id: str = Field(foreign_key="chats.chat_id", primary_key=True, ondelete="CASCADE")
+    seq: int = Field(primary_key=True)
+
+    # Conversation item as produced/consumed by the OpenAI Agents SDK
+    item: dict[str, Any] = Field(sa_type=JSONB_VARIANT)
+
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False)
+    )
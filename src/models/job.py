@@ -0,0 +1,36 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional, Any
+from datetime import datetime, timezone
+import uuid
+from sqlalchemy import Column
+from sqlalchemy.types import DateTime, Text
+
+from src.models.chat import JSONB_VARIANT
+
+
+class AgentJob(SQLModel, table=True):
+    """A detached agent run started through POST {prefix}/jobs."""
+    __tablename__ = "agent_jobs"
+
+    job_id: str = Field(primary_key=True, default_factory=lambda: uuid.uuid4().hex)
+
+    # Reference to Stack Auth user
+    user_id: str = Field(index=True)
+    agent_name: str
+    session_id: Optional[str] = Field(default=None)
+
+    # queued -> running -> completed | failed | cancelled
+    status: str = Field(default="queued")
+
+    final_output: Optional[Any] = Field(default=None, sa_type=JSONB_VARIANT)
+    usage: Optional[dict[str, Any]] = Field(default=None, sa_type=JSONB_VARIANT)
+    error: Optional[str] = Field(default=None, sa_type=Text)
+
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False)
+    )
+    started_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+    finished_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+    # Refreshed by the owning worker while the job is queued or running
+    heartbeat_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
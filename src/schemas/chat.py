@@ -30,9 +30,30 @@ class ChatResponse(ChatBase):
     class Config:
         from_attributes = True
 
+class ChatSummary(BaseModel):
+    """Schema for a chat in listings (no conversation payload)."""
+    chat_id: str
+    title: Optional[str] = None
+    is_active: bool = True
+    message_count: int = 0
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class ChatListResponse(BaseModel):
     """Schema for listing chats."""
-    chats: list[ChatResponse]
+    chats: list[ChatSummary]
     total: int
     skip: int
     limit: int
+    next_cursor: Optional[str] = None  # Pass as `cursor` to fetch the next page
+
+class ChatMessagesResponse(BaseModel):
+    """Schema for a page of chat messages, oldest first."""
+    chat_id: str
+    messages: list[dict[str, Any]]
+    message_count: int
+    next_cursor: Optional[str] = None  # Pass as `cursor` to fetch older messages
+    has_more: bool = False